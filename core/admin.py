@@ -1,6 +1,83 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils.translation import gettext_lazy as _
 
-from .models import User, Task
+from .models import User, Task, RecurringTask
+from .pagination import EstimatedCountPaginator
+from .purge import purge_users_in_background
 
-admin.site.register(User)
-admin.site.register(Task)
\ No newline at end of file
+
+class OpenTaskFilter(admin.SimpleListFilter):
+    """ running or finished tasks, served by the end_at index """
+    title = _("end")
+    parameter_name = "open"
+
+    def lookups(self, request, model_admin):
+        return (("1", _("Running")), ("0", _("Finished")))
+
+    def queryset(self, request, queryset):
+        if self.value() in ("0", "1"):
+            return queryset.filter(end_at__isnull = self.value() == "1")
+        return queryset
+
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    list_display = ("username", "email", "first_name", "last_name", "is_staff", "is_active", "date_joined")
+    list_filter = ("is_staff", "is_active")
+    # prefix searches can use the unique index on username
+    search_fields = ("^username", "^email")
+    ordering = ("username", )
+    filter_horizontal = ("groups", "user_permissions")
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["purge_users"]
+
+    @admin.action(description = "Delete selected users and their tasks in chunks", permissions = ["delete"])
+    def purge_users(self, request, queryset):
+        """ delete users with large task histories without one huge transaction """
+        ids = list(queryset.exclude(pk = request.user.pk).values_list("pk", flat = True))
+        User.objects.filter(pk__in = ids).update(is_active = False)
+        purge_users_in_background(User, ids)
+        self.message_user(
+            request,
+            f"Deletion of {len(ids)} users started, they are deactivated until their tasks are gone.",
+            messages.SUCCESS,
+        )
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "created_by", "is_completed", "begin_at", "end_at", "created_at")
+    # Task.__str__ and the created_by column read the user of every row
+    list_select_related = ("created_by", )
+    list_filter = ("is_completed", OpenTaskFilter)
+    date_hierarchy = "begin_at"
+    search_fields = ("^name", )
+    # primary key order, any other would sort the whole table
+    ordering = ("-id", )
+    # select widgets would list every user and recurring task
+    autocomplete_fields = ("created_by", "recurrence")
+    readonly_fields = ("created_at", "updated_at")
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def delete_queryset(self, request, queryset):
+        """ delete through the owners, keeping rollups and change logs in sync """
+        ids = {}
+        for id, user_id in queryset.values_list("id", "created_by_id"):
+            ids.setdefault(user_id, []).append(id)
+        for user in User.objects.filter(pk__in = ids):
+            user.delete_tasks(ids = ids[user.pk])
+
+
+@admin.register(RecurringTask)
+class RecurringTaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "created_by", "frequency", "interval", "starts_at", "until")
+    list_select_related = ("created_by", )
+    list_filter = ("frequency", )
+    search_fields = ("^name", )
+    ordering = ("-id", )
+    autocomplete_fields = ("created_by", )
+    readonly_fields = ("created_at", "updated_at")
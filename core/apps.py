@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import metrics, search
+        from .models import User
+
+        post_migrate.connect(search.sync_sqlite_fts, sender = self, dispatch_uid = "core.search")
+
+        if metrics.enabled():
+            connection_created.connect(metrics.install_query_recorder, dispatch_uid = "core.metrics")
+            metrics.instrument(User, "task")
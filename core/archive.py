@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+
+from . import changes
+from .cache import invalidate_task_summary
+from .models import Task, TaskArchive
+
+HORIZON_KEY = "core:archive-horizon"
+# how long an announced archive run is trusted, renewed by every batch
+HORIZON_TIMEOUT = 300
+
+
+def horizon(using = DEFAULT_DB_ALIAS):
+    """ instant before which every archived task ended
+
+    Read from the database on every call, an index-only ``MAX(end_at)``
+    over ``archive_end_idx``, so every process sees the archive as it is.
+    A cutoff announced by ``advance_horizon`` raises it for a few minutes
+    while tasks are still moving; it lives in the default cache and is
+    only a head start, processes that do not share the cache rely on the
+    database alone.
+
+    Args:
+        using (str, optional): database alias
+
+    Returns:
+        datetime: upper bound of the end_at of archived tasks, ``None``
+        while the archive is empty and no run is announced
+    """
+    value = TaskArchive.objects.using(using).aggregate(newest = models.Max('end_at'))['newest']
+    announced = cache.get(HORIZON_KEY)
+    if announced is not None and (value is None or announced > value):
+        return announced
+    return value
+
+
+def may_overlap(start, using = DEFAULT_DB_ALIAS):
+    """ whether archived tasks can overlap a window beginning at ``start`` """
+    value = horizon(using)
+    return value is not None and value >= start
+
+
+def advance_horizon(cutoff, using = DEFAULT_DB_ALIAS):
+    """ announce that tasks ending before ``cutoff`` are about to be archived
+
+    Called before rows move, so that rollup refreshes running meanwhile
+    already look into the archive. The announcement expires after
+    ``HORIZON_TIMEOUT`` seconds, a run renews it before every batch.
+    """
+    cache.set(HORIZON_KEY, cutoff, HORIZON_TIMEOUT)
+
+
+def archive_batch(cutoff, batch_size = 1000, after_id = 0, using = DEFAULT_DB_ALIAS):
+    """ move one batch of completed tasks that ended before ``cutoff`` to the archive
+
+    The copy and the delete share a transaction, so an interrupted run
+    leaves every task in exactly one table and simply resumes on rerun.
+    Rollups are left alone, they already count the archived tasks. The
+    cutoff is announced first, see ``advance_horizon``.
+
+    Args:
+        cutoff (datetime): tasks must end before it
+        batch_size (int, optional): tasks moved per transaction
+        after_id (int, optional): only consider tasks with a greater id
+        using (str, optional): database alias
+
+    Returns:
+        Tuple[int, int]: number of moved tasks and the last moved id
+    """
+    advance_horizon(cutoff, using)
+    with transaction.atomic(using = using):
+        candidates = Task.objects.using(using).filter(
+                is_completed = True,
+                end_at__lt = cutoff,
+                id__gt = after_id,
+            ).order_by('id')
+        if connections[using].features.has_select_for_update_skip_locked:
+            # tasks being edited are picked up by the next run
+            candidates = candidates.select_for_update(skip_locked = True)
+
+        tasks = list(candidates[:batch_size])
+        if not tasks:
+            return 0, after_id
+
+        TaskArchive.objects.using(using).bulk_create(
+                [TaskArchive.from_task(task) for task in tasks],
+                ignore_conflicts = True,
+            )
+        Task.objects.using(using).filter(id__in = [task.id for task in tasks]).delete()
+
+        users = {}
+        for task in tasks:
+            users.setdefault(task.created_by_id, []).append(task.id)
+        for user_id, ids in users.items():
+            changes.record(user_id, changes.ARCHIVE, ids, using = using)
+            invalidate_task_summary(user_id, using = using)
+
+    return len(tasks), tasks[-1].id
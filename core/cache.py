@@ -0,0 +1,88 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+
+
+def summary_cache():
+    """ cache backend holding the per-user task summaries
+
+    Returns:
+        BaseCache: cache selected by ``TASK_SUMMARY_CACHE_ALIAS``
+    """
+    return caches[getattr(settings, "TASK_SUMMARY_CACHE_ALIAS", "default")]
+
+
+def summary_timeout():
+    """ lifetime of a cached summary in seconds, ``None`` keeps it forever """
+    return getattr(settings, "TASK_SUMMARY_CACHE_TIMEOUT", 300)
+
+
+def summary_key(user_id):
+    return f"core:task-summary:{user_id}"
+
+
+def _invalidate(user_id):
+    summary_cache().delete(summary_key(user_id))
+
+
+def invalidate_task_summary(user_id, using = None):
+    """ drop the cached task summary of a user
+
+    Inside a transaction the summary is dropped again on commit, a summary
+    cached meanwhile from the data before the write is dropped as well.
+
+    Args:
+        user_id (int): id of the user whose tasks changed
+        using (str, optional): database the write went to
+    """
+    _invalidate(user_id)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: _invalidate(user_id), using = using)
+
+
+# Versioned task responses
+#
+# The task version of a user is the id of their newest change log row, so
+# every write to their tasks changes it and every process reads the same
+# value. Rendered task lists are cached under the version they were built
+# for and the version doubles as their ETag, so a write orphans all of them
+# at once.
+
+def response_timeout():
+    """ lifetime of a cached task response in seconds """
+    return getattr(settings, "TASK_RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def _version(head):
+    return head['version'] or 0
+
+
+def task_version(user):
+    """ current version of the tasks of a user
+
+    An index-only ``MAX(id)`` over the change log of user, read where the
+    tasks of user are read.
+
+    Args:
+        user (User): owner of the tasks
+
+    Returns:
+        int: version, changed by every write to the tasks of user
+    """
+    return _version(user.task_changes.aggregate(version = models.Max('id')))
+
+
+async def atask_version(user):
+    """ async version of ``task_version`` """
+    return _version(await user.task_changes.aaggregate(version = models.Max('id')))
+
+
+def task_etag(user_id, version):
+    return f'"{user_id}.{version}"'
+
+
+def response_key(user_id, version, path):
+    digest = hashlib.sha1(path.encode()).hexdigest()
+    return f"core:task-response:{user_id}:{version}:{digest}"
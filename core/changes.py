@@ -0,0 +1,287 @@
+import base64
+import binascii
+import datetime
+import json
+
+from typing import List, NamedTuple
+
+from django.conf import settings
+from django.db import connections, models, router
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .exceptions import ExpiredCursorException, InvalidCursorException
+from .purge import DELETE_CHUNK_SIZE, delete_in_chunks
+
+# kinds of TaskChange rows, the last two are tombstones
+UPSERT, DELETE, ARCHIVE = 'upsert', 'delete', 'archive'
+KINDS = (UPSERT, DELETE, ARCHIVE)
+
+DEFAULT_CHANGES_LIMIT = 500
+
+
+class ChangeSet(NamedTuple):
+    """ changes to the tasks of a user after a cursor, the latest per task """
+    # created or updated tasks, as they are now
+    tasks: list
+    # ids of deleted tasks
+    deleted: List[int]
+    # ids of tasks moved to the archive
+    archived: List[int]
+    cursor: str
+    # more changes are waiting, ask again with ``cursor`` right away
+    has_more: bool
+
+
+def retention():
+    """ how long changes are kept, and cursors stay valid """
+    return datetime.timedelta(days = getattr(settings, 'TASK_CHANGES_RETENTION_DAYS', 30))
+
+
+def lag():
+    """ age a change needs before it is handed out, see ``changes_since``
+
+    A second more than ``DATABASE_TRANSACTION_TIMEOUT`` unless
+    ``TASK_CHANGES_LAG_SECONDS`` is set.
+    """
+    seconds = getattr(settings, 'TASK_CHANGES_LAG_SECONDS', None)
+    if seconds is None:
+        seconds = getattr(settings, 'DATABASE_TRANSACTION_TIMEOUT', 3) + 1
+    return datetime.timedelta(seconds = seconds)
+
+
+def encode_cursor(last_id, synced_at):
+    """ encode a position in the change log into an opaque token
+
+    Args:
+        last_id (int): id of the last change handed out
+        synced_at (datetime): when the client last had every change
+
+    Returns:
+        str: url safe token
+    """
+    raw = json.dumps([last_id, synced_at.isoformat()], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ decode a token produced by ``encode_cursor``
+
+    Raises:
+        InvalidCursorException: if the token is malformed
+
+    Returns:
+        Tuple[int, datetime]: id of the last change and time of the last sync
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        last_id, synced_at = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        synced_at = parse_datetime(synced_at)
+    except (TypeError, ValueError, binascii.Error):
+        raise InvalidCursorException(cursor)
+
+    if synced_at is None or not isinstance(last_id, int):
+        raise InvalidCursorException(cursor)
+
+    return last_id, synced_at
+
+
+def logged_by_triggers(using = None):
+    """ whether triggers on the task table write the upserts and deletes
+
+    On PostgreSQL and SQLite the change log rows of task writes are
+    inserted by the statement writing the tasks, see migration 0011, and
+    only archiving is recorded by the application.
+
+    Args:
+        using (str, optional): database alias, the write database by default
+    """
+    from .models import Task
+
+    return connections[using or router.db_for_write(Task)].vendor in ('postgresql', 'sqlite')
+
+
+def record(user_id, kind, task_ids, using = None):
+    """ append a change of every task to the log, in one INSERT
+
+    Args:
+        user_id (int): owner of the tasks
+        kind (str): one of ``KINDS``
+        task_ids (Iterable[int]): changed tasks
+        using (str, optional): database alias, the write database by default
+    """
+    record_users(kind, {user_id: task_ids}, using)
+
+
+def record_users(kind, task_ids, using = None):
+    """ ``record`` for the tasks of many users, still in one INSERT
+
+    Args:
+        kind (str): one of ``KINDS``
+        task_ids (Dict[int, Iterable[int]]): changed tasks per owner
+        using (str, optional): database alias, the write database by default
+    """
+    from .models import TaskChange
+
+    objs = [
+        TaskChange(user_id = user_id, task_id = task_id, kind = kind)
+        for user_id, ids in task_ids.items() for task_id in ids
+    ]
+    if objs:
+        TaskChange.objects.using(using or router.db_for_write(TaskChange)).bulk_create(objs)
+
+
+def _page(cursor, now):
+    """ id and sync time to read after, raising for cursors older than the log """
+    if cursor is None:
+        return None, now
+
+    last_id, synced_at = decode_cursor(cursor)
+    if synced_at < now - retention():
+        raise ExpiredCursorException(cursor)
+    return last_id, synced_at
+
+
+def _settled(rows, now):
+    """ rows up to the first change younger than ``lag()``, as (id, task_id, kind) """
+    settled = now - lag()
+    kept = []
+    for id, task_id, kind, changed_at in rows:
+        if changed_at > settled:
+            break
+        kept.append((id, task_id, kind))
+    return kept
+
+
+def _head(head, young):
+    """ position before the first change younger than ``lag()`` """
+    if young is not None:
+        return young - 1
+    return head or 0
+
+
+def _head_aggregates(now):
+    return {
+        'head': models.Max('id'),
+        'young': models.Min('id', filter = models.Q(changed_at__gt = now - lag())),
+    }
+
+
+def _latest(rows, limit):
+    """ last kind of every task in the first ``limit`` rows """
+    return {task_id: kind for id, task_id, kind in rows[:limit]}
+
+
+def _change_set(tasks, latest, rows, limit, last_id, synced_at, now):
+    has_more = len(rows) > limit
+    if rows:
+        last_id = rows[:limit][-1][0]
+
+    # a caught up client is in sync now, otherwise still since its last sync
+    cursor = encode_cursor(last_id, synced_at if has_more else now)
+    deleted = [task_id for task_id, kind in latest.items() if kind == DELETE]
+    archived = [task_id for task_id, kind in latest.items() if kind == ARCHIVE]
+    return ChangeSet(tasks, deleted, archived, cursor, has_more)
+
+
+def changes_since(user, cursor = None, limit = DEFAULT_CHANGES_LIMIT):
+    """ changes to the tasks of a user after a cursor
+
+    Reads at most ``limit`` log rows and the tasks they name, so a poll
+    costs what changed rather than the size of the history. Without a
+    cursor nothing is returned but the current position: take it before
+    the full ``get_tasks()`` fetch, then poll with the returned cursors.
+
+    Log ids are assigned on INSERT, not on commit, so a transaction still
+    running can commit ids below a cursor already handed out. Changes are
+    therefore only handed out once they are ``lag()`` old, and a poll stops
+    at the first younger one. No change is missed as long as every write
+    transaction commits within ``DATABASE_TRANSACTION_TIMEOUT`` of logging
+    its changes, and the clocks of the servers agree to within a second.
+
+    Args:
+        user (User): owner of the tasks
+        cursor (str, optional): token of the previous call
+        limit (int, optional): most log rows read per call
+
+    Raises:
+        InvalidCursorException: if the cursor is malformed
+        ExpiredCursorException: if the log was compacted past the cursor,
+            the client has to fetch all tasks again
+
+    Returns:
+        ChangeSet: the latest change of every task
+    """
+    now = timezone.now()
+    last_id, synced_at = _page(cursor, now)
+    if last_id is None:
+        head = user.task_changes.aggregate(**_head_aggregates(now))
+        return ChangeSet([], [], [], encode_cursor(_head(**head), now), False)
+
+    rows = _settled(
+            user.task_changes.filter(id__gt = last_id).order_by('id').values_list('id', 'task_id', 'kind', 'changed_at')[:limit + 1],
+            now,
+        )
+
+    latest = _latest(rows, limit)
+    upserted = [task_id for task_id, kind in latest.items() if kind == UPSERT]
+    # tasks gone since are left out, their tombstone follows
+    tasks = list(user.tasks.filter(id__in = upserted).order_by('id')) if upserted else []
+    return _change_set(tasks, latest, rows, limit, last_id, synced_at, now)
+
+
+async def achanges_since(user, cursor = None, limit = DEFAULT_CHANGES_LIMIT):
+    """ async version of ``changes_since``
+
+    Returns:
+        ChangeSet: the latest change of every task
+    """
+    now = timezone.now()
+    last_id, synced_at = _page(cursor, now)
+    if last_id is None:
+        head = await user.task_changes.aaggregate(**_head_aggregates(now))
+        return ChangeSet([], [], [], encode_cursor(_head(**head), now), False)
+
+    rows = _settled([
+            row async for row in user.task_changes.filter(
+                id__gt = last_id
+            ).order_by('id').values_list('id', 'task_id', 'kind', 'changed_at')[:limit + 1]
+        ], now)
+
+    latest = _latest(rows, limit)
+    upserted = [task_id for task_id, kind in latest.items() if kind == UPSERT]
+    tasks = [task async for task in user.tasks.filter(id__in = upserted).order_by('id')] if upserted else []
+    return _change_set(tasks, latest, rows, limit, last_id, synced_at, now)
+
+
+def compact(chunk_size = DELETE_CHUNK_SIZE, sleep = 0, progress = None):
+    """ shrink the change log, in small committed chunks
+
+    Changes followed by a newer change of the same task for the same user
+    are dropped, a client after either of them gets the newer one. Changes
+    older than ``TASK_CHANGES_RETENTION_DAYS`` are dropped too, cursors
+    last in sync before that have expired already. The newest change of
+    every user is kept, its id is their task version, see
+    ``cache.task_version``.
+
+    Args:
+        chunk_size (int, optional): rows deleted per transaction
+        sleep (float, optional): seconds to pause between chunks
+        progress (Callable[[str, int], None], optional): called with the
+            step and its rows deleted so far
+
+    Returns:
+        dict: number of ``expired`` and ``superseded`` rows deleted
+    """
+    from .models import TaskChange
+
+    cutoff = timezone.now() - retention()
+    newer = TaskChange.objects.filter(user_id = models.OuterRef('user_id'), id__gt = models.OuterRef('id'))
+    expired = TaskChange.objects.filter(models.Exists(newer), changed_at__lt = cutoff)
+    superseded = TaskChange.objects.filter(models.Exists(newer.filter(task_id = models.OuterRef('task_id'))))
+
+    deleted = {}
+    for name, queryset in (('expired', expired), ('superseded', superseded)):
+        report = None if progress is None else (lambda total, name = name: progress(name, total))
+        deleted[name] = delete_in_chunks(queryset.order_by('id'), chunk_size, sleep, report)
+    return deleted
@@ -15,4 +15,37 @@ class TaskNotFoundException(Exception):
     
     def __str__(self):
         return self.message
-    
\ No newline at end of file
+
+
+class InvalidCursorException(ValueError):
+    """ Raised when a pagination cursor cannot be decoded. """
+
+    def __init__(self, cursor: str):
+        """ Constructor for InvalidCursorException class
+
+        Args:
+            cursor (str): continuation token received from the client
+        """
+        self.message = f"Invalid pagination cursor {cursor!r}"
+
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class ExpiredCursorException(ValueError):
+    """ Raised when a change log cursor is older than the kept changes. """
+
+    def __init__(self, cursor: str):
+        """ Constructor for ExpiredCursorException class
+
+        Args:
+            cursor (str): continuation token received from the client
+        """
+        self.message = f"Cursor {cursor!r} expired, fetch all tasks again"
+
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
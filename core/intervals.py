@@ -0,0 +1,51 @@
+from django.db import connections, models
+
+
+def _postgres_overlapping(queryset, start, end):
+    from django.contrib.postgres.fields import DateTimeRangeField
+    from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+
+    # must stay identical to the expression of the task_user_span_gist
+    # index created in migration 0005, or the index is not used
+    span = models.Func(
+            models.F('begin_at'), models.F('end_at'), models.Value('[]'),
+            function = 'TSTZRANGE',
+            output_field = DateTimeRangeField(),
+        )
+    return queryset.alias(span = span).filter(span__overlap = DateTimeTZRange(start, end, '[]'))
+
+
+def _portable_overlapping(queryset, start, end):
+    # "ends after start" first: for recent windows it is the selective side
+    # and task_user_end_idx serves both branches of the OR
+    return queryset.filter(
+            models.Q(end_at__gte = start) | models.Q(end_at__isnull = True),
+            begin_at__lte = end,
+        )
+
+
+def overlapping(queryset, start, end):
+    """ restrict tasks to the ones overlapping the closed window [start, end]
+
+    Tasks without ``end_at`` are open ended, as in ``get_active_tasks``.
+    On PostgreSQL the check is a ``tstzrange`` overlap served by a GiST
+    index, elsewhere a plain predicate served by B-tree indexes.
+
+    Args:
+        queryset (Queryset): tasks
+        start (datetime): window start
+        end (datetime): window end
+
+    Raises:
+        ValueError: if the window ends before it starts
+
+    Returns:
+        Queryset: overlapping tasks
+    """
+    if start > end:
+        raise ValueError("start must be less than or equal to end")
+
+    if connections[queryset.db].vendor == 'postgresql':
+        return _postgres_overlapping(queryset, start, end)
+    return _portable_overlapping(queryset, start, end)
+
@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections import defaultdict
+from pathlib import Path
+
+# directory of manage.py, the child imports the project from there
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# run in a fresh interpreter: imports the WSGI application and serves one
+# request through it, without the test client which imports far more
+CHILD = r"""
+import io, json, sys, time
+
+started = time.perf_counter()
+from time_tracker.wsgi import application
+imported = time.perf_counter()
+
+statuses = []
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[1], "QUERY_STRING": "",
+    "SERVER_NAME": "localhost", "SERVER_PORT": "80", "HTTP_HOST": "localhost",
+    "SERVER_PROTOCOL": "HTTP/1.1", "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+    "wsgi.url_scheme": "http", "wsgi.version": (1, 0),
+    "wsgi.multithread": False, "wsgi.multiprocess": True, "wsgi.run_once": False,
+}
+response = application(environ, lambda status, headers, exc_info = None: statuses.append(status))
+b"".join(response)
+getattr(response, "close", lambda: None)()
+responded = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (responded - imported) * 1000,
+    "status": int(statuses[0].split()[0]),
+    "modules": len(sys.modules),
+}))
+"""
+
+# settings of every measured mode
+MODES = {
+    "default": {"SERVERLESS": "0"},
+    "serverless": {"SERVERLESS": "1"},
+}
+
+
+def package_times(importtime):
+    """ import time per top level package from ``-X importtime`` output
+
+    Args:
+        importtime (str): stderr of an interpreter run with ``-X importtime``
+
+    Returns:
+        dict: milliseconds spent importing the modules of every package,
+            their own time only so that the values add up
+    """
+    packages = defaultdict(float)
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not own.strip().isdigit():
+            continue  # the header line
+        packages[name.strip().split(".")[0]] += int(own) / 1000
+    return dict(packages)
+
+
+def measure(mode, path = "/tasks/api/", settings = None, python = None, bytecode = True):
+    """ time a cold start of the WSGI application in a new process
+
+    Args:
+        mode (str): key of ``MODES``
+        path (str, optional): path of the first request
+        settings (str, optional): DJANGO_SETTINGS_MODULE, the current one
+            by default
+        python (str, optional): interpreter, the current one by default
+        bytecode (bool, optional): False compiles every module from source
+            like on a host where no ``__pycache__`` was deployed
+
+    Raises:
+        RuntimeError: if the process fails
+
+    Returns:
+        dict: ``process_ms`` from spawning to exit, ``import_ms`` of the
+            WSGI module, ``first_response_ms``, response ``status``, number of
+            loaded ``modules`` and import time per package in ``packages``
+    """
+    env = {**os.environ, **MODES[mode]}
+    env["DJANGO_SETTINGS_MODULE"] = settings or os.environ.get("DJANGO_SETTINGS_MODULE", "time_tracker.settings")
+
+    with tempfile.TemporaryDirectory() as empty:
+        if not bytecode:
+            # an empty cache directory that is never written to
+            env.update(PYTHONPYCACHEPREFIX = empty, PYTHONDONTWRITEBYTECODE = "1")
+
+        started = time.perf_counter()
+        process = subprocess.run(
+                [python or sys.executable, "-X", "importtime", "-c", CHILD, path],
+                env = env,
+                cwd = BASE_DIR,
+                capture_output = True,
+                text = True,
+            )
+        elapsed = (time.perf_counter() - started) * 1000
+    if process.returncode != 0:
+        raise RuntimeError(f"cold start in {mode} mode failed:\n{process.stderr[-2000:]}")
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result["process_ms"] = elapsed
+    result["packages"] = package_times(process.stderr)
+    return result
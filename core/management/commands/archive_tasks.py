@@ -0,0 +1,64 @@
+import datetime
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import archive
+from core.models import Task
+
+UNITS = {"d": 1, "w": 7, "y": 365}
+
+
+def parse_age(value):
+    match = re.fullmatch(r"(\d+)([dwy]?)", value.strip())
+    if match is None:
+        raise CommandError(f"Invalid age {value!r}, expected e.g. 90d, 12w or 2y")
+    return datetime.timedelta(days=int(match[1]) * UNITS[match[2] or "d"])
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed tasks that ended more than --older-than ago from core_task "
+        "into the archive table, one bounded transaction per batch. Interrupted "
+        "runs resume where they stopped when started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=parse_age, required=True,
+                            help="age of the end of the tasks to archive, e.g. 365d, 52w or 2y")
+        parser.add_argument("--batch-size", type=int, default=1000, help="tasks moved per transaction")
+        parser.add_argument("--max-batches", type=int, help="stop after this many batches")
+        parser.add_argument("--sleep", type=float, default=0, help="seconds to pause between batches")
+        parser.add_argument("--database", default="default", help="database alias")
+        parser.add_argument("--dry-run", action="store_true", help="only count the tasks to archive")
+
+    def handle(self, *args, **options):
+        database = options["database"]
+        cutoff = timezone.now() - options["older_than"]
+
+        if options["dry_run"]:
+            count = Task.objects.using(database).filter(is_completed=True, end_at__lt=cutoff).count()
+            self.stdout.write(f"{count} tasks ended before {cutoff:%Y-%m-%d %H:%M} would be archived")
+            return
+
+        started = time.perf_counter()
+        total, batches, last_id = 0, 0, 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            moved, last_id = archive.archive_batch(
+                cutoff, batch_size=max(1, options["batch_size"]), after_id=last_id, using=database,
+            )
+            if not moved:
+                break
+
+            total += moved
+            batches += 1
+            self.stdout.write(f"batch {batches}: archived {moved} tasks up to id {last_id}")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"archived {total} tasks ended before {cutoff:%Y-%m-%d %H:%M} "
+            f"in {batches} batches and {time.perf_counter() - started:.2f}s"
+        ))
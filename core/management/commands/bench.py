@@ -0,0 +1,180 @@
+import datetime
+import json
+import platform
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core import rollups
+from core.cache import invalidate_task_summary
+from core.management.seed import seed_users, seed_tasks
+from core.management.timing import summarize, compare
+
+
+def parse_sizes(value):
+    try:
+        sizes = [int(size) for size in value.split(",") if size.strip()]
+    except ValueError:
+        sizes = []
+    if not sizes or min(sizes) < 1:
+        raise CommandError(f"Invalid sizes {value!r}, expected e.g. 100,1000,10000")
+    return sizes
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every User task method at several data sizes and report "
+        "throughput and p50/p95/p99 latencies as JSON. With --baseline the "
+        "command fails when a method got slower than --threshold percent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10, help="number of users to seed")
+        parser.add_argument("--sizes", type=parse_sizes, default=[100, 1000, 10000],
+                            help="comma separated tasks per user, one run per size")
+        parser.add_argument("--repeat", type=int, default=20, help="timed calls per method")
+        parser.add_argument("--seed", type=int, default=0, help="random seed")
+        parser.add_argument("--open-ratio", type=float, default=0.05, help="share of tasks without end_at")
+        parser.add_argument("--completed-ratio", type=float, default=0.6, help="share of closed tasks completed")
+        parser.add_argument("--database", default="default", help="database alias")
+        parser.add_argument("--output", help="write the results to this JSON file")
+        parser.add_argument("--baseline", help="JSON file of a previous run to compare against")
+        parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown in percent")
+        parser.add_argument("--metric", default="p95_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"],
+                            help="latency compared with the baseline")
+        parser.add_argument("--min-ms", type=float, default=0.5, help="timings below this never regress")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as stream:
+                    baseline = json.load(stream)["results"]
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        database = options["database"]
+        report = {
+            "meta": {
+                "vendor": connections[database].vendor,
+                "python": platform.python_version(),
+                "users": options["users"],
+                "sizes": options["sizes"],
+                "repeat": options["repeat"],
+                "seed": options["seed"],
+                "open_ratio": options["open_ratio"],
+                "completed_ratio": options["completed_ratio"],
+            },
+            "results": {},
+        }
+        for size in options["sizes"]:
+            report["results"][str(size)] = self.run_size(size, options)
+
+        if baseline is not None:
+            report["regressions"] = compare(
+                report["results"], baseline,
+                metric=options["metric"], threshold=options["threshold"], min_ms=options["min_ms"],
+            )
+
+        content = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as stream:
+                stream.write(content + "\n")
+        self.stdout.write(content)
+
+        if report.get("regressions"):
+            names = ", ".join(f"{r['name']}@{r['group']} {r['change_pct']:+.1f}%" for r in report["regressions"])
+            raise CommandError(
+                f"{len(report['regressions'])} regressions over {options['threshold']}% "
+                f"on {options['metric']}: {names}"
+            )
+
+    def run_size(self, size, options):
+        """ seed ``size`` tasks per user, time every method and roll back """
+        database = options["database"]
+        with transaction.atomic(using=database):
+            started = time.perf_counter()
+            users = seed_users(options["users"], prefix=f"bench-{size}", database=database)
+            seed_tasks(
+                users, size, seed=options["seed"], database=database,
+                open_ratio=options["open_ratio"], completed_ratio=options["completed_ratio"],
+            )
+            user = users[0]
+            today = rollups.local_day(timezone.now())
+            rollups.refresh(user.id, [today - datetime.timedelta(days=i) for i in range(367)], using=database)
+
+            with connections[database].cursor() as cursor:
+                cursor.execute("ANALYZE")
+            self.stderr.write(f"seeded {len(users)} x {size} tasks in {time.perf_counter() - started:.2f}s")
+
+            try:
+                results = {}
+                for name, call in self.calls(user, database).items():
+                    results[name] = self.measure(call, options["repeat"])
+            finally:
+                # the cache is not rolled back with the data
+                for seeded in users:
+                    invalidate_task_summary(seeded.id)
+                transaction.set_rollback(True, using=database)
+        return results
+
+    def calls(self, user, database):
+        """ the methods to time, writes are rolled back after every call """
+        now = timezone.now()
+        ids = list(user.get_tasks().values_list("id", flat=True)[:100])
+        cursor = user.get_tasks_page(size=50).next_cursor
+
+        def rolled_back(call):
+            def run():
+                sid = transaction.savepoint(using=database)
+                try:
+                    call()
+                finally:
+                    transaction.savepoint_rollback(sid, using=database)
+            return run
+
+        def cold_summary():
+            user.invalidate_task_summary()
+            user.get_task_summary()
+
+        reads = {
+            "get_task": lambda: user.get_task(id=ids[0]),
+            "get_tasks": lambda: list(user.get_tasks()),
+            "iter_tasks": lambda: sum(1 for _ in user.iter_tasks()),
+            "get_completed_tasks": lambda: list(user.get_completed_tasks()),
+            "get_active_tasks": lambda: list(user.get_active_tasks()),
+            "get_tasks_page": lambda: user.get_tasks_page(size=50),
+            "get_tasks_page_next": lambda: user.get_tasks_page(cursor=cursor, size=50),
+            "tasks_overlapping_week": lambda: list(user.tasks_overlapping(now - datetime.timedelta(days=7), now)),
+            "tasks_active_at": lambda: list(user.tasks_active_at(now - datetime.timedelta(days=1))),
+            "time_report_month": lambda: user.time_report(now - datetime.timedelta(days=30), now, now=now),
+            "rollup_report_year": lambda: user.rollup_report(now - datetime.timedelta(days=365), now, "month"),
+            "get_task_summary": user.get_task_summary,
+            "get_task_summary_cold": cold_summary,
+        }
+        writes = {
+            "create_task": lambda: user.create_task(name="bench", begin_at=now, end_at=now),
+            "create_tasks": lambda: user.create_tasks([{"name": "bench"}] * 100),
+            "update_task": lambda: user.update_task(id=ids[0], name="bench"),
+            "update_tasks": lambda: user.update_tasks(ids=ids, name="bench"),
+            "complete_task": lambda: user.complete_task(id=ids[0]),
+            "complete_tasks": lambda: user.complete_tasks(ids=ids),
+            "incomplete_task": lambda: user.incomplete_task(id=ids[0]),
+            "incomplete_tasks": lambda: user.incomplete_tasks(ids=ids),
+            "delete_task": lambda: user.delete_task(id=ids[0]),
+            "delete_tasks": lambda: user.delete_tasks(ids=ids),
+        }
+        return {**reads, **{name: rolled_back(call) for name, call in writes.items()}}
+
+    @staticmethod
+    def measure(call, repeat):
+        # one untimed call warms up caches and prepared plans
+        call()
+        timings = []
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        return summarize(timings)
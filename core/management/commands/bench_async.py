@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import JsonResponse
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from core import views
+from core.management.seed import seed_users, seed_tasks
+from core.management.timing import summarize
+from core.serializers import task_to_dict
+
+
+def sync_tasks_api(request):
+    """ sync twin of views.tasks_api (GET only) built on the sync task API """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "authentication required"}, status=401)
+
+    page = request.user.get_tasks_page(size=int(request.GET.get("size", 50)))
+    return JsonResponse({
+        "tasks": [task_to_dict(task) for task in page.tasks],
+        "next_cursor": page.next_cursor,
+    })
+
+
+async def async_tasks_api(request):
+    """ views.tasks_api (GET only) without its response cache, so that both
+    modes build every page and compare the task APIs rather than a cache hit """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "authentication required"}, status=401)
+
+    return await views._tasks_page(request, user)
+
+
+# URLconf used while benchmarking, see override_settings below
+urlpatterns = [
+    path("sync/", sync_tasks_api),
+    path("async/", async_tasks_api),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec and latency of the task list endpoint served by "
+        "sync WSGI, ASGI with the sync task API and ASGI with the async task API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="requests per mode")
+        parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients")
+        parser.add_argument("--tasks", type=int, default=2000, help="tasks of the benchmark user")
+        parser.add_argument("--size", type=int, default=50, help="tasks per page")
+        parser.add_argument("--json", action="store_true", help="print results as JSON")
+
+    def handle(self, *args, **options):
+        user = seed_users(1, prefix=f"bench-async-{int(time.time())}")[0]
+        seed_tasks([user], options["tasks"])
+
+        concurrency = max(1, options["concurrency"])
+        shares = [options["requests"] // concurrency + (i < options["requests"] % concurrency) for i in range(concurrency)]
+        query = {"size": options["size"]}
+
+        try:
+            with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=["testserver"]):
+                results = {
+                    "wsgi_sync": self.run_wsgi(user, "/sync/", query, shares),
+                    "asgi_sync": self.run_asgi(user, "/sync/", query, shares),
+                    "asgi_async": self.run_asgi(user, "/async/", query, shares),
+                }
+        finally:
+            user.delete()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'mode':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<12}{result['per_sec']:>10.1f}{result['p50_ms']:>10.2f}"
+                f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            )
+
+    @staticmethod
+    def run_wsgi(user, url, query, shares):
+        """ concurrent requests through the WSGI handler, one thread per client """
+        def worker(count):
+            client = Client()
+            client.force_login(user)
+            timings = []
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = client.get(url, query)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    assert response.status_code == 200, response.status_code
+            finally:
+                connection.close()
+            return timings
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(shares)) as pool:
+            timings = [t for result in pool.map(worker, shares) for t in result]
+        return summarize(timings, time.perf_counter() - started)
+
+    @staticmethod
+    def run_asgi(user, url, query, shares):
+        """ concurrent requests through the ASGI handler on one event loop """
+        clients = []
+        for _ in shares:
+            client = AsyncClient()
+            client.force_login(user)
+            clients.append(client)
+
+        async def worker(client, count):
+            timings = []
+            for _ in range(count):
+                started = time.perf_counter()
+                response = await client.get(url, query)
+                timings.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.status_code
+            return timings
+
+        async def run():
+            results = await asyncio.gather(*(worker(client, count) for client, count in zip(clients, shares)))
+            return [t for result in results for t in result]
+
+        started = time.perf_counter()
+        timings = asyncio.run(run())
+        return summarize(timings, time.perf_counter() - started)
@@ -0,0 +1,106 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.management.coldstart import MODES, measure
+from core.management.timing import summarize, compare
+
+TIMINGS = ("process_ms", "import_ms", "first_response_ms")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold starts of the WSGI application in fresh processes: "
+        "import time, time to the first response and import time per "
+        "package, in the default and the SERVERLESS settings mode. With "
+        "--baseline the command fails when a cold start got slower than "
+        "--threshold percent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="cold starts per mode")
+        parser.add_argument("--modes", default=",".join(MODES),
+                            help=f"comma separated settings modes, of {', '.join(MODES)}")
+        parser.add_argument("--path", default="/tasks/api/", help="path of the first request")
+        parser.add_argument("--no-bytecode", action="store_true",
+                            help="compile every module from source, as without a deployed __pycache__")
+        parser.add_argument("--top", type=int, default=15, help="packages listed per mode")
+        parser.add_argument("--output", help="write the results to this JSON file")
+        parser.add_argument("--baseline", help="JSON file of a previous run to compare against")
+        parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown in percent")
+        parser.add_argument("--metric", default="p50_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"],
+                            help="latency compared with the baseline")
+        parser.add_argument("--min-ms", type=float, default=5.0, help="timings below this never regress")
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if not modes or unknown:
+            raise CommandError(f"Invalid modes {options['modes']!r}, expected some of {', '.join(MODES)}")
+
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as stream:
+                    baseline = json.load(stream)["results"]
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "repeat": options["repeat"],
+                "path": options["path"],
+                "bytecode": not options["no_bytecode"],
+            },
+            "results": {},
+            "packages": {},
+            "modules": {},
+        }
+        for mode in modes:
+            self.run_mode(mode, options, report)
+
+        if baseline is not None:
+            report["regressions"] = compare(
+                report["results"], baseline,
+                metric=options["metric"], threshold=options["threshold"], min_ms=options["min_ms"],
+            )
+
+        content = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as stream:
+                stream.write(content + "\n")
+        self.stdout.write(content)
+
+        if report.get("regressions"):
+            names = ", ".join(f"{r['name']}@{r['group']} {r['change_pct']:+.1f}%" for r in report["regressions"])
+            raise CommandError(
+                f"{len(report['regressions'])} regressions over {options['threshold']}% "
+                f"on {options['metric']}: {names}"
+            )
+
+    def run_mode(self, mode, options, report):
+        """ cold start the application ``--repeat`` times in one mode """
+        runs = []
+        for _ in range(max(1, options["repeat"])):
+            try:
+                runs.append(measure(mode, path=options["path"], bytecode=not options["no_bytecode"]))
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+        statuses = {run["status"] for run in runs}
+        if any(status >= 500 for status in statuses):
+            raise CommandError(f"first request to {options['path']} failed in {mode} mode with {statuses}")
+        self.stderr.write(f"{mode}: {len(runs)} cold starts, status {', '.join(map(str, sorted(statuses)))}")
+
+        report["results"][mode] = {name: summarize([run[name] for run in runs]) for name in TIMINGS}
+        report["modules"][mode] = max(run["modules"] for run in runs)
+
+        # mean import time per package, slowest first
+        packages = {}
+        for run in runs:
+            for package, ms in run["packages"].items():
+                packages[package] = packages.get(package, 0.0) + ms / len(runs)
+        slowest = sorted(packages.items(), key=lambda item: -item[1])[:options["top"]]
+        report["packages"][mode] = {package: round(ms, 3) for package, ms in slowest}
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import changes
+from core.purge import DELETE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Shrink the task change log read by delta sync: changes followed by a newer "
+        "change of the same task, and changes older than TASK_CHANGES_RETENTION_DAYS, "
+        "are deleted in small committed chunks. Run it daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=DELETE_CHUNK_SIZE, help="rows deleted per transaction")
+        parser.add_argument("--sleep", type=float, default=0, help="seconds to pause between chunks")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        deleted = changes.compact(
+            chunk_size=max(1, options["chunk_size"]),
+            sleep=options["sleep"],
+            progress=lambda name, total: self.stdout.write(f"{total} {name} changes deleted"),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"deleted {deleted['expired']} expired and {deleted['superseded']} superseded changes "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
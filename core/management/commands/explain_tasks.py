@@ -0,0 +1,113 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from core.management.seed import seed_users, seed_tasks
+from core.pagination import after_cursor
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed realistic task data and print EXPLAIN plans and timings for "
+        "the User task methods. The data is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5, help="number of users to seed")
+        parser.add_argument("--tasks", type=int, default=20000, help="tasks per user")
+        parser.add_argument("--repeat", type=int, default=5, help="timed runs per method")
+        parser.add_argument("--seed", type=int, default=0, help="random seed")
+        parser.add_argument("--database", default="default", help="database alias")
+        parser.add_argument("--keep", action="store_true", help="keep the seeded data")
+
+    def handle(self, *args, **options):
+        database = options["database"]
+        vendor = connections[database].vendor
+
+        with transaction.atomic(using=database):
+            started = time.perf_counter()
+            users = seed_users(options["users"], prefix="explain", database=database)
+            total = seed_tasks(users, options["tasks"], seed=options["seed"], database=database)
+            self.stdout.write(
+                f"seeded {total} tasks for {len(users)} users on {vendor} "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+
+            # refresh planner statistics so plans match a settled database
+            with connections[database].cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            user = users[0]
+            self.explain_reads(user, database, options["repeat"])
+            self.time_writes(user, database, options["repeat"])
+
+            if not options["keep"]:
+                transaction.set_rollback(True, using=database)
+
+    def explain_reads(self, user, database, repeat):
+        """ print the plan and the median runtime of every read method """
+        first_page = user.get_tasks_page(size=50)
+        cursor = first_page.next_cursor
+
+        methods = {
+            "get_task": (
+                user.tasks.filter(id=first_page.tasks[0].id),
+                lambda: user.get_task(id=first_page.tasks[0].id),
+            ),
+            "get_tasks": (user.get_tasks(), lambda: list(user.get_tasks())),
+            "get_tasks_page": (
+                after_cursor(user.get_tasks(), cursor)[:51],
+                lambda: user.get_tasks_page(cursor=cursor),
+            ),
+            "get_completed_tasks": (
+                user.get_completed_tasks(), lambda: list(user.get_completed_tasks())
+            ),
+            "get_active_tasks": (
+                user.get_active_tasks(), lambda: list(user.get_active_tasks())
+            ),
+        }
+
+        for name, (queryset, call) in methods.items():
+            timing = self.median(repeat, call)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}  ({timing:.2f} ms)"))
+            self.stdout.write(queryset.explain())
+
+    def time_writes(self, user, database, repeat):
+        """ print the median runtime of every mutation method, each run rolled back """
+        ids = list(user.get_tasks().values_list("id", flat=True)[:100])
+        calls = {
+            "create_task": lambda: user.create_task(name="explain"),
+            "create_tasks": lambda: user.create_tasks([{"name": "explain"}] * 100),
+            "update_task": lambda: user.update_task(id=ids[0], name="explain"),
+            "update_tasks": lambda: user.update_tasks(ids=ids, name="explain"),
+            "complete_task": lambda: user.complete_task(id=ids[0]),
+            "complete_tasks": lambda: user.complete_tasks(ids=ids),
+            "incomplete_task": lambda: user.incomplete_task(id=ids[0]),
+            "incomplete_tasks": lambda: user.incomplete_tasks(ids=ids),
+            "delete_task": lambda: user.delete_task(id=ids[0]),
+            "delete_tasks": lambda: user.delete_tasks(ids=ids),
+        }
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nmutations (rolled back)"))
+        for name, call in calls.items():
+            timing = self.median(repeat, lambda call=call: self.rolled_back(call, database))
+            self.stdout.write(f"  {name:<20} {timing:8.2f} ms")
+
+    @staticmethod
+    def rolled_back(call, database):
+        sid = transaction.savepoint(using=database)
+        try:
+            call()
+        finally:
+            transaction.savepoint_rollback(sid, using=database)
+
+    @staticmethod
+    def median(repeat, call):
+        timings = []
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,108 @@
+import gzip
+import sys
+import time
+
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import User
+from core.serializers import FORMATS, guess_format, read_rows, parse_task_row, validate_task
+
+
+def chunked(iterable, size):
+    """ split an iterable into lists of at most ``size`` items """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream tasks from a CSV or NDJSON file into a user's history. Rows are "
+        "validated like Task.save() and inserted in batches, committing every "
+        "--commit-every rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="input file, '-' for stdin, .gz files are decompressed")
+        parser.add_argument("--user", required=True, help="username owning the imported tasks")
+        parser.add_argument("--format", choices=FORMATS, help="input format, guessed from the file name by default")
+        parser.add_argument("--batch-size", type=int, default=1000, help="rows per INSERT statement")
+        parser.add_argument("--commit-every", type=int, default=20000, help="rows per transaction")
+        parser.add_argument("--skip-invalid", action="store_true", help="report invalid rows and keep going")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+
+        path = options["path"]
+        format = options["format"] or guess_format(path)
+        batch_size = max(1, options["batch_size"])
+        commit_every = max(batch_size, options["commit_every"])
+
+        self.skip_invalid = options["skip_invalid"]
+        self.skipped = 0
+        self.imported = 0
+
+        stream = self.open(path)
+        try:
+            rows = self.validated(user, read_rows(stream, format))
+            self.load(user, rows, batch_size, commit_every)
+        except ValueError as exc:
+            raise CommandError(f"{exc} ({self.imported} rows committed before the error)")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        message = f"imported {self.imported} tasks for {user.username}"
+        if self.skipped:
+            message += f", skipped {self.skipped} invalid rows"
+        self.stdout.write(self.style.SUCCESS(message))
+
+    @staticmethod
+    def open(path):
+        if path == "-":
+            return sys.stdin
+        if path.endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8", newline="")
+        return open(path, encoding="utf-8", newline="")
+
+    def validated(self, user, rows):
+        """ yield task fields of valid rows, applying the rules of Task.save """
+        for line_no, row in rows:
+            try:
+                task = parse_task_row(row)
+                validate_task(task, user)
+            except ValueError as exc:
+                error = str(exc)
+                if not self.skip_invalid:
+                    raise ValueError(f"line {line_no}: {error}")
+                self.skipped += 1
+                self.stderr.write(f"line {line_no}: {error}")
+                continue
+            yield task
+
+    def load(self, user, rows, batch_size, commit_every):
+        """ insert rows in bounded transactions and report the throughput """
+        started = time.perf_counter()
+
+        while True:
+            committed = 0
+            with transaction.atomic():
+                for batch in chunked(islice(rows, commit_every), batch_size):
+                    user.create_tasks(batch, batch_size=batch_size)
+                    committed += len(batch)
+
+            if not committed:
+                break
+
+            self.imported += committed
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{self.imported} rows committed ({self.imported / elapsed:,.0f} rows/sec)")
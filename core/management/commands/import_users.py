@@ -0,0 +1,91 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from core.models import User
+from core.passwords import worker_count
+from core.serializers import FORMATS, USER_FIELDS, guess_format, read_rows, parse_user_row, validate_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV or NDJSON file with the columns "
+        f"{', '.join(USER_FIELDS)}. Passwords are hashed across a pool of "
+        "processes and users inserted in batches, one transaction each. "
+        "NDJSON rows may carry a list of their own tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="input file, '-' for stdin, .gz files are decompressed")
+        parser.add_argument("--format", choices=FORMATS, help="input format, guessed from the file name by default")
+        parser.add_argument("--batch-size", type=int, default=1000, help="users per transaction")
+        parser.add_argument("--workers", type=int, help="password hashing processes, one per CPU by default")
+        parser.add_argument("--initial-task", action="append", default=[], metavar="NAME",
+                            help="name of a task created for every user, may be repeated")
+        parser.add_argument("--skip-existing", action="store_true", help="leave out usernames already taken")
+        parser.add_argument("--skip-invalid", action="store_true", help="report invalid rows and keep going")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or guess_format(path)
+        workers = worker_count(options["workers"])
+        initial_tasks = [{"name": name} for name in options["initial_task"]]
+
+        self.skip_invalid = options["skip_invalid"]
+        self.skipped = 0
+        self.created = 0
+        started = time.perf_counter()
+
+        def progress(created):
+            self.created = created
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{created} users committed ({created / elapsed:,.1f} users/sec)")
+
+        stream = self.open(path)
+        try:
+            users = User.objects.bulk_create_users(
+                self.validated(read_rows(stream, format)),
+                initial_tasks=initial_tasks,
+                batch_size=max(1, options["batch_size"]),
+                workers=workers,
+                skip_existing=options["skip_existing"],
+                progress=progress,
+            )
+        except (IntegrityError, ValueError) as exc:
+            raise CommandError(f"{exc} ({self.created} users committed before the error)")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        rate = len(users) / elapsed if elapsed else 0.0
+        message = f"imported {len(users)} users in {elapsed:.1f}s ({rate:,.1f} users/sec, {workers} workers)"
+        if self.skipped:
+            message += f", skipped {self.skipped} invalid rows"
+        self.stdout.write(self.style.SUCCESS(message))
+
+    @staticmethod
+    def open(path):
+        if path == "-":
+            return sys.stdin
+        if path.endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8", newline="")
+        return open(path, encoding="utf-8", newline="")
+
+    def validated(self, rows):
+        """ yield user fields of valid rows """
+        for line_no, row in rows:
+            try:
+                user = parse_user_row(row)
+                validate_user(user)
+            except ValueError as exc:
+                error = str(exc)
+                if not self.skip_invalid:
+                    raise ValueError(f"line {line_no}: {error}")
+                self.skipped += 1
+                self.stderr.write(f"line {line_no}: {error}")
+                continue
+            yield user
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+from core.purge import DELETE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete users with large task histories: their tasks, archived tasks, "
+        "rollups and task changes go first in small committed chunks, then the user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="+", help="users to delete")
+        parser.add_argument("--chunk-size", type=int, default=DELETE_CHUNK_SIZE, help="rows deleted per transaction")
+        parser.add_argument("--sleep", type=float, default=0, help="seconds to pause between chunks")
+        parser.add_argument("--dry-run", action="store_true", help="only count the rows to delete")
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__in=options["usernames"]))
+        missing = set(options["usernames"]) - {user.username for user in users}
+        if missing:
+            raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        for user in users:
+            if options["dry_run"]:
+                self.stdout.write(
+                    f"{user.username}: {user.tasks.count()} tasks, {user.archived_tasks.count()} archived, "
+                    f"{user.daily_rollups.count()} rollups, {user.task_changes.count()} changes"
+                )
+                continue
+
+            started = time.perf_counter()
+            deleted = user.purge(
+                chunk_size=max(1, options["chunk_size"]),
+                sleep=options["sleep"],
+                progress=lambda name, total, user=user: self.stdout.write(f"{user.username}: {total} {name} deleted"),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"deleted {user.username} with {deleted['tasks']} tasks, {deleted['archived_tasks']} archived, "
+                f"{deleted['daily_rollups']} rollups and {deleted['task_changes']} changes "
+                f"in {time.perf_counter() - started:.2f}s"
+            ))
@@ -0,0 +1,120 @@
+import datetime
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date
+
+from core import rollups
+from core.models import User, Task, TaskArchive, DailyTaskRollup
+
+
+def parse_day(value):
+    day = parse_date(value)
+    if day is None:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+    return day
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute DailyTaskRollup rows from raw tasks to repair drift. Work is "
+        "split into per-user chunks of days that run in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=parse_day, help="first day to rebuild, YYYY-MM-DD")
+        parser.add_argument("--until", type=parse_day, help="last day to rebuild, YYYY-MM-DD")
+        parser.add_argument("--user", action="append", help="username to rebuild, repeatable")
+        parser.add_argument("--chunk-days", type=int, default=31, help="days recomputed per query")
+        parser.add_argument("--workers", type=int, default=4, help="parallel database connections")
+
+    def handle(self, *args, **options):
+        since, until = options["since"], options["until"]
+        if since and until and since > until:
+            raise CommandError("--since must not be after --until")
+
+        users = User.objects.all()
+        if options["user"]:
+            users = users.filter(username__in=options["user"])
+        jobs = self.plan(users, since, until, max(1, options["chunk_days"]))
+
+        workers = options["workers"]
+        if connection.vendor == "sqlite":
+            # SQLite allows a single writer at a time
+            workers = 1
+
+        started = time.perf_counter()
+        if workers <= 1:
+            for job in jobs:
+                self.run(*job)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for future in as_completed([pool.submit(self.run_in_thread, *job) for job in jobs]):
+                    future.result()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"rebuilt {len(jobs)} chunks for {users.count()} users in {time.perf_counter() - started:.2f}s"
+        ))
+
+    def plan(self, users, since, until, chunk_days):
+        """ split the days holding tasks of every user into chunks
+
+        Rollups outside of the rebuilt days are removed when no explicit
+        range is given, as they cannot belong to any task.
+        """
+        spans = {}
+        # archived tasks keep their rollups
+        for model in (Task, TaskArchive):
+            for row in model.objects.filter(
+                created_by__in=users
+            ).values(
+                "created_by"
+            ).annotate(
+                first=models.Min("begin_at"),
+                last=models.Max(Coalesce("end_at", "begin_at")),
+            ):
+                first, last = spans.get(row["created_by"], (row["first"], row["last"]))
+                spans[row["created_by"]] = (min(first, row["first"]), max(last, row["last"]))
+
+        jobs = []
+        for user_id in users.values_list("id", flat=True).iterator():
+            if user_id not in spans:
+                first = last = None
+            else:
+                first = rollups.local_day(spans[user_id][0])
+                last = rollups.local_day(spans[user_id][1])
+
+            if since is None and until is None:
+                stale = DailyTaskRollup.objects.filter(user_id=user_id)
+                if first is not None:
+                    stale = stale.exclude(day__range=(first, last))
+                stale.delete()
+
+            first = since or first
+            last = until or last
+            if first is None or last is None:
+                continue
+
+            day = first
+            while day <= last:
+                end = min(day + datetime.timedelta(days=chunk_days - 1), last)
+                jobs.append((user_id, day, end))
+                day = end + datetime.timedelta(days=1)
+        return jobs
+
+    @staticmethod
+    def run(user_id, first, last):
+        days = [first + datetime.timedelta(days=i) for i in range((last - first).days + 1)]
+        with transaction.atomic():
+            rollups.refresh(user_id, days)
+
+    def run_in_thread(self, user_id, first, last):
+        try:
+            self.run(user_id, first, last)
+        finally:
+            # every worker thread opens its own connection
+            connection.close()
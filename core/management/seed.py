@@ -0,0 +1,106 @@
+import random
+
+from datetime import timedelta
+
+from django.db import models
+from django.utils import timezone
+
+from core.models import User, Task
+
+
+def seed_users(count, prefix = "seed", database = "default"):
+    """ create users for synthetic workloads
+
+    Passwords are left unusable, hashing them would dominate seeding time.
+
+    Args:
+        count (int): number of users to create
+        prefix (str, optional): username prefix
+        database (str, optional): database alias
+
+    Returns:
+        List[User]: created users
+    """
+    users = [
+        User(username = f"{prefix}-{i}", email = f"{prefix}-{i}@example.com", password = "!")
+        for i in range(count)
+    ]
+    return User.objects.using(database).bulk_create(users, batch_size = 1000)
+
+
+def random_task(user, rng, now, history_days = 365, open_ratio = 0.05, completed_ratio = 0.6):
+    """ build one unsaved task with a realistic interval
+
+    Most tasks are closed intervals of a few minutes to a working day
+    spread over ``history_days``; ``open_ratio`` of them have no end yet.
+
+    Args:
+        user (User): owner of the task
+        rng (random.Random): random source
+        now (datetime): reference instant
+        history_days (int, optional): how far back tasks begin
+        open_ratio (float, optional): share of tasks without end_at
+        completed_ratio (float, optional): share of closed tasks completed
+
+    Returns:
+        Task: unsaved Task object
+    """
+    begin_at = now - timedelta(seconds = rng.randint(0, history_days * 86400))
+    end_at = None
+    is_completed = False
+
+    if rng.random() >= open_ratio:
+        end_at = begin_at + timedelta(minutes = rng.randint(5, 8 * 60))
+        is_completed = rng.random() < completed_ratio
+
+    return Task(
+        name = f"task {rng.randint(0, 10 ** 6)}",
+        description = rng.choice([None, "", "meeting", "review", "deep work"]),
+        created_by = user,
+        is_completed = is_completed,
+        begin_at = begin_at,
+        end_at = end_at,
+    )
+
+
+def seed_tasks(users, per_user, seed = 0, batch_size = 5000, database = "default", **options):
+    """ bulk insert ``per_user`` random tasks for every user
+
+    ``created_at`` is rewritten to ``begin_at`` afterwards so the history
+    is spread out in time like real data instead of sharing one instant.
+
+    Args:
+        users (List[User]): owners of the tasks
+        per_user (int): number of tasks per user
+        seed (int, optional): random seed, for reproducible data sets
+        batch_size (int, optional): rows per INSERT
+        database (str, optional): database alias
+        **options (dict): forwarded to ``random_task``
+
+    Returns:
+        int: number of created tasks
+    """
+    if not users:
+        return 0
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    manager = Task.objects.using(database)
+
+    batch, total = [], 0
+    for user in users:
+        for _ in range(per_user):
+            batch.append(random_task(user, rng, now, **options))
+            if len(batch) >= batch_size:
+                manager.bulk_create(batch)
+                total += len(batch)
+                batch = []
+    if batch:
+        manager.bulk_create(batch)
+        total += len(batch)
+
+    ids = [user.id for user in users]
+    manager.filter(
+            created_by_id__gte = min(ids), created_by_id__lte = max(ids)
+        ).update(created_at = models.F('begin_at'))
+    return total
@@ -0,0 +1,82 @@
+import statistics
+
+
+def percentile(samples, p):
+    """ p-th percentile of samples with linear interpolation
+
+    Args:
+        samples (List[float]): measurements
+        p (float): percentile between 0 and 100
+
+    Returns:
+        float: percentile value
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples_ms, elapsed = None):
+    """ latency summary of a list of timings in milliseconds
+
+    Args:
+        samples_ms (List[float]): latencies in milliseconds
+        elapsed (float, optional): wall clock seconds of the whole run,
+            used for the throughput instead of the sum of latencies
+
+    Returns:
+        dict: count, throughput per second and mean/p50/p95/p99 latencies
+    """
+    elapsed = elapsed or sum(samples_ms) / 1000
+    return {
+        "count": len(samples_ms),
+        "per_sec": round(len(samples_ms) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+    }
+
+
+def compare(results, baseline, metric = "p95_ms", threshold = 20.0, min_ms = 0.5):
+    """ find the measurements that got slower than a baseline
+
+    Both arguments map a group (e.g. a data size) to ``{name: summary}`` as
+    returned by ``summarize``. Entries missing on either side are ignored,
+    as are timings under ``min_ms`` on both sides, which are mostly noise.
+
+    Args:
+        results (dict): current measurements
+        baseline (dict): reference measurements
+        metric (str, optional): summary key to compare
+        threshold (float, optional): allowed slowdown in percent
+        min_ms (float, optional): timings below this are never a regression
+
+    Returns:
+        List[dict]: group, name, baseline, current and change in percent of
+            every regression, worst first
+    """
+    regressions = []
+    for group, summaries in results.items():
+        for name, summary in summaries.items():
+            reference = baseline.get(group, {}).get(name)
+            if reference is None or metric not in reference or metric not in summary:
+                continue
+
+            before, after = reference[metric], summary[metric]
+            if max(before, after) < min_ms:
+                continue
+            change = (after - before) / before * 100 if before else float("inf")
+            if change > threshold:
+                regressions.append({
+                    "group": group,
+                    "name": name,
+                    "baseline": before,
+                    "current": after,
+                    "change_pct": round(change, 1),
+                })
+    return sorted(regressions, key = lambda regression: -regression["change_pct"])
@@ -0,0 +1,362 @@
+import bisect
+import functools
+import inspect
+import random
+import threading
+import time
+
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# upper bounds of the histogram buckets, +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# label value standing for everything beyond the series limit of a metric
+OVERFLOW = '__other__'
+UNMATCHED = '<unmatched>'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra = ()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """ metric with a bounded number of label sets
+
+    Once ``max_series`` label sets exist, new ones are folded into a single
+    series whose labels are all ``__other__``, so a flood of distinct
+    values cannot grow memory.
+    """
+    kind = None
+
+    def __init__(self, name, help, labels = (), max_series = 500):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.max_series = max_series
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _new(self):
+        raise NotImplementedError
+
+    def _get(self, values):
+        # called with the lock held
+        series = self._series.get(values)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                values = (OVERFLOW, ) * len(self.labels)
+                series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = self._new()
+        return series
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def samples(self):
+        """ (suffix, label values, extra labels, value) of every sample """
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for suffix, values, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_labels(self.labels, values, extra)} {_number(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new(self):
+        return [0]
+
+    def inc(self, *values, amount = 1):
+        with self._lock:
+            self._get(values)[0] += amount
+
+    def samples(self):
+        with self._lock:
+            series = sorted((values, counter[0]) for values, counter in self._series.items())
+        return [('_total', values, (), value) for values, value in series]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels = (), buckets = LATENCY_BUCKETS, **kwargs):
+        super().__init__(name, help, labels, **kwargs)
+        self.buckets = tuple(buckets)
+
+    def _new(self):
+        # per bucket counts (not cumulative), then the sum
+        return [0] * (len(self.buckets) + 1) + [0]
+
+    def observe(self, value, *values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._get(values)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = sorted((values, list(counts)) for values, counts in self._series.items())
+
+        samples = []
+        for values, counts in series:
+            total = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                total += count
+                samples.append(('_bucket', values, (('le', _number(bound)), ), total))
+            samples.append(('_sum', values, (), counts[-1]))
+            samples.append(('_count', values, (), total))
+        return samples
+
+
+class Registry:
+    """ metrics of the current process
+
+    Every worker process keeps its own registry, scrape each of them or
+    aggregate them in Prometheus.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def clear(self):
+        for metric in self.metrics.values():
+            metric.clear()
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self.metrics.values()) + '\n'
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+        'http_request_duration_seconds', 'Latency of HTTP requests by URL pattern.',
+        labels = ('route', 'method'),
+    ))
+responses = registry.register(Counter(
+        'http_responses', 'HTTP responses by URL pattern and status code.',
+        labels = ('route', 'method', 'status'),
+    ))
+request_queries = registry.register(Histogram(
+        'http_request_db_queries', 'Database queries per sampled HTTP request.',
+        labels = ('route', ), buckets = QUERY_BUCKETS,
+    ))
+request_db_duration = registry.register(Histogram(
+        'http_request_db_duration_seconds', 'Time spent in the database per sampled HTTP request.',
+        labels = ('route', ),
+    ))
+task_method_duration = registry.register(Histogram(
+        'task_method_duration_seconds', 'Latency of the User task methods.',
+        labels = ('method', ),
+    ))
+
+
+class QueryStats:
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# stats of the sampled request being served, copied into the threads of
+# sync_to_async so that the queries of async views are counted too
+_current = ContextVar('core_metrics_query_stats', default = None)
+
+
+def record_query(execute, sql, params, many, context):
+    """ execute wrapper adding every query to the stats of the current request """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """ ``connection_created`` receiver adding ``record_query`` to a connection
+
+    A single wrapper installed per connection, instead of one
+    ``connection.execute_wrapper()`` block per request, also sees the
+    queries that async views run from other threads. It goes first so
+    that popping a temporary wrapper never removes it.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def sample_rate():
+    return getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED
+    return match.route or match.view_name or UNMATCHED
+
+
+class MetricsMiddleware:
+    """ record latency, status and database usage of every request by URL pattern
+
+    Latency and status are recorded for every request. Query counts and
+    database time are recorded for a ``METRICS_SAMPLE_RATE`` share of
+    requests only, as they cost a wrapper call per query.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.sample_rate = sample_rate()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        self._finish(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        self._finish(request, response, stats, started)
+        return response
+
+    def _start(self):
+        stats = token = None
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            stats = QueryStats()
+            token = _current.set(stats)
+        return stats, token, time.perf_counter()
+
+    def _finish(self, request, response, stats, started):
+        elapsed = time.perf_counter() - started
+        route = _route(request)
+        method = request.method if request.method in HTTP_METHODS else 'other'
+
+        request_duration.observe(elapsed, route, method)
+        responses.inc(route, method, str(response.status_code))
+        if stats is not None:
+            request_queries.observe(stats.queries, route)
+            request_db_duration.observe(stats.seconds, route)
+
+
+def timed(name):
+    """ decorator recording the latency of a function in ``task_method_duration``
+
+    Generators are timed until they are exhausted or closed.
+
+    Args:
+        name (str): value of the ``method`` label
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    yield from func(*args, **kwargs)
+                finally:
+                    task_method_duration.observe(time.perf_counter() - started, name)
+
+        elif iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    task_method_duration.observe(time.perf_counter() - started, name)
+
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    task_method_duration.observe(time.perf_counter() - started, name)
+
+        wrapper.__timed__ = True
+        return wrapper
+    return decorator
+
+
+def instrument(cls, keyword = 'task'):
+    """ time the public methods of a class whose name contains ``keyword``
+
+    Args:
+        cls (type): class to instrument in place
+        keyword (str): part of the method names to time
+
+    Returns:
+        List[str]: names of the instrumented methods
+    """
+    names = []
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or keyword not in name or not inspect.isfunction(func):
+            continue
+        if getattr(func, '__timed__', False):
+            continue
+        setattr(cls, name, timed(f'{cls.__name__}.{name}')(func))
+        names.append(name)
+    return names
+
+
+def render():
+    """ metrics of this process in the Prometheus text exposition format """
+    return registry.render()
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:58
+
+from django.db import migrations, models
+
+
+def create_span_index(apps, schema_editor):
+    """ GiST index over tstzrange(begin_at, end_at), PostgreSQL only """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS task_user_span_gist ON core_task "
+        "USING gist (created_by_id, tstzrange(begin_at, end_at, '[]'))"
+    )
+
+
+def drop_span_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS task_user_span_gist")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_dailytaskrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_by', 'end_at', 'begin_at'], name='task_user_end_idx'),
+        ),
+        migrations.RunPython(create_span_index, drop_span_index),
+    ]
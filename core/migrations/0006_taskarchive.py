@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_task_interval_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_completed', models.BooleanField(default=True)),
+                ('begin_at', models.DateTimeField()),
+                ('end_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_by', '-created_at', '-id'], name='archive_user_created_idx'), models.Index(fields=['created_by', 'end_at', 'begin_at'], name='archive_user_end_idx'), models.Index(fields=['end_at'], name='archive_end_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import DatabaseError, migrations
+
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_task_fts USING fts5("
+    "name, description, content='core_task', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER IF NOT EXISTS core_task_fts_insert AFTER INSERT ON core_task BEGIN "
+    "INSERT INTO core_task_fts(rowid, name, description) VALUES (new.id, new.name, new.description); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS core_task_fts_delete AFTER DELETE ON core_task BEGIN "
+    "INSERT INTO core_task_fts(core_task_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS core_task_fts_update AFTER UPDATE OF name, description ON core_task BEGIN "
+    "INSERT INTO core_task_fts(core_task_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO core_task_fts(rowid, name, description) VALUES (new.id, new.name, new.description); "
+    "END",
+
+    "INSERT INTO core_task_fts(core_task_fts) VALUES ('rebuild')",
+]
+
+
+def search_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    # same expression as core.search.task_vector()
+    return GinIndex(
+        SearchVector('name', weight='A', config='simple') + SearchVector('description', weight='B', config='simple'),
+        name='task_search_gin',
+    )
+
+
+def create_search_index(apps, schema_editor):
+    """ GIN index on PostgreSQL, FTS5 table kept in sync by triggers on SQLite """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.add_index(apps.get_model("core", "Task"), search_index())
+    elif vendor == "sqlite":
+        try:
+            for statement in SQLITE_FTS:
+                schema_editor.execute(statement)
+        except DatabaseError:
+            # SQLite built without FTS5, search falls back to a scan
+            pass
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model("core", "Task"), search_index())
+    elif vendor == "sqlite":
+        for name in ("insert", "delete", "update"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS core_task_fts_{name}")
+        schema_editor.execute("DROP TABLE IF EXISTS core_task_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_taskarchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recurringtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete'), ('archive', 'Archive')], max_length=7)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='change_user_id_idx'), models.Index(fields=['task_id', 'id'], name='change_task_id_idx'), models.Index(fields=['changed_at'], name='change_changed_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# changed_at with the precision Django stores, in UTC like USE_TZ
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS core_task_log_insert AFTER INSERT ON core_task BEGIN "
+    "INSERT INTO core_taskchange(user_id, task_id, kind, changed_at) "
+    f"VALUES (new.created_by_id, new.id, 'upsert', {SQLITE_NOW}); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS core_task_log_update AFTER UPDATE ON core_task BEGIN "
+    # a task handed to another user is gone for its previous owner
+    "INSERT INTO core_taskchange(user_id, task_id, kind, changed_at) "
+    f"SELECT old.created_by_id, old.id, 'delete', {SQLITE_NOW} WHERE old.created_by_id <> new.created_by_id; "
+    "INSERT INTO core_taskchange(user_id, task_id, kind, changed_at) "
+    f"VALUES (new.created_by_id, new.id, 'upsert', {SQLITE_NOW}); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS core_task_log_delete AFTER DELETE ON core_task BEGIN "
+    "INSERT INTO core_taskchange(user_id, task_id, kind, changed_at) "
+    f"VALUES (old.created_by_id, old.id, 'delete', {SQLITE_NOW}); "
+    "END",
+]
+
+# one INSERT per statement from its transition tables, clock_timestamp()
+# rather than now() as the lag of changes_since() counts from the write
+POSTGRES_TRIGGERS = [
+    "CREATE OR REPLACE FUNCTION core_task_log_insert() RETURNS trigger AS $$ BEGIN "
+    "INSERT INTO core_taskchange(user_id, task_id, kind, changed_at) "
+    "SELECT created_by_id, id, 'upsert', clock_timestamp() FROM new_rows ORDER BY id; "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql",
+
+    "CREATE OR REPLACE FUNCTION core_task_log_update() RETURNS trigger AS $$ BEGIN "
+    "INSERT INTO core_taskchange(user_id, task_id, kind, changed_at) "
+    "SELECT old_rows.created_by_id, old_rows.id, 'delete', clock_timestamp() "
+    "FROM old_rows JOIN new_rows ON new_rows.id = old_rows.id "
+    "WHERE old_rows.created_by_id <> new_rows.created_by_id ORDER BY old_rows.id; "
+    "INSERT INTO core_taskchange(user_id, task_id, kind, changed_at) "
+    "SELECT created_by_id, id, 'upsert', clock_timestamp() FROM new_rows ORDER BY id; "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql",
+
+    "CREATE OR REPLACE FUNCTION core_task_log_delete() RETURNS trigger AS $$ BEGIN "
+    "INSERT INTO core_taskchange(user_id, task_id, kind, changed_at) "
+    "SELECT created_by_id, id, 'delete', clock_timestamp() FROM old_rows ORDER BY id; "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql",
+
+    "CREATE TRIGGER core_task_log_insert AFTER INSERT ON core_task "
+    "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION core_task_log_insert()",
+
+    "CREATE TRIGGER core_task_log_update AFTER UPDATE ON core_task "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION core_task_log_update()",
+
+    "CREATE TRIGGER core_task_log_delete AFTER DELETE ON core_task "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION core_task_log_delete()",
+]
+
+
+def create_change_triggers(apps, schema_editor):
+    """ log task writes in the statement writing them, see changes.logged_by_triggers() """
+    vendor = schema_editor.connection.vendor
+    statements = {"postgresql": POSTGRES_TRIGGERS, "sqlite": SQLITE_TRIGGERS}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_change_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name in ("insert", "update", "delete"):
+        if vendor == "postgresql":
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS core_task_log_{name} ON core_task")
+            schema_editor.execute(f"DROP FUNCTION IF EXISTS core_task_log_{name}()")
+        elif vendor == "sqlite":
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS core_task_log_{name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_taskchange'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskchange',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_changes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(create_change_triggers, drop_change_triggers),
+    ]
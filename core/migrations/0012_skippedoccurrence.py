@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_task_change_triggers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkippedOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurrence_at', models.DateTimeField()),
+                ('recurrence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skipped', to='core.recurringtask')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('recurrence', 'occurrence_at'), name='skipped_occurrence_unique')],
+            },
+        ),
+    ]
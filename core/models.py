@@ -1,21 +1,160 @@
-from django.db import models
+from itertools import islice
 
-from django.contrib.auth.models import UserManager, AbstractBaseUser, PermissionsMixin
+from asgiref.sync import sync_to_async
+
+from django.db import IntegrityError, models, router, transaction
+
+from django.contrib.auth.models import UserManager as DjangoUserManager, AbstractBaseUser, PermissionsMixin
 from django.contrib.auth.validators import UnicodeUsernameValidator
-from django.contrib.auth.hashers import make_password
 
+from django.db.models.functions import Trunc
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from django.core.mail import send_mail
 
+from . import changes, intervals, recurrence, reports, rollups, routers, search
 from .exceptions import TaskNotFoundException
+from .pagination import paginate, apaginate, DEFAULT_PAGE_SIZE
+from .passwords import hasher_pool, hash_passwords
+from .purge import DELETE_CHUNK_SIZE, purge_user
+from .returning import supports_returning, update_returning, can_delete_returning, delete_returning
+from .cache import summary_cache, summary_key, summary_timeout, invalidate_task_summary, atask_version, task_version
+
+# task fields feeding DailyTaskRollup, in the order of rollups.contribution()
+ROLLUP_STATE = ('begin_at', 'end_at', 'is_completed')
+ROLLUP_FIELDS = set(ROLLUP_STATE)
 
 sex_choice = (
     ('Male', 'Male'),
     ('Female', 'Female')
 )
 
+class UserManager(DjangoUserManager):
+    """ ``UserManager`` able to create many users at once """
+
+    def bulk_create_users(self, users, initial_tasks = None, batch_size: int = 1000, workers: int = None,
+                          skip_existing: bool = False, progress = None):
+        """ create users and their initial tasks in batches
+
+        Passwords are hashed like ``create_user`` does, across a pool of
+        ``workers`` processes: the next batch is hashed while the current
+        one is inserted. Each batch of users and tasks is a transaction.
+
+        Args:
+            users (Iterable[dict]): user fields, ``password`` in clear text or
+                None for an unusable one, ``tasks`` a list of task fields
+            initial_tasks (List[dict], optional): task fields created for
+                every user, before their own tasks
+            batch_size (int, optional): users per batch
+            workers (int, optional): hashing processes, one per CPU by default
+            skip_existing (bool, optional): leave out taken usernames
+                instead of failing
+            progress (Callable[[int], None], optional): called with the
+                number of users created so far after every batch
+
+        Raises:
+            ValueError: if a user has no username or a task ends before it begins
+
+        Returns:
+            List[User]: created users
+        """
+        users = iter(users)
+        created = []
+        pool = hasher_pool(workers)
+        try:
+            pending = self._hash_batch(list(islice(users, batch_size)), skip_existing, pool)
+            while pending[0]:
+                batch, hashes = pending
+                pending = self._hash_batch(list(islice(users, batch_size)), skip_existing, pool)
+                created += self._insert_batch(batch, hashes, initial_tasks or [])
+                if progress is not None:
+                    progress(len(created))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures = True)
+        return created
+
+    def _hash_batch(self, batch, skip_existing, pool):
+        """ normalize a batch of user fields and start hashing their passwords """
+        users = []
+        for fields in batch:
+            fields = dict(fields)
+            if not fields.get('username'):
+                raise ValueError("The given username must be set")
+            fields['username'] = self.model.normalize_username(fields['username'])
+            fields['email'] = self.normalize_email(fields.get('email'))
+            users.append(fields)
+
+        if skip_existing and users:
+            names = [fields['username'] for fields in users]
+            existing = set(self.filter(username__in = names).values_list('username', flat = True))
+            users = [fields for fields in users if fields['username'] not in existing]
+
+        return users, hash_passwords([fields.pop('password', None) for fields in users], pool)
+
+    def _insert_batch(self, batch, hashes, initial_tasks):
+        using = self._db or router.db_for_write(self.model)
+        tasks = [fields.pop('tasks', None) or [] for fields in batch]
+        objs = [self.model(**fields, password = password) for fields, password in zip(batch, hashes)]
+
+        with transaction.atomic(using = using):
+            objs = self.db_manager(using).bulk_create(objs)
+            task_objs = [
+                Task(**task, created_by = user)
+                for user, own in zip(objs, tasks) for task in [*initial_tasks, *own]
+            ]
+            for task in task_objs:
+                task.check_interval()
+            Task.objects.using(using).bulk_create(task_objs, batch_size = 1000)
+
+            states, ids = {}, {}
+            for task in task_objs:
+                states.setdefault(task.created_by_id, []).append(_rollup_state(task))
+                ids.setdefault(task.created_by_id, []).append(task.id)
+            users_tasks_changed(states, ids)
+        return objs
+
+    def occupancy(self, users, start, end, slot = None, now = None, include_archived: bool = False):
+        """ get load, peak and utilization of many users per slot, e.g. for a team heatmap
+
+        The tasks of all users are read with one query and computed at
+        once, rows follow the order of ``users``.
+
+        Args:
+            users (Iterable[User | int]): users or their ids, e.g. the
+                members of a group
+            start (datetime): start of the first slot
+            end (datetime): window end, the last slot may reach past it
+            slot (timedelta, optional): slot length, 15 minutes by default
+            now (datetime, optional): end of open tasks, defaults to now
+            include_archived (bool, optional): also count archived tasks
+
+        Raises:
+            ValueError: if the window is empty or the slot is not a positive
+                number of seconds
+
+        Returns:
+            Occupancy: one row of values per slot for every user
+        """
+        if isinstance(users, models.QuerySet):
+            ids = list(users.values_list('id', flat = True))
+        else:
+            ids = [getattr(user, 'pk', user) for user in users]
+
+        querysets = [Task.objects.filter(created_by_id__in = ids)]
+        if include_archived:
+            querysets.append(TaskArchive.objects.filter(created_by_id__in = ids))
+        return _occupancy(querysets, ids, start, end, slot, now)
+
+
+def _occupancy(querysets, users, start, end, slot, now):
+    # NumPy is only loaded by the reports needing it, not on every cold start
+    from .occupancy import DEFAULT_SLOT, occupancy
+
+    return occupancy(querysets, users, start, end, slot = slot or DEFAULT_SLOT, now = now)
+
+
 class AbstractUser(AbstractBaseUser, PermissionsMixin):
     """
     An abstract base class implementing a fully featured User model with
@@ -95,6 +234,31 @@ class AbstractUser(AbstractBaseUser, PermissionsMixin):
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
 
+def _matches(task, filters):
+    """ whether an unsaved task passes plain field filters """
+    for name, value in filters.items():
+        if '__' in name:
+            raise ValueError(f"filter {name!r} cannot be applied to recurring occurrences")
+        if getattr(task, name) != value:
+            return False
+    return True
+
+
+def _rollup_state(task):
+    """ (begin_at, end_at, is_completed) of a task, see rollups.deltas() """
+    return tuple(getattr(task, name) for name in ROLLUP_STATE)
+
+
+def _occurrences(tasks):
+    """ (recurrence_id, occurrence_at) of the tasks holding a recurring occurrence """
+    return [(task.recurrence_id, task.occurrence_at) for task in tasks if task.recurrence_id]
+
+
+def _newest_first(tasks):
+    """ tasks in the order of get_tasks(), pending occurrences have no id """
+    return sorted(tasks, key = lambda task: (task.created_at, task.id or 0), reverse = True)
+
+
 class User(AbstractUser):
     # CustomUser model will be act as General class of parent
 
@@ -107,77 +271,366 @@ class User(AbstractUser):
         """
         return self.tasks.create(**kwargs)
     
-    def create_tasks(self, tasks):
+    def create_tasks(self, tasks, batch_size: int = None):
         """ create tasks of user
         
         Args:
             List[Dict]: List of tasks
+            batch_size (int, optional): number of rows per INSERT statement
+        Raises:
+            ValueError: if a task ends before it begins
         Returns:
             List[Task]: List of Task objects
         """
-        return self.tasks.bulk_create([
-                Task(**task, created_by=self) for task in tasks
-            ])
+        objs = [Task(**task, created_by=self) for task in tasks]
+        for task in objs:
+            task.check_interval()
+
+        with transaction.atomic(using = self._primary(), savepoint = False):
+            objs = self.tasks.bulk_create(objs, batch_size = batch_size)
+            self._tasks_changed(after = [_rollup_state(task) for task in objs], upserted = [task.id for task in objs])
+        return objs
 
     # Read or Retrieve of tasks
-    def get_task(self, **args):
+    def get_task(self, include_archived: bool = False, **args):
         """ get task of user
 
+        Args:
+            include_archived (bool, optional): also look into archived tasks
+
         Returns:
             Task: Task object
         """
+        tasks = self.tasks.filter(**args, created_by=self)
+        if include_archived:
+            tasks = self._with_archived(tasks, self.archived_tasks.filter(**args))
         try:
-            return self.tasks.get(**args, created_by=self)
+            return tasks.get()
         except Task.DoesNotExist:
             raise TaskNotFoundException(args)
         
-    def get_tasks(self, **args):
+    def get_tasks(self, include_archived: bool = False, occurrences: tuple = None, **args):
         """ get all tasks of user
 
+        Args:
+            include_archived (bool, optional): also return archived tasks
+            occurrences (Tuple[datetime, datetime], optional): (start, end)
+                window to read the tasks of, as ``tasks_overlapping``, merged
+                with its pending recurring occurrences, see
+                ``get_occurrences``; only plain field filters apply to them
+
         Returns:
-            Queryset: Queryset of tasks
+            Queryset: Queryset of tasks, a list of the tasks and occurrences
+            of the window with ``occurrences``
         """
+        if occurrences is not None:
+            # only the window is loaded, the history of user can be long
+            start, end = occurrences
+            pending = [task for task in self.get_occurrences(start, end) if _matches(task, args)]
+            if include_archived:
+                tasks = self._with_archived(
+                        intervals.overlapping(self.tasks.filter(**args), start, end),
+                        intervals.overlapping(self.archived_tasks.filter(**args), start, end),
+                    )
+            else:
+                tasks = intervals.overlapping(self.tasks.filter(**args), start, end).select_related('created_by')
+            return _newest_first([*tasks, *pending])
+
+        if include_archived:
+            return self._with_archived(
+                    self.tasks.filter(**args), self.archived_tasks.filter(**args)
+                ).order_by(
+                    '-created_at', '-id'
+                )
+
         return self.tasks.all().filter(**args).order_by(
-                '-created_at'
+                '-created_at', '-id'
             ).select_related(
                 'created_by'
             )
     
-    def get_completed_tasks(self):
+    def get_completed_tasks(self, include_archived: bool = False):
         """ get all completed tasks of user
 
+        Args:
+            include_archived (bool, optional): also return archived tasks
+
         Returns:
             Queryset: Queryset of completed tasks
         """
+        if include_archived:
+            return self.get_tasks(include_archived = True, is_completed = True)
+
         return self.tasks.filter(
                 is_completed=True
             ).order_by(
-                '-created_at'
+                '-created_at', '-id'
             ).select_related(
                 'created_by'
             )
     
-    def get_active_tasks(self):
+    def get_active_tasks(self, include_recurring: bool = False):
         """ get all active tasks of user
 
+        Args:
+            include_recurring (bool, optional): also return the pending
+                occurrences of recurring tasks running now
+
         Returns:
-            Queryset: Queryset of active tasks
+            Queryset: Queryset of active tasks, a list with ``include_recurring``
         """
-        
-        return self.tasks.filter(
-                is_completed=False
-            ).filter(
-                begin_at__lte=timezone.now()
-            ).filter(
-                models.Q(end_at__gte=timezone.now()) | models.Q(end_at__isnull=True)
-            ).filter(
+        now = timezone.now()
+        tasks = self.tasks_active_at(now).filter(
                 is_completed = False
             ).order_by(
-                '-created_at'
+                '-created_at', '-id'
+            )
+        if not include_recurring:
+            return tasks
+        return _newest_first([*tasks, *self.get_occurrences(now, now)])
+
+    def tasks_overlapping(self, start, end, include_archived: bool = False):
+        """ get tasks of user overlapping a time window
+
+        Both ends of the window are inclusive and tasks without end_at are
+        open ended, so a task ending exactly at ``start`` still overlaps.
+
+        Args:
+            start (datetime): window start
+            end (datetime): window end
+            include_archived (bool, optional): also return archived tasks
+
+        Raises:
+            ValueError: if end is before start
+
+        Returns:
+            Queryset: Queryset of overlapping tasks
+        """
+        if include_archived:
+            return self._with_archived(
+                    intervals.overlapping(self.tasks.all(), start, end),
+                    intervals.overlapping(self.archived_tasks.all(), start, end),
+                ).order_by(
+                    'begin_at', 'id'
+                )
+
+        return intervals.overlapping(self.tasks.all(), start, end).order_by(
+                'begin_at', 'id'
             ).select_related(
                 'created_by'
             )
 
+    def tasks_active_at(self, at):
+        """ get tasks of user running at an instant
+
+        Args:
+            at (datetime): instant to check
+
+        Returns:
+            Queryset: Queryset of tasks with begin_at <= at <= end_at
+        """
+        return self.tasks_overlapping(at, at)
+
+    def search_tasks(self, query: str):
+        """ full text search of tasks of user by name and description
+
+        Every word of ``query`` must start a word of the task, see
+        ``search.search`` for the indexes used on each database.
+
+        Args:
+            query (str): words to look for
+
+        Returns:
+            Queryset: matching tasks, best ``rank`` first
+        """
+        return search.search(self.tasks.all(), query).order_by(
+                '-rank', '-created_at', '-id'
+            )
+
+    # Recurring tasks
+    def create_recurring_task(self, **kwargs):
+        """ create recurring task of user
+
+        Raises:
+            ValueError: if the rule is invalid
+
+        Returns:
+            RecurringTask: RecurringTask object
+        """
+        return self.recurring_tasks.create(**kwargs)
+
+    def get_occurrences(self, start, end):
+        """ get pending occurrences of the recurring tasks of user in a time window
+
+        Occurrences are expanded for the window only, as unsaved Task
+        objects with ``recurrence`` and ``occurrence_at`` set and created at
+        their begin. Edited or completed occurrences are left out, they are
+        Task rows read like any other task, and so are the deleted ones.
+        Both ends are inclusive.
+
+        Args:
+            start (datetime): window start
+            end (datetime): window end
+
+        Raises:
+            ValueError: if end is before start
+
+        Returns:
+            List[Task]: pending occurrences ordered by begin_at
+        """
+        if start > end:
+            raise ValueError("start must be less than or equal to end")
+
+        rules = list(self.recurring_tasks.filter(starts_at__lte = end))
+        if not rules:
+            return []
+
+        earliest = start - max(rule.duration for rule in rules)
+        # occurrences held by a task row, archived and deleted ones included
+        taken = set(
+            self.tasks.filter(
+                recurrence__in = rules, occurrence_at__gte = earliest, occurrence_at__lte = end
+            ).values_list(
+                'recurrence_id', 'occurrence_at'
+            ).union(
+                self.archived_tasks.filter(
+                    recurrence__in = rules, occurrence_at__gte = earliest, occurrence_at__lte = end
+                ).values_list(
+                    'recurrence_id', 'occurrence_at'
+                ),
+                SkippedOccurrence.objects.filter(
+                    recurrence__in = rules, occurrence_at__gte = earliest, occurrence_at__lte = end
+                ).values_list(
+                    'recurrence_id', 'occurrence_at'
+                ),
+                all = True,
+            )
+        )
+
+        occurrences = []
+        for rule in rules:
+            for begin_at in rule.occurrences(start, end):
+                if (rule.id, begin_at) not in taken:
+                    task = rule.occurrence(begin_at)
+                    task.created_by = self
+                    occurrences.append(task)
+        return sorted(occurrences, key = lambda task: (task.begin_at, task.recurrence_id))
+
+    def materialize_occurrence(self, recurrence_id: int, occurrence_at, **kwargs):
+        """ get or create the task of one occurrence of a recurring task of user
+
+        The first call stores the occurrence as a Task row, later calls
+        return it; ``kwargs`` are task fields changed on it either way.
+
+        Args:
+            recurrence_id (int): id of the recurring task
+            occurrence_at (datetime): begin of the occurrence in the series
+            **kwargs (dict): task fields
+
+        Raises:
+            TaskNotFoundException: if there is no such occurrence, or it was
+                archived or deleted
+            ValueError: if the task would end before it begins
+
+        Returns:
+            Task: Task object
+        """
+        using = self._primary()
+        lookup = {'recurrence_id': recurrence_id, 'occurrence_at': occurrence_at}
+
+        task = self.tasks.using(using).filter(**lookup).first()
+        if task is None:
+            rule = self.recurring_tasks.using(using).filter(id = recurrence_id).first()
+            if rule is None or occurrence_at not in rule.occurrences(occurrence_at, occurrence_at):
+                raise TaskNotFoundException(lookup)
+            if (self.archived_tasks.using(using).filter(**lookup).exists()
+                    or SkippedOccurrence.objects.using(using).filter(**lookup).exists()):
+                raise TaskNotFoundException(lookup)
+
+            task = rule.occurrence(occurrence_at)
+            for name, value in kwargs.items():
+                setattr(task, name, value)
+            try:
+                with transaction.atomic(using = using):
+                    task.save(using = using)
+                return task
+            except IntegrityError:
+                # materialized concurrently
+                task = self.tasks.using(using).get(**lookup)
+
+        if kwargs:
+            task = self.update_task(id = task.id, **kwargs)
+        return task
+
+    def complete_occurrence(self, recurrence_id: int, occurrence_at):
+        """ complete one occurrence of a recurring task of user
+
+        Args:
+            recurrence_id (int): id of the recurring task
+            occurrence_at (datetime): begin of the occurrence in the series
+
+        Returns:
+            Task: the completed occurrence
+        """
+        return self.materialize_occurrence(recurrence_id, occurrence_at, is_completed = True)
+
+    def get_tasks_page(self, cursor: str = None, size: int = DEFAULT_PAGE_SIZE, **args):
+        """ get one page of tasks of user using keyset pagination
+
+        Args:
+            cursor (str, optional): continuation token of the previous page
+            size (int, optional): number of tasks per page
+            **args (dict): task filters
+
+        Raises:
+            InvalidCursorException: if cursor is malformed
+
+        Returns:
+            TaskPage: tasks of the page and the next continuation token
+        """
+        return paginate(self.get_tasks(**args), cursor = cursor, size = size)
+
+    def get_completed_tasks_page(self, cursor: str = None, size: int = DEFAULT_PAGE_SIZE):
+        """ get one page of completed tasks of user using keyset pagination
+
+        Args:
+            cursor (str, optional): continuation token of the previous page
+            size (int, optional): number of tasks per page
+
+        Returns:
+            TaskPage: tasks of the page and the next continuation token
+        """
+        return paginate(self.get_completed_tasks(), cursor = cursor, size = size)
+
+    def get_active_tasks_page(self, cursor: str = None, size: int = DEFAULT_PAGE_SIZE):
+        """ get one page of active tasks of user using keyset pagination
+
+        Args:
+            cursor (str, optional): continuation token of the previous page
+            size (int, optional): number of tasks per page
+
+        Returns:
+            TaskPage: tasks of the page and the next continuation token
+        """
+        return paginate(self.get_active_tasks(), cursor = cursor, size = size)
+
+    def iter_tasks(self, chunk_size: int = 2000, include_archived: bool = False, **args):
+        """ iterate over all tasks of user without materializing them
+
+        Rows are fetched ``chunk_size`` at a time through a server-side
+        cursor (where the backend supports one), so memory stays flat
+        however many tasks the user has.
+
+        Args:
+            chunk_size (int, optional): number of rows fetched per round trip
+            include_archived (bool, optional): also yield archived tasks
+            **args (dict): task filters
+
+        Yields:
+            Task: Task object
+        """
+        yield from self.get_tasks(include_archived = include_archived, **args).iterator(chunk_size = chunk_size)
+
     # Update of tasks
     def update_task(self, id : int, **kwargs):
         """ update task of user
@@ -188,10 +641,15 @@ class User(AbstractUser):
             **args (dict): task fields
             
         Returns:
-            Task: Task object
+            Task: Task object, None if the task does not exist
         """
-        task = self.get_tasks(id = id)
-        task.update(**kwargs)
+        task = self.tasks.using(self._primary()).filter(id = id)
+        if supports_returning(task.db):
+            tasks = self._update_returning(task, **kwargs)
+            return tasks[0] if tasks else None
+
+        task = self.get_tasks(id = id).using(self._primary())
+        self._update(task, **kwargs)
         return task.first()
     
     def update_tasks(self, ids: list[int] = [], **args):
@@ -205,7 +663,54 @@ class User(AbstractUser):
         Returns:
             int: number of updated tasks
         """
-        return self.tasks.filter(id__in = ids).filter(created_by = self).update(**args)
+        tasks = self.tasks.using(self._primary()).filter(id__in = ids).filter(created_by = self)
+        if supports_returning(tasks.db):
+            return len(self._update_returning(tasks, **args))
+        return self._update(tasks, **args)
+
+    def _update_returning(self, queryset, **fields):
+        """ update tasks with UPDATE ... RETURNING and move their rollups along
+
+        The rows are locked and their previous state read first only when
+        a rollup field changes, so the common updates (rename) cost a
+        single statement and completion adds the read and one rollup upsert.
+        """
+        with transaction.atomic(using = queryset.db, savepoint = False):
+            before = []
+            if ROLLUP_FIELDS & fields.keys():
+                before = list(queryset.select_for_update().values_list(*ROLLUP_STATE))
+
+            tasks = update_returning(queryset, **fields)
+            for task in tasks:
+                task.created_by = self
+
+            after = [_rollup_state(task) for task in tasks] if before else []
+            self._tasks_changed(before, after, upserted = [task.id for task in tasks])
+        return tasks
+
+    def _update(self, queryset, **fields):
+        """ update tasks and move their rollups from the previous to the new state """
+        with transaction.atomic(using = queryset.db, savepoint = False):
+            if not ROLLUP_FIELDS & fields.keys():
+                ids = list(queryset.values_list('id', flat = True))
+                updated = queryset.update(**fields)
+                self._tasks_changed(upserted = ids)
+                return updated
+
+            before = list(queryset.select_for_update().values_list('id', *ROLLUP_STATE))
+            ids = [id for id, *_ in before]
+            updated = queryset.update(**fields)
+
+            if any(hasattr(fields.get(name), 'resolve_expression') for name in ROLLUP_STATE):
+                after = list(Task.objects.using(queryset.db).filter(id__in = ids).values_list(*ROLLUP_STATE))
+            else:
+                after = [
+                    tuple(fields.get(name, value) for name, value in zip(ROLLUP_STATE, state))
+                    for id, *state in before
+                ]
+
+            self._tasks_changed([state for id, *state in before], after, upserted = ids)
+        return updated
 
     def complete_task(self, id: int):
         """ complete task of user
@@ -220,8 +725,10 @@ class User(AbstractUser):
         Returns:
             Task : Task object
         """
-        self.update_task(id = id, is_completed = True)
-        return self.get_task(id = id)
+        task = self.update_task(id = id, is_completed = True)
+        if task is None:
+            raise TaskNotFoundException({'id': id})
+        return task
     
     def complete_tasks(self, ids: list[int] = []):
         """ complete tasks of user
@@ -267,15 +774,39 @@ class User(AbstractUser):
             self (User): current user
             id (int): task id
             
+        Raises:
+            TaskNotFound: if task not found
+
         Returns:
             Task: Task object
         """
-        task = self.get_task(id = id)
-        task.delete()
+        tasks = self.tasks.using(self._primary()).filter(id = id)
+        if not (supports_returning(tasks.db) and can_delete_returning(tasks)):
+            try:
+                task = tasks.get()
+            except Task.DoesNotExist:
+                raise TaskNotFoundException({'id': id})
+            task.delete()
+            return task
+
+        with transaction.atomic(using = tasks.db, savepoint = False):
+            deleted = delete_returning(tasks)
+            if deleted:
+                self._tasks_changed([_rollup_state(deleted[0])], deleted = [id], occurrences = _occurrences(deleted))
+        if not deleted:
+            raise TaskNotFoundException({'id': id})
+
+        task = deleted[0]
+        task.created_by = self
+        # like Model.delete(), the deleted object loses its primary key
+        task.id = None
         return task
     
     def delete_tasks(self, ids: list[int] = []):
         """ delete tasks of user
+
+        Long id lists are deleted ``DELETE_CHUNK_SIZE`` at a time, each
+        chunk in its own transaction together with its rollup refresh.
         
         Args:
             self (User): current user
@@ -284,8 +815,498 @@ class User(AbstractUser):
         Returns:
             int: number of deleted tasks
         """
-        return self.tasks.filter(id__in = ids, created_by = self).delete()[0]
-    
+        ids = list(ids)
+        if len(ids) > DELETE_CHUNK_SIZE:
+            deleted = 0
+            for i in range(0, len(ids), DELETE_CHUNK_SIZE):
+                with transaction.atomic(using = self._primary()):
+                    deleted += self.delete_tasks(ids = ids[i:i + DELETE_CHUNK_SIZE])
+            return deleted
+
+        tasks = self.tasks.using(self._primary()).filter(id__in = ids, created_by = self)
+        if supports_returning(tasks.db) and can_delete_returning(tasks):
+            with transaction.atomic(using = tasks.db, savepoint = False):
+                deleted = delete_returning(tasks)
+                self._tasks_changed(
+                    [_rollup_state(task) for task in deleted],
+                    deleted = [task.id for task in deleted],
+                    occurrences = _occurrences(deleted),
+                )
+            return len(deleted)
+
+        with transaction.atomic(using = tasks.db):
+            before = list(tasks.select_for_update().values_list('id', 'recurrence_id', 'occurrence_at', *ROLLUP_STATE))
+            deleted = tasks.delete()[0]
+            self._tasks_changed(
+                [state for id, recurrence_id, occurrence_at, *state in before],
+                deleted = [id for id, *_ in before],
+                occurrences = [(recurrence_id, occurrence_at) for id, recurrence_id, occurrence_at, *_ in before if recurrence_id],
+            )
+        return deleted
+
+    def purge(self, chunk_size: int = DELETE_CHUNK_SIZE, sleep: float = 0, progress = None):
+        """ delete user and their task history in small committed chunks
+
+        Use instead of ``delete()`` for users with many tasks, see
+        ``purge.purge_user``.
+
+        Returns:
+            dict: number of deleted rows per relation
+        """
+        return purge_user(self, chunk_size = chunk_size, sleep = sleep, progress = progress)
+
+    # Reports of tasks
+    def time_report(self, start, end, bucket: str = 'day', tz = None, now = None, include_archived: bool = False):
+        """ get tracked time of user per day, week or month
+
+        Durations are summed by the database, with open tasks running until
+        ``now`` and every interval clipped to the window and its buckets.
+
+        Args:
+            start (datetime): window start, inclusive
+            end (datetime): window end, exclusive
+            bucket (str, optional): 'day', 'week' or 'month'
+            tz (str | tzinfo, optional): time zone of the calendar
+            now (datetime, optional): end of open tasks, defaults to now
+            include_archived (bool, optional): also count archived tasks
+
+        Raises:
+            ValueError: if the bucket is unknown, the window is empty or too long
+
+        Returns:
+            List[dict]: ``start``, ``end``, ``duration`` and ``tasks`` per bucket
+        """
+        report = reports.time_report(self.tasks.all(), start, end, bucket = bucket, tz = tz, now = now)
+        if include_archived:
+            archived = reports.time_report(self.archived_tasks.all(), start, end, bucket = bucket, tz = tz, now = now)
+            for row, extra in zip(report, archived):
+                row['duration'] += extra['duration']
+                row['tasks'] += extra['tasks']
+        return report
+
+    def group_report(self, start, end, bucket: str = 'week', tz = None, now = None, workers: int = 1):
+        """ get tracked time, tasks and completed tasks of the groups of user and their members
+
+        A single aggregate query covers every group and member, instead of
+        a ``get_tasks()`` call per member.
+
+        Args:
+            start (datetime): window start, inclusive
+            end (datetime): window end, exclusive
+            bucket (str, optional): 'day', 'week' or 'month'
+            tz (str | tzinfo, optional): time zone of the calendar
+            now (datetime, optional): end of open tasks, defaults to now
+            workers (int, optional): parallel queries for very large organizations
+
+        Raises:
+            ValueError: if the bucket is unknown, the window is empty or too long
+
+        Returns:
+            List[dict]: numbers per bucket of every group, with its ``members``
+        """
+        return reports.group_report(self.get_all_groups().all(), start, end, bucket = bucket, tz = tz,
+                                    now = now, workers = workers)
+
+    def occupancy(self, start, end, slot = None, now = None, include_archived: bool = False):
+        """ get load, peak and utilization of user per slot, e.g. for a calendar
+
+        Args:
+            start (datetime): start of the first slot
+            end (datetime): window end, the last slot may reach past it
+            slot (timedelta, optional): slot length, 15 minutes by default
+            now (datetime, optional): end of open tasks, defaults to now
+            include_archived (bool, optional): also count archived tasks
+
+        Raises:
+            ValueError: if the window is empty or the slot is not a positive
+                number of seconds
+
+        Returns:
+            Occupancy: a single row of values per slot
+        """
+        querysets = [self.tasks.all()]
+        if include_archived:
+            querysets.append(self.archived_tasks.all())
+        return _occupancy(querysets, [self.id], start, end, slot, now)
+
+    # Summary of tasks
+    def get_task_summary(self):
+        """ get task counters and tracked time of user
+
+        The summary is computed with a single aggregate query and cached
+        until one of the task mutation methods invalidates it, or for
+        ``TASK_SUMMARY_CACHE_TIMEOUT`` seconds since ``active`` depends
+        on the current time.
+
+        Returns:
+            dict: ``total``, ``completed`` and ``active`` task counts and the
+            ``tracked`` timedelta of all finished intervals
+        """
+        cache = summary_cache()
+        key = summary_key(self.id)
+
+        summary = cache.get(key)
+        if summary is None:
+            summary = self._compute_task_summary()
+            cache.set(key, summary, summary_timeout())
+        return summary
+
+    def _compute_task_summary(self):
+        now = timezone.now()
+        summary = self.tasks.aggregate(
+                total = models.Count('id'),
+                completed = models.Count('id', filter = models.Q(is_completed = True)),
+                active = models.Count('id', filter = models.Q(
+                    models.Q(end_at__gte = now) | models.Q(end_at__isnull = True),
+                    is_completed = False,
+                    begin_at__lte = now,
+                )),
+                tracked = models.Sum(
+                    models.ExpressionWrapper(
+                        models.F('end_at') - models.F('begin_at'),
+                        output_field = models.DurationField(),
+                    ),
+                    filter = models.Q(end_at__isnull = False),
+                ),
+            )
+        summary['tracked'] = summary['tracked'] or timezone.timedelta(0)
+        return summary
+
+    def invalidate_task_summary(self):
+        """ drop the cached task summary of user """
+        invalidate_task_summary(self.id)
+
+    def get_task_version(self):
+        """ get version of the tasks of user
+
+        The version changes with every write to the tasks of user, it is
+        the id of their newest change. Responses built from the tasks are
+        cached and tagged with it.
+
+        Returns:
+            int: current task version
+        """
+        return task_version(self)
+
+    def changes_since(self, cursor: str = None, limit: int = changes.DEFAULT_CHANGES_LIMIT):
+        """ get the changes to the tasks of user after a cursor
+
+        Clients take a cursor (call without one) before fetching all tasks,
+        then poll with the cursor of every answer and apply the changed
+        tasks and the ``deleted`` / ``archived`` ids.
+
+        Args:
+            cursor (str, optional): token of the previous call
+            limit (int, optional): most changes read per call
+
+        Raises:
+            InvalidCursorException: if the cursor is malformed
+            ExpiredCursorException: if the cursor is older than the kept
+                changes, all tasks have to be fetched again
+
+        Returns:
+            ChangeSet: changed tasks, tombstones and the next cursor
+        """
+        return changes.changes_since(self, cursor, limit)
+
+    def _with_archived(self, tasks, archived):
+        """ UNION ALL of tasks and archived tasks of user
+
+        Archived rows are read as Task objects and must not be saved. Only
+        ordering and slicing can be applied to the result.
+        """
+        return tasks.order_by().select_related(None).union(
+                archived.order_by().defer('archived_at'), all = True
+            )
+
+    def _primary(self):
+        """ database taking the writes of user's tasks
+
+        Write paths read the rows they are about to change from it as well,
+        reads of ``self.tasks`` may be served by a lagging replica.
+        """
+        return router.db_for_write(Task, instance = self)
+
+    def _tasks_changed(self, before = (), after = (), upserted = (), deleted = (), occurrences = ()):
+        """ called after any bulk write to the tasks of user
+
+        Args:
+            before (List[Tuple[datetime, datetime, bool]]): rollup state of
+                the written tasks before the write, see ``ROLLUP_STATE``
+            after (List[Tuple[datetime, datetime, bool]]): the same after it
+            upserted (List[int]): ids of the created or updated tasks
+            deleted (List[int]): ids of the deleted tasks
+            occurrences (List[Tuple[int, datetime]]): (recurrence_id,
+                occurrence_at) of the deleted tasks of recurring tasks
+        """
+        tasks_changed(self.id, before, after, upserted, deleted, occurrences)
+
+    # Daily rollups of tasks
+    def rollup_report(self, start, end, bucket: str = 'day'):
+        """ get tracked time of user per day, week or month from daily rollups
+
+        Reads at most one row per day instead of the raw tasks. Days follow
+        TIME_ZONE and only finished intervals count as tracked time, use
+        ``time_report`` for live numbers including running tasks.
+
+        Args:
+            start (date): first day, inclusive
+            end (date): last day, exclusive
+            bucket (str, optional): 'day', 'week' or 'month'
+
+        Raises:
+            ValueError: if the bucket is unknown
+
+        Returns:
+            List[dict]: ``start``, ``tracked``, ``tasks`` and ``completed`` per bucket
+        """
+        if bucket not in reports.BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(reports.BUCKETS)}")
+
+        return list(
+            self.daily_rollups.filter(
+                day__gte = start, day__lt = end
+            ).annotate(
+                start = Trunc('day', bucket, output_field = models.DateField())
+            ).values(
+                'start'
+            ).annotate(
+                tracked = models.Sum('tracked'),
+                tasks = models.Sum('tasks'),
+                completed = models.Sum('completed'),
+            ).order_by(
+                'start'
+            )
+        )
+
+    # Async variants of the tasks API, for views served over ASGI.
+    # Reads use Django's async ORM, which still runs every query through
+    # sync_to_async; writes run the sync path with the bookkeeping of
+    # tasks_changed() behind a single sync_to_async call.
+    async def aget_task_version(self):
+        """ async version of ``get_task_version``
+
+        Returns:
+            int: current task version
+        """
+        return await atask_version(self)
+
+    async def achanges_since(self, cursor: str = None, limit: int = changes.DEFAULT_CHANGES_LIMIT):
+        """ async version of ``changes_since``
+
+        Returns:
+            ChangeSet: changed tasks, tombstones and the next cursor
+        """
+        return await changes.achanges_since(self, cursor, limit)
+
+    async def acreate_task(self, **kwargs):
+        """ async version of ``create_task``
+
+        Returns:
+            Task: Task object
+        """
+        return await self.tasks.acreate(**kwargs)
+
+    async def acreate_tasks(self, tasks, batch_size: int = None):
+        """ async version of ``create_tasks``
+
+        Returns:
+            List[Task]: List of Task objects
+        """
+        return await sync_to_async(self.create_tasks)(tasks, batch_size = batch_size)
+
+    async def aget_task(self, include_archived: bool = False, **args):
+        """ async version of ``get_task``
+
+        Raises:
+            TaskNotFoundException: if task not found
+
+        Returns:
+            Task: Task object
+        """
+        tasks = self.tasks.filter(**args, created_by=self)
+        if include_archived:
+            tasks = self._with_archived(tasks, self.archived_tasks.filter(**args))
+        try:
+            return await tasks.aget()
+        except Task.DoesNotExist:
+            raise TaskNotFoundException(args)
+
+    async def aget_tasks(self, **args):
+        """ async version of ``get_tasks``, evaluated
+
+        Returns:
+            List[Task]: List of Task objects
+        """
+        if args.get('occurrences') is not None:
+            # merged from several queries into a list by the sync path
+            return await sync_to_async(self.get_tasks)(**args)
+        return [task async for task in self.get_tasks(**args)]
+
+    async def aget_completed_tasks(self, include_archived: bool = False):
+        """ async version of ``get_completed_tasks``, evaluated
+
+        Returns:
+            List[Task]: List of completed Task objects
+        """
+        return [task async for task in self.get_completed_tasks(include_archived = include_archived)]
+
+    async def aget_active_tasks(self):
+        """ async version of ``get_active_tasks``, evaluated
+
+        Returns:
+            List[Task]: List of active Task objects
+        """
+        return [task async for task in self.get_active_tasks()]
+
+    async def aget_tasks_page(self, cursor: str = None, size: int = DEFAULT_PAGE_SIZE, **args):
+        """ async version of ``get_tasks_page``
+
+        Returns:
+            TaskPage: tasks of the page and the next continuation token
+        """
+        return await apaginate(self.get_tasks(**args), cursor = cursor, size = size)
+
+    async def aupdate_task(self, id: int, **kwargs):
+        """ async version of ``update_task``
+
+        Returns:
+            Task: Task object, None if the task does not exist
+        """
+        task = self.tasks.using(self._primary()).filter(id = id)
+        if supports_returning(task.db):
+            tasks = await sync_to_async(self._update_returning)(task, **kwargs)
+            return tasks[0] if tasks else None
+
+        task = self.get_tasks(id = id).using(self._primary())
+        await sync_to_async(self._update)(task, **kwargs)
+        return await task.afirst()
+
+    async def aupdate_tasks(self, ids: list[int] = [], **args):
+        """ async version of ``update_tasks``
+
+        Returns:
+            int: number of updated tasks
+        """
+        tasks = self.tasks.using(self._primary()).filter(id__in = ids).filter(created_by = self)
+        if supports_returning(tasks.db):
+            return len(await sync_to_async(self._update_returning)(tasks, **args))
+        return await sync_to_async(self._update)(tasks, **args)
+
+    async def acomplete_task(self, id: int):
+        """ async version of ``complete_task``
+
+        Raises:
+            TaskNotFound: if task not found
+
+        Returns:
+            Task: Task object
+        """
+        task = await self.aupdate_task(id = id, is_completed = True)
+        if task is None:
+            raise TaskNotFoundException({'id': id})
+        return task
+
+    async def acomplete_tasks(self, ids: list[int] = []):
+        """ async version of ``complete_tasks``
+
+        Returns:
+            int: number of completed tasks
+        """
+        return await self.aupdate_tasks(ids = ids, is_completed = True)
+
+    async def aincomplete_task(self, id: int):
+        """ async version of ``incomplete_task``
+
+        Returns:
+            Task: Task object
+        """
+        return await self.aupdate_task(id = id, is_completed = False)
+
+    async def aincomplete_tasks(self, ids: list[int] = []):
+        """ async version of ``incomplete_tasks``
+
+        Returns:
+            int: number of incomplete tasks
+        """
+        return await self.aupdate_tasks(ids = ids, is_completed = False)
+
+    async def adelete_task(self, id: int):
+        """ async version of ``delete_task``
+
+        Raises:
+            TaskNotFound: if task not found
+
+        Returns:
+            Task: Task object
+        """
+        try:
+            task = await self.tasks.using(self._primary()).aget(id = id)
+        except Task.DoesNotExist:
+            raise TaskNotFoundException({'id': id})
+        await task.adelete()
+        return task
+
+    async def adelete_tasks(self, ids: list[int] = []):
+        """ async version of ``delete_tasks``
+
+        Returns:
+            int: number of deleted tasks
+        """
+        return await sync_to_async(self.delete_tasks)(ids = list(ids))
+
+
+def tasks_changed(user_id, before = (), after = (), upserted = (), deleted = (), occurrences = ()):
+    """ keep derived task data of a user in sync after a write
+
+    Call it in the transaction of the write: the rollups move by what the
+    written tasks changed, so ``before`` has to be read under a row lock.
+
+    Args:
+        user_id (int): owner of the written tasks
+        before (List[Tuple[datetime, datetime, bool]]): rollup state of the
+            written tasks before the write, see ``ROLLUP_STATE``
+        after (List[Tuple[datetime, datetime, bool]]): the same after it
+        upserted (List[int]): ids of the created or updated tasks
+        deleted (List[int]): ids of the deleted tasks
+        occurrences (List[Tuple[int, datetime]]): (recurrence_id,
+            occurrence_at) of the deleted tasks of recurring tasks, they
+            are skipped rather than pending again
+    """
+    using = router.db_for_write(Task)
+    if not changes.logged_by_triggers(using):
+        changes.record(user_id, changes.UPSERT, upserted, using = using)
+        changes.record(user_id, changes.DELETE, deleted, using = using)
+    if occurrences:
+        SkippedOccurrence.objects.using(using).bulk_create(
+            [SkippedOccurrence(recurrence_id = id, occurrence_at = at) for id, at in occurrences],
+            ignore_conflicts = True,
+        )
+    invalidate_task_summary(user_id, using = using)
+    routers.pin_to_primary(user_id)
+    rollups.apply(user_id, before, after, using = using)
+
+
+def users_tasks_changed(after, upserted):
+    """ ``tasks_changed`` for the new tasks of many users, e.g. a batch of imported users
+
+    The change log rows are written with one INSERT and the rollups of
+    all users added up at once, rather than a few queries per user.
+
+    Args:
+        after (Dict[int, List[Tuple[datetime, datetime, bool]]]): rollup
+            state of the created tasks per owner, see ``ROLLUP_STATE``
+        upserted (Dict[int, List[int]]): ids of the created tasks per owner
+    """
+    using = router.db_for_write(Task)
+    if not changes.logged_by_triggers(using):
+        changes.record_users(changes.UPSERT, upserted, using = using)
+    for user_id in upserted:
+        invalidate_task_summary(user_id, using = using)
+        routers.pin_to_primary(user_id)
+    rollups.add({user_id: rollups.deltas((), states) for user_id, states in after.items()}, using = using)
+
+
 class Task(models.Model):
     """
     Task model for storing task information
@@ -298,14 +1319,81 @@ class Task(models.Model):
     is_completed    = models.BooleanField(default=False)
     begin_at        = models.DateTimeField(default=timezone.now, db_index=True)
     end_at          = models.DateTimeField(blank=True, null=True, default=None, db_index=True)
+    # set on the occurrences of a RecurringTask that were edited or completed
+    recurrence      = models.ForeignKey('RecurringTask', on_delete=models.SET_NULL, blank=True, null=True, related_name = 'tasks')
+    occurrence_at   = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            # one row per occurrence, also serves the lookups of get_occurrences()
+            models.UniqueConstraint(
+                fields = ['recurrence', 'occurrence_at'],
+                name = 'task_occurrence_unique',
+            ),
+        ]
+        indexes = [
+            # get_tasks() and its keyset pages
+            models.Index(
+                fields = ['created_by', '-created_at', '-id'],
+                name = 'task_user_created_idx',
+            ),
+            # get_completed_tasks() / get_tasks(is_completed=...)
+            models.Index(
+                fields = ['created_by', 'is_completed', '-created_at'],
+                name = 'task_user_completed_idx',
+            ),
+            # tasks_overlapping() / tasks_active_at() on backends without
+            # range types, both branches of "end_at >= start OR end_at IS NULL"
+            models.Index(
+                fields = ['created_by', 'end_at', 'begin_at'],
+                name = 'task_user_end_idx',
+            ),
+            # get_active_tasks(): open tasks only, already in output order
+            # and covering the begin_at / end_at checks
+            models.Index(
+                fields = ['created_by', '-created_at', 'begin_at', 'end_at'],
+                name = 'task_user_open_idx',
+                condition = models.Q(is_completed = False),
+            ),
+        ]
     
-    def save(self, *args, **kwargs):
-        """Override save method of task model to set begin_at and end_at field"""
+    def check_interval(self):
+        """Check that the task does not end before it begins
+
+        Raises:
+            ValueError: if begin_at is greater than end_at
+        """
         if self.end_at is not None and self.begin_at > self.end_at:
             raise ValueError("begin_at must be less than or equal to end_at")
+
+    def save(self, *args, **kwargs):
+        """Override save method of task model to set begin_at and end_at field"""
+        self.check_interval()
         
         self.updated_at = timezone.now()
-        super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(Task, instance = self)
+        # the row and its bookkeeping are written together or not at all
+        with transaction.atomic(using = using):
+            before = []
+            if not self._state.adding:
+                # as stored, whatever this instance was loaded with
+                before = list(Task.objects.using(using).select_for_update().filter(pk = self.pk).values_list(*ROLLUP_STATE))
+            super().save(*args, **kwargs)
+            tasks_changed(self.created_by_id, before, [_rollup_state(self)], upserted = [self.id])
+
+    def delete(self, *args, **kwargs):
+        """Override delete method of task model to keep the user summary, rollups and change log in sync"""
+        id = self.id
+        using = kwargs.get('using') or router.db_for_write(Task, instance = self)
+        with transaction.atomic(using = using):
+            before = list(Task.objects.using(using).select_for_update().filter(pk = id).values_list(*ROLLUP_STATE))
+            deleted = super().delete(*args, **kwargs)
+            tasks_changed(
+                self.created_by_id, before,
+                deleted = [id] if before else [],
+                occurrences = _occurrences([self]) if before else [],
+            )
+        return deleted
     
     def __str__(self):
         """Generate string representation of task
@@ -323,4 +1411,210 @@ class Task(models.Model):
             timedelta : Duration of task
         """
         return self.end_at - self.begin_at
-    
\ No newline at end of file
+
+
+class DailyTaskRollup(models.Model):
+    """
+    Per user and per day totals of tasks, maintained by the task write paths
+    """
+    user            = models.ForeignKey(User, on_delete=models.CASCADE, related_name = 'daily_rollups')
+    day             = models.DateField()
+    tracked         = models.DurationField(default=timezone.timedelta)
+    tasks           = models.PositiveIntegerField(default=0)
+    completed       = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields = ['user', 'day'], name = 'rollup_user_day_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.day}: {self.tasks} tasks, {self.tracked} tracked"
+
+
+class RecurringTask(models.Model):
+    """
+    Rule repeating a task, e.g. a stand-up every weekday at 09:30
+
+    Occurrences are not stored: they are expanded for the window being
+    read, see ``User.get_occurrences``. An occurrence becomes a Task row,
+    linked by ``recurrence`` and ``occurrence_at``, once it is edited or
+    completed, and is then read like any other task.
+    """
+    FREQUENCY_CHOICES = [(frequency, frequency.capitalize()) for frequency in recurrence.FREQUENCIES]
+
+    name            = models.CharField(max_length=100)
+    description     = models.TextField(null=True, blank=True)
+    created_by      = models.ForeignKey(User, on_delete=models.CASCADE, related_name = 'recurring_tasks')
+    created_at      = models.DateTimeField(auto_now_add=True)
+    updated_at      = models.DateTimeField(auto_now=True)
+    # begin of the first occurrence, its local time of day repeats
+    starts_at       = models.DateTimeField(default=timezone.now)
+    duration        = models.DurationField(default=timezone.timedelta(0))
+    frequency       = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=recurrence.DAILY)
+    interval        = models.PositiveSmallIntegerField(default=1)
+    # bit mask of weekly days, Monday first, see recurrence.weekday_mask
+    weekdays        = models.PositiveSmallIntegerField(default=0)
+    # no occurrence begins after it
+    until           = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # get_occurrences(): rules started before the window ends
+            models.Index(fields = ['created_by', 'starts_at'], name = 'recurring_user_start_idx'),
+        ]
+
+    def check_rule(self):
+        """Check that the rule describes a series
+
+        Raises:
+            ValueError: if a field is out of range
+        """
+        if self.frequency not in recurrence.FREQUENCIES:
+            raise ValueError(f"frequency must be one of {', '.join(recurrence.FREQUENCIES)}")
+        if self.interval < 1:
+            raise ValueError("interval must be at least 1")
+        if not 0 <= self.weekdays <= recurrence.ALL_WEEKDAYS:
+            raise ValueError("weekdays must be a bit mask of the seven weekdays")
+        if self.duration < timezone.timedelta(0):
+            raise ValueError("duration cannot be negative")
+        if self.until is not None and self.until < self.starts_at:
+            raise ValueError("starts_at must be less than or equal to until")
+
+    def occurrences(self, start, end):
+        """begin instants of the occurrences overlapping [start, end], see ``recurrence.occurrences``"""
+        return recurrence.occurrences(self, start, end)
+
+    def occurrence(self, begin_at):
+        """Unsaved task of one occurrence, created at its begin
+
+        Args:
+            begin_at (datetime): begin of the occurrence
+
+        Returns:
+            Task: Task object without id
+        """
+        return Task(
+            name = self.name,
+            description = self.description,
+            created_by_id = self.created_by_id,
+            created_at = begin_at,
+            updated_at = self.updated_at,
+            begin_at = begin_at,
+            end_at = begin_at + self.duration,
+            recurrence = self,
+            occurrence_at = begin_at,
+        )
+
+    def save(self, *args, **kwargs):
+        """Override save method to check the rule, occurrences of the user change with it"""
+        self.check_rule()
+        super().save(*args, **kwargs)
+        tasks_changed(self.created_by_id)
+
+    def delete(self, *args, **kwargs):
+        """Override delete method, edited occurrences stay as plain tasks"""
+        deleted = super().delete(*args, **kwargs)
+        tasks_changed(self.created_by_id)
+        return deleted
+
+    def __str__(self):
+        return f"{self.name} created by {self.created_by_id}, {self.frequency} from {self.starts_at}"
+
+
+class SkippedOccurrence(models.Model):
+    """
+    Occurrence of a RecurringTask whose task was deleted, an exception of the rule
+
+    Without it the occurrence would be pending again once its task row is
+    gone, see ``User.get_occurrences``.
+    """
+    recurrence      = models.ForeignKey(RecurringTask, on_delete=models.CASCADE, related_name = 'skipped')
+    occurrence_at   = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # also serves the lookups of get_occurrences()
+            models.UniqueConstraint(fields = ['recurrence', 'occurrence_at'], name = 'skipped_occurrence_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.recurrence_id} skipped at {self.occurrence_at}"
+
+
+class TaskArchive(models.Model):
+    """
+    Completed tasks moved out of core_task by ``manage.py archive_tasks``
+
+    Fields mirror Task in the same order, so that selects of both tables
+    line up in a UNION; ``archived_at`` comes last and is deferred then.
+    """
+    id              = models.BigIntegerField(primary_key=True)
+    name            = models.CharField(max_length=100)
+    description     = models.TextField(null=True, blank=True)
+    created_by      = models.ForeignKey(User, on_delete=models.CASCADE, related_name = 'archived_tasks')
+    created_at      = models.DateTimeField()
+    updated_at      = models.DateTimeField()
+    is_completed    = models.BooleanField(default=True)
+    begin_at        = models.DateTimeField()
+    end_at          = models.DateTimeField(blank=True, null=True)
+    recurrence      = models.ForeignKey('RecurringTask', on_delete=models.SET_NULL, blank=True, null=True, related_name = 'archived_tasks')
+    occurrence_at   = models.DateTimeField(blank=True, null=True)
+    archived_at     = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # get_tasks(include_archived = True)
+            models.Index(
+                fields = ['created_by', '-created_at', '-id'],
+                name = 'archive_user_created_idx',
+            ),
+            # tasks_overlapping(include_archived = True) and rollup rebuilds
+            models.Index(
+                fields = ['created_by', 'end_at', 'begin_at'],
+                name = 'archive_user_end_idx',
+            ),
+            # archive horizon
+            models.Index(fields = ['end_at'], name = 'archive_end_idx'),
+        ]
+
+    @classmethod
+    def from_task(cls, task):
+        """ archive copy of a task, keeping its id """
+        return cls(**{field.attname: getattr(task, field.attname) for field in Task._meta.concrete_fields})
+
+    def __str__(self):
+        return f"{self.name} created by {self.created_by_id}, archived at {self.archived_at}"
+
+
+class TaskChange(models.Model):
+    """
+    Append-only log of the writes to the tasks of a user, read by ``User.changes_since``
+
+    Every write appends a row per task, deletes and archiving a tombstone.
+    The log is shrunk by ``changes.compact``, see the compact_task_changes
+    command. Task writes are logged by database triggers where supported,
+    see ``changes.logged_by_triggers``.
+    """
+    KIND_CHOICES = [(kind, kind.capitalize()) for kind in changes.KINDS]
+
+    # no constraint either: deleting a user cascades to its tasks, whose
+    # triggers may log after the user's changes were collected
+    user            = models.ForeignKey(User, on_delete=models.CASCADE, related_name = 'task_changes', db_constraint = False)
+    # no foreign key, tombstones outlive their task
+    task_id         = models.BigIntegerField()
+    kind            = models.CharField(max_length=7, choices=KIND_CHOICES)
+    changed_at      = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # changes_since(): the changes of a user after a cursor
+            models.Index(fields = ['user', 'id'], name = 'change_user_id_idx'),
+            # compaction of the changes followed by a newer one
+            models.Index(fields = ['task_id', 'id'], name = 'change_task_id_idx'),
+            # compaction of the expired changes
+            models.Index(fields = ['changed_at'], name = 'change_changed_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} of task {self.task_id} of {self.user_id} at {self.changed_at}"
@@ -0,0 +1,229 @@
+import datetime
+import math
+
+from typing import List, NamedTuple
+
+import numpy as np
+
+from django.db import NotSupportedError, models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import intervals
+
+DEFAULT_SLOT = datetime.timedelta(minutes = 15)
+SECOND = datetime.timedelta(seconds = 1)
+
+# columns of the intervals as read from the database
+COLUMNS = np.dtype([('owner', np.int64), ('begin', np.int64), ('end', np.int64)])
+
+
+class EpochSeconds(models.Func):
+    """ whole seconds since 1970 of a datetime, rounded down, in the database """
+    output_field = models.BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"EpochSeconds is not supported on {connection.vendor}")
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template = 'FLOOR(EXTRACT(EPOCH FROM %(expressions)s))::bigint', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # without the fraction, SQLite would round it to milliseconds
+        template = "CAST(strftime('%%%%s', SUBSTR(%(expressions)s, 1, 19)) AS INTEGER)"
+        return super().as_sql(compiler, connection, template = template, **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template = 'FLOOR(UNIX_TIMESTAMP(%(expressions)s))', **extra_context)
+
+
+class Occupancy(NamedTuple):
+    """ how busy users were in consecutive slots of equal length
+
+    Arrays have one row per user, in the order of ``users``, and one
+    column per slot.
+    """
+    users: List[int]
+    start: datetime.datetime
+    slot: datetime.timedelta
+    # mean number of tasks running, the task time per slot over its length
+    load: np.ndarray
+    # most tasks running at the same time within the slot
+    peak: np.ndarray
+    # share of the slot with at least one task running
+    utilization: np.ndarray
+
+    def slots(self):
+        """ start of every slot
+
+        Returns:
+            List[datetime]: slot starts
+        """
+        return [self.start + self.slot * i for i in range(self.load.shape[1])]
+
+    def row(self, user_id):
+        """ load, peak and utilization of one user
+
+        Returns:
+            Tuple[ndarray, ndarray, ndarray]: one value per slot each
+        """
+        index = self.users.index(user_id)
+        return self.load[index], self.peak[index], self.utilization[index]
+
+
+def _merge(owners, begins, ends, base):
+    """ union of the intervals of every user, as disjoint sorted intervals """
+    order = np.lexsort((begins, owners))
+    begin_keys = owners[order] * base + begins[order]
+    end_keys = np.maximum.accumulate(owners[order] * base + ends[order])
+
+    first = np.ones(len(order), dtype = bool)
+    first[1:] = begin_keys[1:] > end_keys[:-1]
+    last = np.append(np.flatnonzero(first)[1:] - 1, len(order) - 1)
+
+    merged_owners = begin_keys[first] // base
+    return merged_owners, begin_keys[first] % base, end_keys[last] % base
+
+
+def _peak(owners, begins, ends, starts, stops, base):
+    """ most intervals running at once between every pair of query keys """
+    begin_keys = np.sort(owners * base + begins)
+    end_keys = np.sort(owners * base + ends)
+
+    # running at a slot start, intervals ending there are over
+    depth_at_start = (
+        np.searchsorted(begin_keys, starts, side = 'right')
+        - np.searchsorted(end_keys, starts, side = 'right')
+    )
+
+    # depth after every event, ends first on ties; users net to zero so a
+    # single running sum serves all of them
+    keys = np.concatenate((begin_keys, end_keys))
+    deltas = np.concatenate((np.ones(len(begin_keys), np.int64), -np.ones(len(end_keys), np.int64)))
+    order = np.lexsort((deltas, keys))
+    keys = keys[order]
+    depth = np.append(np.cumsum(deltas[order]), 0)
+
+    # events strictly inside every slot
+    low = np.searchsorted(keys, starts, side = 'right').ravel()
+    high = np.searchsorted(keys, stops, side = 'left').ravel()
+    bounds = np.empty(2 * len(low), dtype = np.int64)
+    bounds[0::2], bounds[1::2] = low, high
+    inside = np.maximum.reduceat(depth, bounds)[0::2].reshape(starts.shape)
+
+    return np.where((high > low).reshape(starts.shape), np.maximum(depth_at_start, inside), depth_at_start)
+
+
+def compute(owners, begins, ends, users, slots, slot_seconds):
+    """ load, peak and utilization of intervals in slots, vectorized
+
+    Args:
+        owners (ndarray): row of every interval, below ``users``
+        begins (ndarray): interval starts in seconds from the first slot
+        ends (ndarray): interval ends in seconds from the first slot
+        users (int): number of rows
+        slots (int): number of slots
+        slot_seconds (int): slot length in seconds
+
+    Returns:
+        Tuple[ndarray, ndarray, ndarray]: load, peak and utilization, each
+            of shape (users, slots)
+    """
+    span = slots * slot_seconds
+    base = span + 1
+    owners = np.asarray(owners, dtype = np.int64)
+    begins = np.clip(np.asarray(begins, dtype = np.int64), 0, span)
+    ends = np.clip(np.asarray(ends, dtype = np.int64), 0, span)
+
+    keep = ends > begins
+    owners, begins, ends = owners[keep], begins[keep], ends[keep]
+
+    shape = (users, slots)
+    if not len(owners):
+        return np.zeros(shape), np.zeros(shape, dtype = np.int64), np.zeros(shape)
+
+    # every slot edge of every user as a key sorting like the intervals
+    edges = np.arange(users, dtype = np.int64)[:, None] * base + np.arange(slots + 1, dtype = np.int64) * slot_seconds
+
+    def per_slot(owners, begins, ends):
+        # ``user * base + second`` keys sort by user, then time; tasks of
+        # earlier users add a constant to every edge of a user, which
+        # cancels between its edges
+        order = np.argsort(owners * base + begins, kind = 'stable')
+        begin_keys, sorted_begins = owners[order] * base + begins[order], begins[order]
+        order = np.argsort(owners * base + ends, kind = 'stable')
+        end_keys, sorted_ends = owners[order] * base + ends[order], ends[order]
+
+        begun = np.searchsorted(begin_keys, edges, side = 'left')
+        ended = np.searchsorted(end_keys, edges, side = 'left')
+        begin_sums = np.concatenate(([0], np.cumsum(sorted_begins)))
+        end_sums = np.concatenate(([0], np.cumsum(sorted_ends)))
+        # task seconds before every edge, plus a constant per user
+        covered = (begun - ended) * (edges % base) - begin_sums[begun] + end_sums[ended]
+        return np.diff(covered, axis = 1) / slot_seconds
+
+    load = per_slot(owners, begins, ends)
+    utilization = per_slot(*_merge(owners, begins, ends, base))
+    peak = _peak(owners, begins, ends, edges[:, :-1], edges[:, 1:], base)
+    return load, peak, utilization
+
+
+def occupancy(querysets, users, start, end, slot = DEFAULT_SLOT, now = None):
+    """ occupancy of users in the slots of a time window
+
+    Intervals are read as epoch seconds computed by the database straight
+    into NumPy arrays and every slot is computed at once, nothing loops
+    over tasks or slots in Python. Tasks without ``end_at`` run until
+    ``now``. Times are rounded down to whole seconds.
+
+    Args:
+        querysets (List[Queryset]): tasks of the users, e.g. live and
+            archived ones
+        users (List[int]): ids of the users, one row each
+        start (datetime): start of the first slot
+        end (datetime): window end, the last slot may reach past it
+        slot (timedelta, optional): slot length, whole seconds
+        now (datetime, optional): end of running tasks, the current time
+            by default
+
+    Raises:
+        ValueError: if the window is empty or the slot is not a positive
+            number of seconds
+
+    Returns:
+        Occupancy: load, peak and utilization per user and slot
+    """
+    if start >= end:
+        raise ValueError("start must be before end")
+    if slot < SECOND or slot % SECOND:
+        raise ValueError("slot must be a positive number of whole seconds")
+
+    now = now or timezone.now()
+    users = list(users)
+    slots = -(-(end - start) // slot)
+    stop = start + slots * slot
+
+    begin_seconds = EpochSeconds('begin_at')
+    # running tasks end a second before they begin, see below
+    end_seconds = Coalesce(EpochSeconds('end_at'), begin_seconds - 1)
+    columns = np.concatenate([
+            np.fromiter(
+                intervals.overlapping(queryset, start, stop).values_list(
+                    'created_by_id', begin_seconds, end_seconds
+                ).iterator(chunk_size = 10000),
+                dtype = COLUMNS,
+            )
+            for queryset in querysets
+        ])
+
+    # row of every owner, in the order of users
+    ids = np.array(users, dtype = np.int64)
+    order = np.argsort(ids)
+    owners = order[np.searchsorted(ids, columns['owner'], sorter = order)]
+
+    origin = math.floor(start.timestamp())
+    begins = columns['begin']
+    ends = np.where(columns['end'] < begins, np.maximum(math.floor(now.timestamp()), begins), columns['end'])
+
+    load, peak, utilization = compute(owners, begins - origin, ends - origin, len(users), slots, slot // SECOND)
+    return Occupancy(users, start, slot, load, peak, utilization)
@@ -0,0 +1,183 @@
+import base64
+import binascii
+import json
+
+from typing import NamedTuple, Optional
+
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .exceptions import InvalidCursorException
+
+# keyset ordering used by every paginated task listing, newest first.
+# ``id`` breaks ties between tasks created in the same microsecond.
+KEYSET_ORDERING = ('-created_at', '-id')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+class TaskPage(NamedTuple):
+    """ A single page of tasks and the token to fetch the next one """
+    tasks: list
+    next_cursor: Optional[str]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(task):
+    """ encode the keyset position of a task into an opaque token
+
+    Args:
+        task (Task): last task of the current page
+
+    Returns:
+        str: url safe continuation token
+    """
+    raw = json.dumps([task.created_at.isoformat(), task.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ decode a continuation token produced by ``encode_cursor``
+
+    Args:
+        cursor (str): continuation token
+
+    Raises:
+        InvalidCursorException: if the token is malformed
+
+    Returns:
+        Tuple[datetime, int]: (created_at, id) of the last seen task
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+    except (TypeError, ValueError, binascii.Error):
+        raise InvalidCursorException(cursor)
+
+    if created_at is None or not isinstance(id, int):
+        raise InvalidCursorException(cursor)
+
+    return created_at, id
+
+
+def after_cursor(queryset, cursor=None):
+    """ restrict a task queryset to the rows following a cursor
+
+    Args:
+        queryset (Queryset): tasks to paginate
+        cursor (str, optional): token returned with the previous page
+
+    Returns:
+        Queryset: keyset ordered tasks after the cursor position
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        queryset = queryset.filter(
+                models.Q(created_at__lt=created_at) |
+                models.Q(created_at=created_at, id__lt=id)
+            )
+
+    return queryset
+
+
+def paginate(queryset, cursor=None, size=DEFAULT_PAGE_SIZE):
+    """ keyset paginate a task queryset on (created_at, id)
+
+    Every page is a single indexed range scan, so page N costs the same
+    as page 1 regardless of how deep the client has scrolled.
+
+    Args:
+        queryset (Queryset): tasks to paginate
+        cursor (str, optional): token returned with the previous page
+        size (int, optional): number of tasks per page
+
+    Returns:
+        TaskPage: tasks of the page and the next continuation token
+    """
+    size = max(1, min(int(size), MAX_PAGE_SIZE))
+
+    # fetch one extra row to know whether another page exists
+    tasks = list(after_cursor(queryset, cursor)[:size + 1])
+    if len(tasks) > size:
+        tasks = tasks[:size]
+        return TaskPage(tasks, encode_cursor(tasks[-1]))
+
+    return TaskPage(tasks, None)
+
+
+async def apaginate(queryset, cursor=None, size=DEFAULT_PAGE_SIZE):
+    """ async version of ``paginate``
+
+    Returns:
+        TaskPage: tasks of the page and the next continuation token
+    """
+    size = max(1, min(int(size), MAX_PAGE_SIZE))
+
+    tasks = [task async for task in after_cursor(queryset, cursor)[:size + 1]]
+    if len(tasks) > size:
+        tasks = tasks[:size]
+        return TaskPage(tasks, encode_cursor(tasks[-1]))
+
+    return TaskPage(tasks, None)
+
+
+def estimate_count(queryset):
+    """ row count of a queryset as estimated by the query planner
+
+    PostgreSQL estimates any query through EXPLAIN; SQLite only knows the
+    size of whole tables, from the statistics gathered by ANALYZE.
+
+    Args:
+        queryset (Queryset): rows to count
+
+    Returns:
+        Optional[int]: estimated number of rows, None when unknown
+    """
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    if connection.vendor == 'sqlite' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            if 'sqlite_stat1' not in connection.introspection.table_names(cursor):
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        return int(row[0].split()[0]) if row else None
+
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Paginator trusting the planner's row estimate on big tables
+
+    An exact COUNT(*) has to visit every row. Estimates above
+    ``threshold`` are used as is, smaller ones are checked with an exact
+    count, so small tables and selective filters keep exact numbers.
+    """
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, models.QuerySet):
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,78 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.utils.module_loading import import_string
+
+# fewer passwords are hashed in the calling process, starting workers costs more
+MIN_POOL_PASSWORDS = 8
+
+# password hasher of a pool worker, set by _init_worker
+_hasher = None
+
+
+def _init_worker(path):
+    global _hasher
+    _hasher = import_string(path)()
+
+
+def _encode(password):
+    if password is None:
+        return make_password(None)
+    return _hasher.encode(password, _hasher.salt())
+
+
+def worker_count(workers = None):
+    """ number of hashing processes, one per CPU by default """
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def hasher_pool(workers = None):
+    """ process pool hashing passwords with the default hasher
+
+    Workers are spawned rather than forked, they hold no copy of the
+    database connections or threads of the caller. The hasher is passed to
+    them, so they hash exactly like ``make_password`` in the caller. On
+    ``SERVERLESS`` hosts no processes are started, the function instance
+    would not outlive the request.
+
+    Args:
+        workers (int, optional): number of processes, one per CPU by default
+
+    Returns:
+        ProcessPoolExecutor: pool for ``hash_passwords``, None for a single
+            worker which hashes in the calling process
+    """
+    workers = worker_count(workers)
+    if workers == 1 or getattr(settings, 'SERVERLESS', False):
+        return None
+    return ProcessPoolExecutor(
+            max_workers = workers,
+            mp_context = get_context('spawn'),
+            initializer = _init_worker,
+            initargs = (settings.PASSWORD_HASHERS[0], ),
+        )
+
+
+def hash_passwords(passwords, pool = None):
+    """ hash raw passwords like ``make_password``, across a process pool
+
+    With a pool the passwords are submitted at once and hashed while the
+    caller goes on, the result is read in order when iterated.
+
+    Args:
+        passwords (List[str | None]): raw passwords, None for an unusable one
+        pool (ProcessPoolExecutor, optional): from ``hasher_pool``
+
+    Returns:
+        Iterator[str]: encoded passwords, in the order of ``passwords``
+    """
+    passwords = list(passwords)
+    if pool is None or len(passwords) < MIN_POOL_PASSWORDS:
+        return map(make_password, passwords)
+
+    # a hash takes far longer than sending a password to a worker
+    return pool.map(_encode, passwords)
@@ -0,0 +1,117 @@
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from .cache import invalidate_task_summary
+
+logger = logging.getLogger(__name__)
+
+# rows deleted per transaction, small enough to keep locks short
+DELETE_CHUNK_SIZE = 1000
+
+# a single worker: purges run one after the other, off the request thread
+_executor = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "purge")
+
+
+def delete_in_chunks(queryset, chunk_size = DELETE_CHUNK_SIZE, sleep = 0, progress = None):
+    """ delete the rows of a queryset in small committed transactions
+
+    Unlike ``QuerySet.delete()`` rows are never all collected in memory
+    nor deleted in one transaction holding locks until the end.
+
+    Args:
+        queryset (Queryset): rows to delete, without cascades to follow
+        chunk_size (int, optional): rows deleted per transaction
+        sleep (float, optional): seconds to pause between chunks
+        progress (Callable[[int], None], optional): called with the number
+            of rows deleted so far after every chunk
+
+    Returns:
+        int: number of deleted rows
+    """
+    model = queryset.model
+    using = router.db_for_write(model)
+    total = 0
+    while True:
+        with transaction.atomic(using = using):
+            ids = list(queryset.using(using).values_list('pk', flat = True)[:chunk_size])
+            if not ids:
+                return total
+            model._base_manager.using(using).filter(pk__in = ids).delete()
+
+        total += len(ids)
+        if progress is not None:
+            progress(total)
+        if sleep:
+            time.sleep(sleep)
+
+
+def purge_user(user, chunk_size = DELETE_CHUNK_SIZE, sleep = 0, progress = None):
+    """ delete a user after removing their task history in chunks
+
+    The user is deactivated first so that nothing is written meanwhile. An
+    interrupted purge leaves an inactive user with fewer tasks, purging it
+    again finishes the job.
+
+    Args:
+        user (User): user to delete
+        chunk_size (int, optional): rows deleted per transaction
+        sleep (float, optional): seconds to pause between chunks
+        progress (Callable[[str, int], None], optional): called with the
+            relation being purged and its rows deleted so far
+
+    Returns:
+        dict: number of deleted rows per relation
+    """
+    type(user)._base_manager.filter(pk = user.pk).update(is_active = False)
+
+    deleted = {}
+    for name in ('tasks', 'archived_tasks', 'daily_rollups', 'task_changes'):
+        report = None if progress is None else (lambda total, name = name: progress(name, total))
+        deleted[name] = delete_in_chunks(getattr(user, name).all(), chunk_size, sleep, report)
+
+    invalidate_task_summary(user.pk)
+    # what is left (permissions, groups, admin log) is small
+    user.delete()
+    return deleted
+
+
+def _purge_users(model, ids, chunk_size, sleep):
+    try:
+        for user in model._base_manager.filter(pk__in = ids):
+            deleted = purge_user(user, chunk_size, sleep)
+            logger.info("purged user %s: %s", user.pk, deleted)
+    except Exception:
+        logger.exception("purge of users %s failed", ids)
+        raise
+    finally:
+        # the worker thread opened its own connections
+        connections.close_all()
+
+
+def purge_users_in_background(model, ids, chunk_size = DELETE_CHUNK_SIZE, sleep = 0):
+    """ purge users on a background thread, or inline when disabled
+
+    ``TASK_PURGE_BACKGROUND = False`` runs the purge in the calling thread,
+    for tests and for processes that would not outlive the request, as do
+    ``SERVERLESS`` hosts.
+
+    Args:
+        model (type): user model
+        ids (List[int]): ids of the users to purge
+        chunk_size (int, optional): rows deleted per transaction
+        sleep (float, optional): seconds to pause between chunks
+
+    Returns:
+        Future: purge in progress, None when it already ran inline
+    """
+    ids = list(ids)
+    if not getattr(settings, 'TASK_PURGE_BACKGROUND', True) or getattr(settings, 'SERVERLESS', False):
+        for user in model._base_manager.filter(pk__in = ids):
+            purge_user(user, chunk_size, sleep)
+        return None
+    return _executor.submit(_purge_users, model, ids, chunk_size, sleep)
@@ -0,0 +1,118 @@
+import datetime
+
+from django.utils import timezone
+
+DAILY, WEEKLY, MONTHLY = 'daily', 'weekly', 'monthly'
+FREQUENCIES = (DAILY, WEEKLY, MONTHLY)
+
+# bit of every weekday in RecurringTask.weekdays, Monday first like date.weekday()
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+ALL_WEEKDAYS = (1 << len(WEEKDAYS)) - 1
+
+
+def weekday_mask(days):
+    """ bit mask of weekdays for ``RecurringTask.weekdays``
+
+    Args:
+        days (Iterable[int | str]): weekdays, 0 or 'mon' for Monday
+
+    Raises:
+        ValueError: if a day is unknown
+
+    Returns:
+        int: bit mask, 0b0011111 for Monday to Friday
+    """
+    mask = 0
+    for day in days:
+        index = WEEKDAYS.index(day.lower()[:3]) if isinstance(day, str) else day
+        if not 0 <= index < len(WEEKDAYS):
+            raise ValueError(f"invalid weekday {day!r}")
+        mask |= 1 << index
+    return mask
+
+
+def _daily(first, interval, since):
+    periods = -(-(since - first).days // interval)
+    day = first + datetime.timedelta(days = periods * interval)
+    while True:
+        yield day
+        day += datetime.timedelta(days = interval)
+
+
+def _weekly(first, interval, weekdays, since):
+    mask = weekdays or 1 << first.weekday()
+    monday = first - datetime.timedelta(days = first.weekday())
+    weeks = (since - monday).days // 7
+    monday += datetime.timedelta(weeks = weeks - weeks % interval)
+    while True:
+        for weekday in range(len(WEEKDAYS)):
+            day = monday + datetime.timedelta(days = weekday)
+            if mask & 1 << weekday and day >= since:
+                yield day
+        monday += datetime.timedelta(weeks = interval)
+
+
+def _monthly(first, interval, since):
+    months = (since.year - first.year) * 12 + since.month - first.month
+    months -= months % interval
+    while True:
+        year, month = divmod(first.month - 1 + months, 12)
+        try:
+            day = datetime.date(first.year + year, month + 1, first.day)
+        except ValueError:
+            # months without that day (e.g. the 31st) are left out
+            day = None
+        if day is not None and day >= since:
+            yield day
+        months += interval
+
+
+def days(first, frequency, interval = 1, weekdays = 0, since = None):
+    """ calendar days of a recurrence, from ``since`` on and without end
+
+    Args:
+        first (date): day of the first occurrence
+        frequency (str): one of ``FREQUENCIES``
+        interval (int, optional): every how many days, weeks or months
+        weekdays (int, optional): bit mask of the weekly days, the weekday
+            of ``first`` when 0
+        since (date, optional): first day of interest
+
+    Yields:
+        date: days holding an occurrence, in order
+    """
+    since = max(since or first, first)
+    if frequency == DAILY:
+        return _daily(first, interval, since)
+    if frequency == WEEKLY:
+        return _weekly(first, interval, weekdays, since)
+    return _monthly(first, interval, since)
+
+
+def occurrences(rule, start, end, tz = None):
+    """ begin instants of the occurrences of a rule overlapping [start, end]
+
+    Occurrences keep the local time of day of ``rule.starts_at`` in the
+    default time zone across DST changes. Expansion jumps straight to the
+    window, its cost depends on the window and not on the series.
+
+    Args:
+        rule (RecurringTask): recurrence rule
+        start (datetime): window start
+        end (datetime): window end
+        tz (tzinfo, optional): time zone of the days, TIME_ZONE by default
+
+    Yields:
+        datetime: begin of every overlapping occurrence, in order
+    """
+    tz = tz or timezone.get_default_timezone()
+    local = rule.starts_at.astimezone(tz)
+    at = local.time().replace(tzinfo = None)
+    since = (start - rule.duration).astimezone(tz).date()
+
+    for day in days(local.date(), rule.frequency, rule.interval, rule.weekdays, since):
+        begin = datetime.datetime.combine(day, at, tzinfo = tz)
+        if begin > end or (rule.until is not None and begin > rule.until):
+            return
+        if begin + rule.duration >= start and begin >= rule.starts_at:
+            yield begin
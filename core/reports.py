@@ -0,0 +1,325 @@
+import datetime
+
+from concurrent.futures import ThreadPoolExecutor
+
+from zoneinfo import ZoneInfo
+
+from django.db import connections, models
+from django.db.models import FilteredRelation
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+BUCKETS = ('day', 'week', 'month')
+
+# aggregate columns per query, far below the result set limits of SQLite
+# (2000 columns) and PostgreSQL (1664 entries)
+MAX_COLUMNS = 300
+# longest report, ten years of days
+MAX_BUCKETS = 3660
+
+
+def _tzinfo(tz):
+    if tz is None:
+        return timezone.get_current_timezone()
+    if isinstance(tz, str):
+        return ZoneInfo(tz)
+    return tz
+
+
+def _floor(moment, bucket):
+    day = moment.date()
+    if bucket == 'week':
+        day -= datetime.timedelta(days = day.weekday())
+    elif bucket == 'month':
+        day = day.replace(day = 1)
+    return day
+
+
+def _next(day, bucket):
+    if bucket == 'day':
+        return day + datetime.timedelta(days = 1)
+    if bucket == 'week':
+        return day + datetime.timedelta(weeks = 1)
+    if day.month == 12:
+        return day.replace(year = day.year + 1, month = 1)
+    return day.replace(month = day.month + 1)
+
+
+def bucket_bounds(start, end, bucket = 'day', tz = None):
+    """ split [start, end) into calendar buckets of a time zone
+
+    Buckets start at local midnight, weeks on Monday and months on the
+    first day, so DST changes give 23 or 25 hour days. The first and last
+    buckets are clipped to the window.
+
+    Args:
+        start (datetime): aware window start, inclusive
+        end (datetime): aware window end, exclusive
+        bucket (str, optional): one of ``BUCKETS``
+        tz (str | tzinfo, optional): time zone of the calendar, defaults
+            to the current time zone
+
+    Raises:
+        ValueError: if the bucket is unknown, the window is empty or split
+            into more than ``MAX_BUCKETS`` buckets
+
+    Returns:
+        List[Tuple[datetime, datetime]]: bucket boundaries
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    if start >= end:
+        raise ValueError("start must be before end")
+
+    tz = _tzinfo(tz)
+    day = _floor(start.astimezone(tz), bucket)
+
+    bounds = []
+    while True:
+        lower = datetime.datetime.combine(day, datetime.time.min, tzinfo = tz)
+        if lower >= end:
+            break
+        day = _next(day, bucket)
+        upper = datetime.datetime.combine(day, datetime.time.min, tzinfo = tz)
+        bounds.append((max(lower, start), min(upper, end)))
+        if len(bounds) > MAX_BUCKETS:
+            raise ValueError(f"a report has at most {MAX_BUCKETS} buckets, use a longer bucket or a shorter window")
+    return bounds
+
+
+def _chunks(bounds, columns):
+    """ runs of consecutive buckets of at most ``MAX_COLUMNS`` aggregates
+
+    Args:
+        bounds (List[Tuple[datetime, datetime]]): buckets
+        columns (int): aggregates per bucket
+
+    Returns:
+        List[Tuple[int, List]]: index of the first bucket and the buckets of every run
+    """
+    size = max(1, MAX_COLUMNS // columns)
+    return [(i, bounds[i:i + size]) for i in range(0, len(bounds), size)]
+
+
+def overlap_q(start, end, now, prefix = ''):
+    """ filter matching tasks that overlap [start, end)
+
+    Open tasks (``end_at`` is NULL) are treated as running until ``now``.
+
+    Args:
+        start (datetime): window start, inclusive
+        end (datetime): window end, exclusive
+        now (datetime): end of open tasks
+        prefix (str, optional): path to the tasks, e.g. ``'tasks__'``
+
+    Returns:
+        Q: task filter
+    """
+    ends_inside = models.Q(**{f'{prefix}end_at__gt': start})
+    if now > start:
+        ends_inside |= models.Q(**{f'{prefix}end_at__isnull': True, f'{prefix}begin_at__lt': now})
+    return ends_inside & models.Q(**{f'{prefix}begin_at__lt': end})
+
+
+def clipped_duration(start, end, now, prefix = ''):
+    """ duration of a task clipped to [start, end), as a SQL expression
+
+    Only meaningful for tasks matched by ``overlap_q(start, end, now)``.
+
+    Args:
+        start (datetime): window start
+        end (datetime): window end
+        now (datetime): end of open tasks
+        prefix (str, optional): path to the tasks, e.g. ``'tasks__'``
+
+    Returns:
+        Expression: DurationField expression
+    """
+    lower = Greatest(
+            models.F(f'{prefix}begin_at'), models.Value(start),
+            output_field = models.DateTimeField(),
+        )
+    upper = Least(
+            Coalesce(models.F(f'{prefix}end_at'), models.Value(now)), models.Value(end),
+            output_field = models.DateTimeField(),
+        )
+    return models.ExpressionWrapper(upper - lower, output_field = models.DurationField())
+
+
+def time_report(queryset, start, end, bucket = 'day', tz = None, now = None):
+    """ tracked time and task count per calendar bucket, in one query per run of buckets
+
+    Every task is clipped to each bucket it overlaps, so a task running
+    over midnight is split between both days rather than attributed to
+    the day it began.
+
+    Args:
+        queryset (Queryset): tasks to report on
+        start (datetime): aware window start, inclusive
+        end (datetime): aware window end, exclusive
+        bucket (str, optional): one of ``BUCKETS``
+        tz (str | tzinfo, optional): time zone of the calendar
+        now (datetime, optional): end of open tasks, defaults to now
+
+    Raises:
+        ValueError: if the bucket is unknown, the window is empty or too long
+
+    Returns:
+        List[dict]: ``start``, ``end``, ``duration`` and ``tasks`` of every
+        bucket, in chronological order
+    """
+    now = now or timezone.now()
+    bounds = bucket_bounds(start, end, bucket, tz)
+
+    totals = {}
+    for offset, chunk in _chunks(bounds, 2):
+        aggregates = {}
+        for i, (lower, upper) in enumerate(chunk, offset):
+            matches = overlap_q(lower, upper, now)
+            aggregates[f'duration_{i}'] = models.Sum(clipped_duration(lower, upper, now), filter = matches)
+            aggregates[f'tasks_{i}'] = models.Count('id', filter = matches)
+
+        totals.update(queryset.filter(overlap_q(chunk[0][0], chunk[-1][1], now)).aggregate(**aggregates))
+
+    return [
+        {
+            'start': lower,
+            'end': upper,
+            'duration': totals[f'duration_{i}'] or datetime.timedelta(0),
+            'tasks': totals[f'tasks_{i}'],
+        }
+        for i, (lower, upper) in enumerate(bounds)
+    ]
+
+
+def _member_query(groups, start, end, now, bounds = (), offset = 0, totals = True):
+    """ one row per group and member with the aggregates of some buckets """
+    # the window is part of the join, members without tasks keep a row
+    window = FilteredRelation('user__tasks', condition = overlap_q(start, end, now, prefix = 'user__tasks__'))
+
+    completed = models.Q(window__is_completed = True)
+    aggregates = {}
+    if totals:
+        aggregates['tasks'] = models.Count('window__id')
+        aggregates['completed'] = models.Count('window__id', filter = completed)
+    for i, (lower, upper) in enumerate(bounds, offset):
+        matches = overlap_q(lower, upper, now, prefix = 'window__')
+        aggregates[f'duration_{i}'] = models.Sum(clipped_duration(lower, upper, now, prefix = 'window__'), filter = matches)
+        aggregates[f'tasks_{i}'] = models.Count('window__id', filter = matches)
+        aggregates[f'completed_{i}'] = models.Count('window__id', filter = matches & completed)
+
+    return list(
+        groups.annotate(
+            window = window
+        ).values(
+            'pk', 'name', 'user', 'user__username'
+        ).annotate(
+            **aggregates
+        ).order_by(
+            'user__username'
+        )
+    )
+
+
+def _member_rows(groups, bounds, now):
+    """ one row per group and member with the aggregates of every bucket """
+    start, end = bounds[0][0], bounds[-1][1]
+    chunks = _chunks(bounds, 3)
+    if len(chunks) == 1:
+        return _member_query(groups, start, end, now, bounds)
+
+    # window totals apart, a task overlapping several runs counts once
+    rows = {(row['pk'], row['user']): row for row in _member_query(groups, start, end, now)}
+    for offset, chunk in chunks:
+        for row in _member_query(groups, chunk[0][0], chunk[-1][1], now, chunk, offset, totals = False):
+            rows.setdefault((row['pk'], row['user']), {'tasks': 0, 'completed': 0}).update(row)
+    return list(rows.values())
+
+
+def _member_rows_in_thread(groups, bounds, now):
+    try:
+        return _member_rows(groups, bounds, now)
+    finally:
+        # the worker thread opened its own connections
+        connections.close_all()
+
+
+def group_report(groups, start, end, bucket = 'week', tz = None, now = None, workers = 1):
+    """ tracked time, tasks and completed tasks per group and member
+
+    Members and buckets come out of a single ``GROUP BY`` over groups,
+    their members and tasks, split by runs of buckets for long reports;
+    the group numbers are summed from the member rows. Very large
+    organizations can split the groups into ``workers`` chunks queried in
+    parallel, one query and connection per chunk.
+
+    Args:
+        groups (Queryset): groups to report on
+        start (datetime): aware window start, inclusive
+        end (datetime): aware window end, exclusive
+        bucket (str, optional): one of ``BUCKETS``
+        tz (str | tzinfo, optional): time zone of the calendar
+        now (datetime, optional): end of open tasks, defaults to now
+        workers (int, optional): parallel queries, always 1 on SQLite
+
+    Raises:
+        ValueError: if the bucket is unknown, the window is empty or too long
+
+    Returns:
+        List[dict]: ``group``, ``name``, ``duration``, ``tasks``,
+        ``completed``, ``buckets`` and ``members`` of every group, ordered
+        by name. Members have ``user``, ``username`` and the same numbers,
+        buckets a ``start`` and ``end`` each. A member of several groups
+        counts in all of them.
+    """
+    now = now or timezone.now()
+    bounds = bucket_bounds(start, end, bucket, tz)
+
+    if connections[groups.db].vendor == 'sqlite':
+        # SQLite runs a single query at a time
+        workers = 1
+
+    if workers <= 1:
+        rows = _member_rows(groups, bounds, now)
+    else:
+        ids = list(groups.values_list('pk', flat = True))
+        chunks = [groups.filter(pk__in = ids[i::workers]) for i in range(min(workers, len(ids)))]
+        with ThreadPoolExecutor(max_workers = len(chunks) or 1) as pool:
+            rows = [row for chunk in pool.map(lambda chunk: _member_rows_in_thread(chunk, bounds, now), chunks)
+                    for row in chunk]
+
+    def numbers(row = None):
+        buckets = [
+            {
+                'start': lower,
+                'end': upper,
+                'duration': (row and row.get(f'duration_{i}')) or datetime.timedelta(0),
+                'tasks': row.get(f'tasks_{i}', 0) if row else 0,
+                'completed': row.get(f'completed_{i}', 0) if row else 0,
+            }
+            for i, (lower, upper) in enumerate(bounds)
+        ]
+        return {
+            'duration': sum((bucket['duration'] for bucket in buckets), datetime.timedelta(0)),
+            'tasks': row['tasks'] if row else 0,
+            'completed': row['completed'] if row else 0,
+            'buckets': buckets,
+        }
+
+    report = {}
+    for row in rows:
+        group = report.get(row['pk'])
+        if group is None:
+            group = report[row['pk']] = {'group': row['pk'], 'name': row['name'], **numbers(), 'members': []}
+        if row['user'] is None:
+            continue  # a group without members
+
+        member = {'user': row['user'], 'username': row['user__username'], **numbers(row)}
+        group['members'].append(member)
+        for key in ('duration', 'tasks', 'completed'):
+            group[key] += member[key]
+        for total, bucket in zip(group['buckets'], member['buckets']):
+            for key in ('duration', 'tasks', 'completed'):
+                total[key] += bucket[key]
+
+    return sorted(report.values(), key = lambda group: (group['name'], group['group']))
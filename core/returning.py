@@ -0,0 +1,95 @@
+from django.db import connections
+from django.db.models import sql
+from django.db.models.deletion import Collector
+
+
+def supports_returning(using):
+    """ whether UPDATE / DELETE ... RETURNING can be used on a database
+
+    PostgreSQL always supports it, SQLite from 3.35 on, which is also when
+    it learned INSERT ... RETURNING. MariaDB only has it for INSERT and
+    DELETE, so other backends keep the two statement fallback.
+
+    Args:
+        using (str): database alias
+
+    Returns:
+        bool: True when both statements accept a RETURNING clause
+    """
+    connection = connections[using]
+    return (
+        connection.vendor in ('postgresql', 'sqlite')
+        and connection.features.can_return_columns_from_insert
+    )
+
+
+def _returning(compiler, model):
+    """ RETURNING clause of every concrete column and its converters """
+    qn = compiler.connection.ops.quote_name
+    fields = model._meta.concrete_fields
+    table = model._meta.db_table
+
+    clause = " RETURNING " + ", ".join(f"{qn(table)}.{qn(field.column)}" for field in fields)
+    converters = compiler.get_converters([field.get_col(table) for field in fields])
+    return clause, fields, converters
+
+
+def _execute(queryset, compiler, sql_text, params):
+    clause, fields, converters = _returning(compiler, queryset.model)
+    with compiler.connection.cursor() as cursor:
+        cursor.execute(sql_text + clause, params)
+        rows = cursor.fetchall()
+
+    if converters:
+        rows = compiler.apply_converters(rows, converters)
+
+    names = [field.attname for field in fields]
+    return [queryset.model.from_db(queryset.db, names, row) for row in rows]
+
+
+def update_returning(queryset, **fields):
+    """ update rows and read them back in the same statement
+
+    Args:
+        queryset (Queryset): rows to update
+        **fields (dict): new values, as for ``QuerySet.update``
+
+    Returns:
+        List[Model]: updated objects as stored after the update
+    """
+    query = queryset.query.chain(sql.UpdateQuery)
+    query.add_update_values(fields)
+    compiler = query.get_compiler(queryset.db)
+
+    sql_text, params = compiler.as_sql()
+    if not sql_text:
+        return list(queryset)
+    return _execute(queryset, compiler, sql_text, params)
+
+
+def can_delete_returning(queryset):
+    """ whether ``delete_returning`` may replace ``QuerySet.delete``
+
+    Only when Django itself would delete without collecting objects: no
+    signals, no cascades and no generic relations to follow.
+    """
+    return Collector(using = queryset.db, origin = queryset).can_fast_delete(queryset)
+
+
+def delete_returning(queryset):
+    """ delete rows and get their last state in the same statement
+
+    Callers must check ``can_delete_returning`` first.
+
+    Args:
+        queryset (Queryset): rows to delete
+
+    Returns:
+        List[Model]: deleted objects
+    """
+    query = queryset.query.clone()
+    query.__class__ = sql.DeleteQuery
+    compiler = query.get_compiler(queryset.db)
+
+    sql_text, params = compiler.as_sql()
+    return _execute(queryset, compiler, sql_text, params)
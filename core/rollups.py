@@ -0,0 +1,379 @@
+import datetime
+
+from django.db import connections, models, router
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .reports import MAX_COLUMNS, clipped_duration, overlap_q
+
+# days computed per query, three aggregate columns each
+MAX_RUN_DAYS = MAX_COLUMNS // 3
+
+# backends whose INSERT ... ON CONFLICT DO UPDATE adds up concurrent writers
+UPSERT_VENDORS = ('postgresql', 'sqlite')
+
+# rollups never read open tasks, so their "now" is irrelevant as long as
+# it does not let open tasks match
+_CLOSED_ONLY = datetime.datetime.min.replace(tzinfo = datetime.timezone.utc)
+
+
+def local_day(moment, tz = None):
+    """ calendar day of an instant in the rollup time zone """
+    return moment.astimezone(tz or timezone.get_default_timezone()).date()
+
+
+def day_bounds(day, tz = None):
+    """ aware [start, end) instants of a calendar day in the rollup time zone """
+    tz = tz or timezone.get_default_timezone()
+    start = datetime.datetime.combine(day, datetime.time.min, tzinfo = tz)
+    end = datetime.datetime.combine(day + datetime.timedelta(days = 1), datetime.time.min, tzinfo = tz)
+    return start, end
+
+
+def days_of(intervals, tz = None):
+    """ calendar days whose rollup depends on the given task intervals
+
+    A task counts on the day it begins and, once closed, adds tracked
+    time to every day it overlaps.
+
+    Args:
+        intervals (Iterable[Tuple[datetime, datetime]]): (begin_at, end_at)
+            pairs, ``end_at`` may be None
+        tz (tzinfo, optional): rollup time zone, defaults to TIME_ZONE
+
+    Returns:
+        Set[date]: affected days
+    """
+    days = set()
+    for begin_at, end_at in intervals:
+        if begin_at is None:
+            continue
+        day = local_day(begin_at, tz)
+        last = local_day(end_at, tz) if end_at is not None and end_at > begin_at else day
+        while day <= last:
+            days.add(day)
+            day += datetime.timedelta(days = 1)
+    return days
+
+
+def _runs(days):
+    """ group days into (first, last) runs of at most ``MAX_RUN_DAYS`` consecutive days """
+    runs = []
+    for day in sorted(days):
+        if runs and day - runs[-1][1] == datetime.timedelta(days = 1) and (day - runs[-1][0]).days < MAX_RUN_DAYS:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+def compute(user_id, first, last, tz = None, archived = None):
+    """ recompute the rollup values of consecutive days from raw tasks
+
+    Args:
+        user_id (int): owner of the tasks
+        first (date): first day, inclusive
+        last (date): last day, inclusive
+        tz (tzinfo, optional): rollup time zone, defaults to TIME_ZONE
+        archived (bool, optional): whether archived tasks can fall into the
+            run, read from the archive horizon when not given
+
+    Returns:
+        Dict[date, Tuple[timedelta, int, int]]: tracked time, task count
+        and completed task count of every day of the run
+    """
+    return compute_users([user_id], first, last, tz, archived)[user_id]
+
+
+def compute_users(user_ids, first, last, tz = None, archived = None):
+    """ ``compute`` for many users, one row per user from a single query per table
+
+    Args:
+        user_ids (Iterable[int]): owners of the tasks
+        first (date): first day, inclusive
+        last (date): last day, inclusive
+        tz (tzinfo, optional): rollup time zone, defaults to TIME_ZONE
+        archived (bool, optional): whether archived tasks can fall into the
+            run, read from the archive horizon when not given
+
+    Returns:
+        Dict[int, Dict[date, Tuple[timedelta, int, int]]]: the values of
+        every day of the run, per user
+    """
+    from .archive import may_overlap
+    from .models import Task, TaskArchive
+
+    user_ids = list(user_ids)
+    days = [first + datetime.timedelta(days = i) for i in range((last - first).days + 1)]
+    bounds = [day_bounds(day, tz) for day in days]
+
+    aggregates = {}
+    for i, (lower, upper) in enumerate(bounds):
+        begins = models.Q(begin_at__gte = lower, begin_at__lt = upper)
+        aggregates[f'tracked_{i}'] = models.Sum(
+                clipped_duration(lower, upper, _CLOSED_ONLY),
+                filter = overlap_q(lower, upper, _CLOSED_ONLY),
+            )
+        aggregates[f'tasks_{i}'] = models.Count('id', filter = begins)
+        aggregates[f'completed_{i}'] = models.Count('id', filter = begins & models.Q(is_completed = True))
+
+    start, end = bounds[0][0], bounds[-1][1]
+    sources = [Task]
+    if may_overlap(start) if archived is None else archived:
+        # archived tasks still count, see TaskArchive
+        sources.append(TaskArchive)
+
+    values = {user_id: {day: (datetime.timedelta(0), 0, 0) for day in days} for user_id in user_ids}
+    for model in sources:
+        rows = model.objects.filter(
+                models.Q(begin_at__gte = start) | overlap_q(start, end, _CLOSED_ONLY),
+                created_by_id__in = user_ids,
+                begin_at__lt = end,
+            ).order_by().values('created_by_id').annotate(**aggregates)
+
+        for totals in rows:
+            user = values[totals['created_by_id']]
+            for i, day in enumerate(days):
+                tracked, tasks, completed = user[day]
+                user[day] = (
+                    tracked + (totals[f'tracked_{i}'] or datetime.timedelta(0)),
+                    tasks + totals[f'tasks_{i}'],
+                    completed + totals[f'completed_{i}'],
+                )
+    return values
+
+
+def refresh(user_id, days, tz = None, using = None):
+    """ rewrite the rollup rows of the given days of a user
+
+    Days left without any task lose their row, so the table only holds
+    days with activity.
+
+    Args:
+        user_id (int): owner of the tasks
+        days (Iterable[date]): days to refresh
+        tz (tzinfo, optional): rollup time zone, defaults to TIME_ZONE
+        using (str, optional): database alias
+    """
+    refresh_users({user_id: days}, tz, using)
+
+
+def refresh_users(days, tz = None, using = None):
+    """ ``refresh`` for many users at once, e.g. a batch of imported users
+
+    Every run of days is computed for all users touching it in one query,
+    the rows are then written with a single upsert and a single delete.
+    The archive horizon is read once for all runs.
+
+    Args:
+        days (Dict[int, Iterable[date]]): days to refresh per user
+        tz (tzinfo, optional): rollup time zone, defaults to TIME_ZONE
+        using (str, optional): database alias
+    """
+    from .archive import horizon
+    from .models import DailyTaskRollup
+
+    days = {user_id: set(own) for user_id, own in days.items() if own}
+    if not days:
+        return
+
+    newest = horizon()
+    rows, empty = [], {}
+    for first, last in _runs(set().union(*days.values())):
+        users = [user_id for user_id, own in days.items() if any(first <= day <= last for day in own)]
+        archived = newest is not None and newest >= day_bounds(first, tz)[0]
+        for user_id, values in compute_users(users, first, last, tz, archived).items():
+            for day, (tracked, tasks, completed) in values.items():
+                if day not in days[user_id]:
+                    continue
+                if tasks or tracked:
+                    rows.append(DailyTaskRollup(user_id = user_id, day = day, tracked = tracked, tasks = tasks, completed = completed))
+                else:
+                    empty.setdefault(user_id, []).append(day)
+
+    manager = DailyTaskRollup.objects.db_manager(using)
+    if rows:
+        manager.bulk_create(
+            rows,
+            update_conflicts = True,
+            unique_fields = ['user', 'day'],
+            update_fields = ['tracked', 'tasks', 'completed'],
+        )
+    if empty:
+        stale = models.Q()
+        for user_id, own in empty.items():
+            stale |= models.Q(user_id = user_id, day__in = own)
+        manager.filter(stale).delete()
+
+
+def contribution(begin_at, end_at, is_completed, tz = None):
+    """ what a single task adds to the rollup of every day, as ``compute`` counts it
+
+    Args:
+        begin_at (datetime): begin of the task
+        end_at (datetime): end of the task, None while it runs
+        is_completed (bool): whether the task is completed
+        tz (tzinfo, optional): rollup time zone, defaults to TIME_ZONE
+
+    Returns:
+        Dict[date, Tuple[timedelta, int, int]]: tracked time, task count and
+        completed task count per day
+    """
+    values = {}
+    if begin_at is None:
+        return values
+
+    values[local_day(begin_at, tz)] = (datetime.timedelta(0), 1, int(bool(is_completed)))
+    if end_at is None:
+        return values
+
+    for day in days_of([(begin_at, end_at)], tz):
+        lower, upper = day_bounds(day, tz)
+        if end_at > lower and begin_at < upper:
+            tracked, tasks, completed = values.get(day, (datetime.timedelta(0), 0, 0))
+            values[day] = (tracked + min(end_at, upper) - max(begin_at, lower), tasks, completed)
+    return values
+
+
+def deltas(before, after, tz = None):
+    """ change of the rollups of a user when tasks go from ``before`` to ``after``
+
+    Args:
+        before (Iterable[Tuple[datetime, datetime, bool]]): (begin_at,
+            end_at, is_completed) of the written tasks before the write
+        after (Iterable[Tuple[datetime, datetime, bool]]): the same after it
+        tz (tzinfo, optional): rollup time zone, defaults to TIME_ZONE
+
+    Returns:
+        Dict[date, Tuple[timedelta, int, int]]: non-zero changes per day
+    """
+    totals = {}
+    for states, sign in ((before, -1), (after, 1)):
+        for state in states:
+            for day, (tracked, tasks, completed) in contribution(*state, tz = tz).items():
+                old = totals.get(day, (datetime.timedelta(0), 0, 0))
+                totals[day] = (old[0] + sign * tracked, old[1] + sign * tasks, old[2] + sign * completed)
+    return {day: values for day, values in totals.items() if any(values)}
+
+
+def _rows_per_query(connection, params):
+    return max(1, (connection.features.max_query_params or 2 ** 16) // params)
+
+
+def _upsert(rows, using):
+    """ add non-negative changes in INSERT ... ON CONFLICT DO UPDATE statements
+
+    The rows are summed up in the database, so concurrent writers of the
+    same day add up rather than overwrite each other.
+    """
+    from .models import DailyTaskRollup
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(DailyTaskRollup._meta.db_table)
+    fields = [DailyTaskRollup._meta.get_field(name) for name in ('user', 'day', 'tracked', 'tasks', 'completed')]
+    columns = ', '.join(qn(field.column) for field in fields)
+    updates = ', '.join(f'{qn(name)} = {table}.{qn(name)} + EXCLUDED.{qn(name)}' for name in ('tracked', 'tasks', 'completed'))
+
+    size = _rows_per_query(connection, len(fields))
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), size):
+            chunk = rows[i:i + size]
+            values = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(chunk))
+            params = [
+                field.get_db_prep_value(value, connection)
+                for row in chunk for field, value in zip(fields, row)
+            ]
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {values} '
+                f'ON CONFLICT ({qn(fields[0].column)}, {qn(fields[1].column)}) DO UPDATE SET {updates}',
+                params,
+            )
+
+
+def _update(rows, using):
+    """ add changes to existing rows, one UPDATE per user and distinct change
+
+    A task changes most of its days by the same amount, so even long
+    tasks take a few statements. Counts never drop below zero.
+    """
+    from .models import DailyTaskRollup
+
+    groups = {}
+    for user_id, day, *values in rows:
+        groups.setdefault((user_id, *values), []).append(day)
+
+    manager = DailyTaskRollup.objects.db_manager(using)
+    # the days, plus the user and the changes
+    size = _rows_per_query(connections[using], 1) - 8
+    for (user_id, tracked, tasks, completed), days in groups.items():
+        for i in range(0, len(days), size):
+            manager.filter(user_id = user_id, day__in = days[i:i + size]).update(
+                tracked = models.F('tracked') + tracked,
+                tasks = Greatest(models.F('tasks') + tasks, 0),
+                completed = Greatest(models.F('completed') + completed, 0),
+            )
+
+
+def _delete_emptied(days, using):
+    """ drop the rows of days left without tasks and tracked time """
+    from .models import DailyTaskRollup
+
+    manager = DailyTaskRollup.objects.db_manager(using)
+    size = _rows_per_query(connections[using], 1) - 8
+    for user_id, own in days.items():
+        for i in range(0, len(own), size):
+            manager.filter(
+                user_id = user_id, day__in = own[i:i + size], tasks = 0, tracked__lte = datetime.timedelta(0)
+            ).delete()
+
+
+def add(changes, using = None):
+    """ apply rollup changes of many users, each day row updated atomically
+
+    Increments are upserted, decrements applied to the existing rows, and
+    days left without tasks or tracked time lose their row.
+
+    Args:
+        changes (Dict[int, Dict[date, Tuple[timedelta, int, int]]]): changes
+            per user and day, see ``deltas``
+        using (str, optional): database alias, the write database by default
+    """
+    from .models import DailyTaskRollup
+
+    using = using or router.db_for_write(DailyTaskRollup)
+    increments, decrements, emptied = [], [], {}
+    for user_id, days in changes.items():
+        for day, (tracked, tasks, completed) in sorted(days.items()):
+            row = (user_id, day, tracked, tasks, completed)
+            if tracked >= datetime.timedelta(0) and tasks >= 0 and completed >= 0:
+                increments.append(row)
+                continue
+            decrements.append(row)
+            if tracked < datetime.timedelta(0) or tasks < 0:
+                emptied.setdefault(user_id, []).append(day)
+
+    if increments:
+        if connections[using].vendor in UPSERT_VENDORS:
+            _upsert(increments, using)
+        else:
+            DailyTaskRollup.objects.using(using).bulk_create(
+                [DailyTaskRollup(user_id = user_id, day = day) for user_id, day, *_ in increments],
+                ignore_conflicts = True,
+            )
+            _update(increments, using)
+
+    if decrements:
+        _update(decrements, using)
+    if emptied:
+        _delete_emptied(emptied, using)
+
+
+def apply(user_id, before, after, using = None):
+    """ move the rollups of a user from tasks as ``before`` to tasks as ``after``
+
+    Only the changed tasks are looked at, the days are not aggregated again.
+    """
+    changes = deltas(before, after)
+    if changes:
+        add({user_id: changes}, using)
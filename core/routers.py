@@ -0,0 +1,86 @@
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def replicas():
+    """ aliases of the read replicas, empty when every query goes to the primary """
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def pin_cache():
+    return caches[getattr(settings, "REPLICA_PIN_CACHE_ALIAS", "default")]
+
+
+def pin_seconds():
+    """ how long reads of a user stay on the primary after one of their writes """
+    return getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+
+def pin_key(user_id):
+    return f"core:primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """ send the reads of a user to the primary until replicas caught up
+
+    The pin lives in the shared cache so it holds whichever process serves
+    the next request of the user.
+
+    Args:
+        user_id (int): id of the user who just wrote
+    """
+    if replicas():
+        pin_cache().set(pin_key(user_id), True, pin_seconds())
+
+
+def is_pinned(user_id):
+    return pin_cache().get(pin_key(user_id), False)
+
+
+def _user_id(instance):
+    # reads through user.tasks / user.daily_rollups carry the user as hint,
+    # related lookups from a task or a rollup carry the task or the rollup
+    if instance is None:
+        return None
+    if instance._meta.model_name == "user":
+        return instance.pk
+    return getattr(instance, "created_by_id", None) or getattr(instance, "user_id", None)
+
+
+class ReplicaRouter:
+    """ send the reads of the User task methods to replicas, everything else to the primary
+
+    Reads are routed by the user they belong to, taken from the ``instance``
+    hint of related managers such as ``user.tasks``. They stay on the primary
+    inside a transaction and for ``REPLICA_PIN_SECONDS`` after a write of the
+    same user, so users always read their own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases:
+            return None
+
+        user_id = _user_id(hints.get("instance"))
+        if user_id is None:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or is_pinned(user_id):
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        # objects read from a replica are saved on the primary
+        return DEFAULT_DB_ALIAS if replicas() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name = None, **hints):
+        # replicas get the schema through replication
+        return False if db in replicas() else None
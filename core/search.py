@@ -0,0 +1,155 @@
+import logging
+import re
+
+from django.db import DatabaseError, connections, models
+
+logger = logging.getLogger(__name__)
+
+# words searched for, each one matched as a prefix of the words of a task
+TERM = re.compile(r'\w+')
+
+SQLITE_FTS_TABLE = 'core_task_fts'
+
+# FTS5 external content index over core_task, kept in sync by triggers
+SQLITE_FTS_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_task_fts USING fts5("
+    "name, description, content='core_task', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER IF NOT EXISTS core_task_fts_insert AFTER INSERT ON core_task BEGIN "
+    "INSERT INTO core_task_fts(rowid, name, description) VALUES (new.id, new.name, new.description); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS core_task_fts_delete AFTER DELETE ON core_task BEGIN "
+    "INSERT INTO core_task_fts(core_task_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS core_task_fts_update AFTER UPDATE OF name, description ON core_task BEGIN "
+    "INSERT INTO core_task_fts(core_task_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO core_task_fts(rowid, name, description) VALUES (new.id, new.name, new.description); "
+    "END",
+]
+SQLITE_FTS_TRIGGERS = {'core_task_fts_insert', 'core_task_fts_delete', 'core_task_fts_update'}
+
+# databases known to hold the FTS5 index, by (alias, name)
+_sqlite_fts = {}
+
+
+def terms(query):
+    """ words of a search query, lowercased """
+    return [term.lower() for term in TERM.findall(query or '')]
+
+
+def task_vector():
+    """ weighted text of a task, names first
+
+    Must stay identical to the expression of the task_search_gin index
+    created in migration 0007, or the index is not used.
+    """
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('name', weight = 'A', config = 'simple')
+        + SearchVector('description', weight = 'B', config = 'simple')
+    )
+
+
+def _postgres_search(queryset, words):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    query = SearchQuery(' & '.join(f"{word}:*" for word in words), config = 'simple', search_type = 'raw')
+    return queryset.alias(
+            document = task_vector()
+        ).filter(
+            document = query
+        ).annotate(
+            rank = SearchRank(task_vector(), query)
+        )
+
+
+def _sqlite_search(queryset, words):
+    match = ' '.join(f'"{word}"*' for word in words)
+    # a join on the FTS table, which the ORM cannot express
+    return queryset.extra(
+            tables = [SQLITE_FTS_TABLE],
+            where = [f'{SQLITE_FTS_TABLE}.rowid = core_task.id', f'{SQLITE_FTS_TABLE} MATCH %s'],
+            params = [match],
+            select = {'rank': f'-bm25({SQLITE_FTS_TABLE}, 4.0, 1.0)'},
+        )
+
+
+def _portable_search(queryset, words):
+    for word in words:
+        queryset = queryset.filter(models.Q(name__icontains = word) | models.Q(description__icontains = word))
+    return queryset.annotate(rank = models.Value(0.0, output_field = models.FloatField()))
+
+
+def has_sqlite_fts(connection):
+    """ whether the FTS5 index and all its triggers exist on a SQLite database """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND tbl_name = 'core_task')",
+            [SQLITE_FTS_TABLE],
+        )
+        names = {row[0] for row in cursor.fetchall()}
+    return SQLITE_FTS_TABLE in names and SQLITE_FTS_TRIGGERS <= names
+
+
+def sqlite_fts_ready(connection):
+    """ ``has_sqlite_fts``, checked once per database """
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in _sqlite_fts:
+        _sqlite_fts[key] = has_sqlite_fts(connection)
+    return _sqlite_fts[key]
+
+
+def search(queryset, query):
+    """ full text search of tasks by name and description
+
+    Every word of the query must start a word of the name or description.
+    Matches come with a ``rank``, higher for better matches and for hits
+    in the name. PostgreSQL uses a GIN index, SQLite an FTS5 index and
+    other databases a scan.
+
+    Args:
+        queryset (Queryset): tasks to search
+        query (str): words to look for
+
+    Returns:
+        Queryset: matching tasks annotated with ``rank``
+    """
+    words = terms(query)
+    if not words:
+        return queryset.annotate(rank = models.Value(0.0, output_field = models.FloatField())).none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _postgres_search(queryset, words)
+    if vendor == 'sqlite' and sqlite_fts_ready(connections[queryset.db]):
+        return _sqlite_search(queryset, words)
+    return _portable_search(queryset, words)
+
+
+def sync_sqlite_fts(sender, using, **kwargs):
+    """ ``post_migrate`` receiver restoring the FTS5 triggers of SQLite
+
+    SQLite migrations altering core_task rebuild the table, which drops
+    its triggers; they are created again and the index rebuilt.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    _sqlite_fts.pop((connection.alias, connection.settings_dict['NAME']), None)
+    if 'core_task' not in connection.introspection.table_names() or has_sqlite_fts(connection):
+        return
+
+    try:
+        with connection.cursor() as cursor:
+            for statement in SQLITE_FTS_SQL:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+    except DatabaseError as exc:
+        # SQLite built without FTS5, search_tasks() falls back to a scan
+        logger.warning("full text search index not available: %s", exc)
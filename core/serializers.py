@@ -0,0 +1,362 @@
+import csv
+import io
+import json
+import zlib
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Task, User
+
+# columns read by import_tasks, in the order they are written on export
+TASK_FIELDS = ('name', 'description', 'is_completed', 'begin_at', 'end_at')
+
+# columns read by import_users, NDJSON rows may add a list of ``tasks``
+USER_FIELDS = ('username', 'email', 'password', 'first_name', 'last_name', 'gender', 'is_staff', 'is_active')
+
+# columns written by export_tasks
+EXPORT_FIELDS = (
+    'id', 'created_by__username', 'name', 'description', 'is_completed',
+    'begin_at', 'end_at', 'created_at', 'updated_at',
+)
+EXPORT_HEADER = (
+    'id', 'user', 'name', 'description', 'is_completed',
+    'begin_at', 'end_at', 'created_at', 'updated_at',
+)
+
+FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# rows serialized per chunk handed to the response / output file
+ROWS_PER_CHUNK = 500
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', ''}
+
+
+def guess_format(path, default = 'csv'):
+    """ guess the serialization format from a file name
+
+    Args:
+        path (str): file name, ``-`` for stdin / stdout
+        default (str, optional): format used when nothing matches
+
+    Returns:
+        str: one of ``FORMATS``
+    """
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+
+    for extension, format in (('.ndjson', 'ndjson'), ('.jsonl', 'ndjson'), ('.csv', 'csv')):
+        if name.endswith(extension):
+            return format
+    return default
+
+
+def read_rows(stream, format):
+    """ lazily read task rows from a text stream
+
+    Only one row is held in memory at a time.
+
+    Args:
+        stream (TextIO): input stream
+        format (str): one of ``FORMATS``
+
+    Yields:
+        Tuple[int, dict | str]: line number and raw row
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    # NDJSON lines are decoded by parse_task_row so a broken line can be
+    # reported and skipped like any other invalid row
+    for line_no, line in enumerate(stream, start = 1):
+        line = line.strip()
+        if line:
+            yield line_no, line
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return False
+
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid boolean {value!r}")
+
+
+def _parse_datetime(value):
+    if value in (None, ''):
+        return None
+
+    parsed = parse_datetime(str(value).strip())
+    if parsed is None:
+        raise ValueError(f"invalid datetime {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_task_row(row):
+    """ convert a raw row into keyword arguments of ``User.create_task``
+
+    Unknown columns are ignored, a missing ``begin_at`` falls back to the
+    model default.
+
+    Args:
+        row (dict | str): raw row from ``read_rows``
+
+    Raises:
+        ValueError: if a value cannot be parsed
+
+    Returns:
+        dict: task fields
+    """
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as exc:
+            raise ValueError(f"invalid JSON ({exc})")
+    if not isinstance(row, dict):
+        raise ValueError("each line must be a JSON object")
+
+    task = {
+        'name': (row.get('name') or '').strip(),
+        'description': row.get('description') or None,
+        'is_completed': _parse_bool(row.get('is_completed')),
+        'end_at': _parse_datetime(row.get('end_at')),
+    }
+
+    begin_at = _parse_datetime(row.get('begin_at'))
+    if begin_at is not None:
+        task['begin_at'] = begin_at
+
+    return task
+
+
+def validate_task(task, user):
+    """ apply the field rules and the interval check of ``Task.save``
+
+    Args:
+        task (dict): task fields, e.g. from ``parse_task_row``
+        user (User): owner of the task
+
+    Raises:
+        ValueError: if the task is invalid
+    """
+    obj = Task(**task, created_by = user)
+    try:
+        obj.clean_fields(exclude = ['created_by'])
+    except ValidationError as exc:
+        raise ValueError("; ".join(
+            f"{name}: {message}" for name, messages in exc.message_dict.items() for message in messages
+        ))
+    obj.check_interval()
+
+
+def parse_user_row(row):
+    """ convert a raw row into user fields of ``User.objects.bulk_create_users``
+
+    Unknown columns are ignored, a missing or empty ``password`` gives an
+    unusable password.
+
+    Args:
+        row (dict | str): raw row from ``read_rows``
+
+    Raises:
+        ValueError: if a value cannot be parsed
+
+    Returns:
+        dict: user fields, with ``tasks`` when the row has any
+    """
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as exc:
+            raise ValueError(f"invalid JSON ({exc})")
+    if not isinstance(row, dict):
+        raise ValueError("each line must be a JSON object")
+
+    user = {
+        'username': (row.get('username') or '').strip(),
+        'email': (row.get('email') or '').strip(),
+        'password': row.get('password') or None,
+        'first_name': (row.get('first_name') or '').strip(),
+        'last_name': (row.get('last_name') or '').strip(),
+        'is_staff': _parse_bool(row.get('is_staff')),
+        'is_active': row.get('is_active') in (None, '') or _parse_bool(row['is_active']),
+    }
+    if row.get('gender'):
+        user['gender'] = row['gender'].strip()
+
+    tasks = row.get('tasks') or []
+    if not isinstance(tasks, list):
+        raise ValueError("tasks must be a list")
+    if tasks:
+        user['tasks'] = [parse_task_row(task) for task in tasks]
+    return user
+
+
+def validate_user(user):
+    """ apply the field rules of ``User`` and those of its tasks
+
+    Uniqueness is not checked, it is left to the database.
+
+    Args:
+        user (dict): user fields, e.g. from ``parse_user_row``
+
+    Raises:
+        ValueError: if the user or one of its tasks is invalid
+    """
+    fields = {name: value for name, value in user.items() if name not in ('password', 'tasks')}
+    obj = User(**fields)
+    try:
+        obj.clean_fields(exclude = ['password'])
+    except ValidationError as exc:
+        raise ValueError("; ".join(
+            f"{name}: {message}" for name, messages in exc.message_dict.items() for message in messages
+        ))
+    for task in user.get('tasks', []):
+        validate_task(task, obj)
+
+
+def parse_task_changes(row):
+    """ convert a partial row into keyword arguments of ``User.update_task``
+
+    Only the ``TASK_FIELDS`` present in the row are returned.
+
+    Args:
+        row (dict): raw partial row, e.g. a PATCH body
+
+    Raises:
+        ValueError: if a value cannot be parsed
+
+    Returns:
+        dict: changed task fields
+    """
+    if not isinstance(row, dict):
+        raise ValueError("body must be a JSON object")
+
+    parsers = {
+        'name': lambda value: (value or '').strip(),
+        'description': lambda value: value or None,
+        'is_completed': _parse_bool,
+        'begin_at': _parse_datetime,
+        'end_at': _parse_datetime,
+    }
+    changes = {name: parsers[name](row[name]) for name in TASK_FIELDS if name in row}
+
+    if 'begin_at' in changes and changes['begin_at'] is None:
+        raise ValueError("begin_at cannot be empty")
+    return changes
+
+
+def task_to_dict(task):
+    """ JSON ready representation of a task
+
+    Args:
+        task (Task): Task object
+
+    Returns:
+        dict: task fields
+    """
+    return {
+        'id': task.id,
+        'name': task.name,
+        'description': task.description,
+        'is_completed': task.is_completed,
+        'begin_at': task.begin_at,
+        'end_at': task.end_at,
+        'created_at': task.created_at,
+        'updated_at': task.updated_at,
+    }
+
+
+def export_rows(queryset, chunk_size = 2000):
+    """ stream export rows of a task queryset as plain tuples
+
+    Rows are read ``chunk_size`` at a time through a server-side cursor
+    where the backend supports one and never become model instances.
+
+    Args:
+        queryset (Queryset): tasks to export, in the wanted order
+        chunk_size (int, optional): rows fetched per round trip
+
+    Returns:
+        Iterator[tuple]: values of ``EXPORT_FIELDS``
+    """
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size = chunk_size)
+
+
+def _plain(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows):
+    """ serialize export rows as CSV text chunks, header first """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+
+    for count, row in enumerate(rows, start = 1):
+        writer.writerow(['' if value is None else _plain(value) for value in row])
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    """ serialize export rows as NDJSON text chunks, one object per line """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_HEADER, map(_plain, row)))))
+        if len(lines) == ROWS_PER_CHUNK:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def serialize(rows, format):
+    """ serialize export rows into text chunks of the given format """
+    if format == 'ndjson':
+        return iter_ndjson(rows)
+    return iter_csv(rows)
+
+
+def gzip_stream(chunks, level = 6):
+    """ gzip a stream of text chunks incrementally
+
+    Args:
+        chunks (Iterator[str]): text chunks
+        level (int, optional): compression level
+
+    Yields:
+        bytes: gzip member, piece by piece
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
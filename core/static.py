@@ -0,0 +1,244 @@
+import mimetypes
+import os
+import re
+import threading
+
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import ENCODINGS
+
+# file names of ManifestStaticFilesStorage, e.g. app.3f2a9c81d0e4.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=60'
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+# metadata of served files, so repeated requests skip the stat calls
+CACHE_SIZE = 4096
+
+
+class StaticFile(NamedTuple):
+    """ what ``serve`` needs to know about a file and its compressed variants """
+    path: str
+    size: int
+    mtime: float
+    # of the identity encoding, variants add their suffix, see ``variant_etag``
+    etag: str
+    content_type: str
+    variants: dict
+
+
+_files = OrderedDict()
+_lock = threading.Lock()
+
+
+def _stat(path):
+    stat = os.stat(path)
+    content_type, encoding = mimetypes.guess_type(path)
+    variants = {}
+    for coding, suffix in ENCODINGS.items():
+        try:
+            variants[coding] = (path + suffix, os.stat(path + suffix).st_size)
+        except OSError:
+            pass
+    return StaticFile(
+        path = path,
+        size = stat.st_size,
+        mtime = stat.st_mtime,
+        etag = f'"{int(stat.st_mtime_ns):x}-{stat.st_size:x}"',
+        content_type = content_type or 'application/octet-stream',
+        variants = variants,
+    )
+
+
+def variant_etag(static, coding = None):
+    """ ETag of one encoding of a file, e.g. ``"5f1e-2a0-gz"`` for gzip
+
+    Every encoding is a different sequence of bytes and needs its own
+    strong ETag, so byte ranges of one are never resumed from another.
+    """
+    if coding is None:
+        return static.etag
+    return f'{static.etag[:-1]}-{ENCODINGS[coding].lstrip(".")}"'
+
+
+def lookup(path, immutable):
+    """ metadata of a file, cached for hashed names which never change
+
+    Other files are checked again on every request, they can be replaced
+    in place.
+
+    Raises:
+        Http404: if there is no such file
+    """
+    if immutable:
+        with _lock:
+            found = _files.get(path)
+            if found is not None:
+                _files.move_to_end(path)
+                return found
+
+    try:
+        found = _stat(path)
+    except OSError:
+        raise Http404("file not found")
+    if not os.path.isfile(path):
+        raise Http404("file not found")
+
+    if immutable:
+        with _lock:
+            _files[path] = found
+            while len(_files) > CACHE_SIZE:
+                _files.popitem(last = False)
+    return found
+
+
+def clear_cache():
+    with _lock:
+        _files.clear()
+
+
+def _not_modified(request, static, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+    modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return modified_since is not None and int(static.mtime) <= modified_since
+
+
+def _range(request, static):
+    """ (start, end) of a satisfiable single byte range, None for the whole file
+
+    Returns False when the range cannot be satisfied.
+    """
+    header = request.headers.get('Range')
+    if not header or static.size == 0:
+        return None
+    # ranges address the identity encoding, so only its ETag resumes one
+    if_range = request.headers.get('If-Range')
+    if if_range is not None and if_range.strip() != static.etag:
+        return None
+
+    match = RANGE.match(header.strip())
+    if match is None:
+        # several ranges or other units, the whole file is a valid answer
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        start, end = max(0, static.size - int(last)), static.size - 1
+    else:
+        start = int(first)
+        end = min(int(last), static.size - 1) if last else static.size - 1
+    if start >= static.size or start > end:
+        return False
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as stream:
+        stream.seek(start)
+        while length > 0:
+            block = stream.read(min(CHUNK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def _accepts(request, coding):
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip().lower() == coding:
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+@require_safe
+def serve(request, path, document_root = None, immutable = None):
+    """ serve a collected static or media file
+
+    Files are sent with ``FileResponse``, so servers with a file wrapper
+    send them without Python reading them. Pre-compressed variants are
+    picked by ``Accept-Encoding`` and carry their own ETag.
+    ``If-None-Match``, ``If-Modified-Since`` and single byte ``Range``
+    requests of the identity encoding are answered with 304 and 206.
+
+    Args:
+        path (str): file path below ``document_root``
+        document_root (str): directory holding the files
+        immutable (bool, optional): cache for a year, by default for
+            content-hashed names only
+
+    Returns:
+        HttpResponse: the file, part of it, or 304 / 416 without body
+    """
+    try:
+        full_path = safe_join(document_root, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404("file not found")
+    if immutable is None:
+        immutable = bool(HASHED_NAME.search(path))
+
+    static = lookup(full_path, immutable)
+    path, size, encoding = static.path, static.size, None
+    for coding, (variant, variant_size) in static.variants.items():
+        if _accepts(request, coding):
+            path, size, encoding = variant, variant_size, coding
+            break
+
+    headers = {
+        'ETag': variant_etag(static, encoding),
+        'Last-Modified': http_date(static.mtime),
+        'Cache-Control': IMMUTABLE if immutable else REVALIDATE,
+        'Accept-Ranges': 'bytes',
+    }
+    if static.variants:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if _not_modified(request, static, headers['ETag']):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    byte_range = _range(request, static)
+    if byte_range is not None:
+        # ranges always address the identity encoding
+        headers['ETag'] = static.etag
+
+    if byte_range is False:
+        response = HttpResponse(status = 416, headers = headers)
+        response['Content-Range'] = f'bytes */{static.size}'
+        return response
+
+    if byte_range is not None:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+                _read(static.path, start, end - start + 1),
+                status = 206,
+                content_type = static.content_type,
+                headers = headers,
+            )
+        response['Content-Range'] = f'bytes {start}-{end}/{static.size}'
+        response['Content-Length'] = str(end - start + 1)
+        return response
+
+    response = FileResponse(open(path, 'rb'), content_type = static.content_type, headers = headers)
+    response['Content-Length'] = str(size)
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    return response
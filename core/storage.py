@@ -0,0 +1,79 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip variants are written without it
+    brotli = None
+
+# files worth compressing, images and fonts are compressed already
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico', '.wasm')
+
+# suffix of every pre-compressed variant, by content coding
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality = 11)
+    return gzip.compress(content, compresslevel = 9, mtime = 0)
+
+
+def available_encodings():
+    """ content codings that ``collectstatic`` writes variants for """
+    return [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ content-hashed static files with gzip and brotli variants
+
+    ``collectstatic`` writes ``<name>.gz`` and ``<name>.br`` next to every
+    compressible file when they are smaller, for ``core.static.serve`` to
+    send without compressing on the fly.
+
+    Without a manifest, before the first ``collectstatic``, URLs use the
+    plain file names like ``StaticFilesStorage``.
+    """
+    min_size = 256
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run = False, **options):
+        yield from super().post_process(paths, dry_run = dry_run, **options)
+        if dry_run:
+            return
+
+        names = set(self.hashed_files.values()) | set(paths)
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                self.write_variants(name)
+
+    def write_variants(self, name):
+        """ write the compressed variants of a file that are worth it
+
+        Returns:
+            List[str]: names of the written variants
+        """
+        with self.open(name) as stream:
+            content = stream.read()
+        if len(content) < self.min_size:
+            return []
+
+        written = []
+        for encoding in available_encodings():
+            compressed = compress(content, encoding)
+            # a few percent are not worth a Content-Encoding
+            if len(compressed) >= len(content) * 0.95:
+                continue
+
+            variant = name + ENCODINGS[encoding]
+            if self.exists(variant):
+                self.delete(variant)
+            self._save(variant, ContentFile(compressed))
+            written.append(variant)
+        return written
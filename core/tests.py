@@ -1,7 +1,36 @@
-from django.test    import TestCase
+import datetime
+import gzip
+import json
+import os
+import random
+import tempfile
+
+from io import StringIO
+from itertools import islice
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import check_password, is_password_usable
+from django.contrib.auth.models import Group
+from django.core.cache      import cache
+from django.core.management import call_command, CommandError
+from django.db      import connection, connections, transaction
+from django.test    import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils  import CaptureQueriesContext
+from django.urls    import reverse
 from django.utils   import timezone
 
-from .models import User, Task
+from . import archive, changes, metrics, occupancy, recurrence, rollups, search, static
+from .archive import archive_batch
+from .cache import summary_cache, summary_key
+from .pagination import EstimatedCountPaginator
+from .purge import delete_in_chunks
+from .models import User, Task, TaskArchive, DailyTaskRollup
+from .exceptions import ExpiredCursorException, InvalidCursorException, TaskNotFoundException
+from .reports import MAX_COLUMNS as MAX_REPORT_COLUMNS, group_report as reports_group_report, time_report as reports_time_report
+from .storage import available_encodings as storage_encodings
+from .passwords import hasher_pool, hash_passwords
+from .management.coldstart import measure as coldstart_measure, package_times
 
 
 class TestUserModel(TestCase):
@@ -154,5 +183,1896 @@ class TestUserModel(TestCase):
         
         tasks = self.user.get_tasks()
         self.assertEqual(len(tasks), 1)
-    
-    
\ No newline at end of file
+
+
+class TestTaskPagination(TestCase):
+    """
+    TestTaskPagination class for testing keyset pagination of tasks
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(
+            username="pageuser",
+            email="p@p.com",
+            password="testpass",
+        )
+        self.user.create_tasks([{"name": f"task {i}"} for i in range(25)])
+
+    def test_get_tasks_page_walks_all_tasks(self):
+        """ test pages cover every task once in get_tasks order """
+        seen, cursor = [], None
+        while True:
+            page = self.user.get_tasks_page(cursor = cursor, size = 10)
+            seen += [task.id for task in page.tasks]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, [task.id for task in self.user.get_tasks()])
+
+    def test_get_tasks_page_with_filters(self):
+        """ test page filters are applied before pagination """
+        self.user.complete_tasks(ids = [task.id for task in self.user.get_tasks()[:3]])
+
+        page = self.user.get_completed_tasks_page(size = 2)
+        self.assertEqual(len(page.tasks), 2)
+        page = self.user.get_completed_tasks_page(cursor = page.next_cursor, size = 2)
+        self.assertEqual(len(page.tasks), 1)
+        self.assertFalse(page.has_next)
+
+        page = self.user.get_tasks_page(size = 100, is_completed = False)
+        self.assertEqual(len(page.tasks), 22)
+        self.assertIsNone(page.next_cursor)
+
+    def test_get_tasks_page_invalid_cursor(self):
+        """ test malformed cursors are rejected """
+        with self.assertRaises(InvalidCursorException):
+            self.user.get_tasks_page(cursor = "not-a-cursor")
+
+    def test_iter_tasks_method(self):
+        """ test iter tasks yields every task in chunks """
+        tasks = list(self.user.iter_tasks(chunk_size = 7))
+        self.assertEqual([task.id for task in tasks], [task.id for task in self.user.get_tasks()])
+
+
+class TestExplainTasksCommand(TestCase):
+    """
+    TestExplainTasksCommand class for testing the query plan benchmark
+    """
+    def test_explain_tasks_command(self):
+        """ test explain tasks prints every method and rolls back its data """
+        out = StringIO()
+        call_command("explain_tasks", users = 2, tasks = 60, repeat = 1, stdout = out)
+
+        for name in ["get_tasks", "get_completed_tasks", "get_active_tasks", "delete_tasks"]:
+            self.assertIn(name, out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith = "explain").exists())
+
+
+class TestImportTasksCommand(TestCase):
+    """
+    TestImportTasksCommand class for testing the streaming bulk import
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(username="importer", email="i@i.com", password="testpass")
+
+    def write(self, suffix, content):
+        """ write content to a temporary input file """
+        fd, path = tempfile.mkstemp(suffix = suffix)
+        with os.fdopen(fd, "w") as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_csv(self):
+        """ test csv rows are imported in batches and invalid rows are skipped """
+        path = self.write(".csv", "\n".join([
+            "name,description,is_completed,begin_at,end_at",
+            "a,,true,2023-01-01T09:00:00Z,2023-01-01T10:00:00Z",
+            "b,desc,0,2023-01-02T09:00:00Z,",
+            "bad,,no,2023-01-03T10:00:00Z,2023-01-03T09:00:00Z",
+            "c,,yes,2023-01-04 09:00,2023-01-04 11:00",
+        ]))
+        out, err = StringIO(), StringIO()
+        call_command("import_tasks", path, user = "importer", batch_size = 2, commit_every = 2,
+                     skip_invalid = True, stdout = out, stderr = err)
+
+        self.assertIn("imported 3 tasks", out.getvalue())
+        self.assertIn("line 4", err.getvalue())
+        self.assertEqual(self.user.get_completed_tasks().count(), 2)
+        self.assertIsNone(self.user.get_task(name = "b").end_at)
+
+    def test_import_ndjson_stops_on_invalid_row(self):
+        """ test an invalid row aborts the import and rolls back its transaction """
+        path = self.write(".ndjson", "\n".join([
+            '{"name": "a", "begin_at": "2023-01-01T09:00:00Z"}',
+            '{"name": "b", "begin_at": "2023-01-01T09:00:00Z"}',
+            '{"name": ""}',
+        ]))
+        with self.assertRaisesMessage(CommandError, "line 3"):
+            call_command("import_tasks", path, user = "importer", batch_size = 1, commit_every = 1, stdout = StringIO())
+
+        self.assertEqual(self.user.get_tasks().count(), 2)
+
+    def test_create_tasks_validates_interval(self):
+        """ test create tasks applies the Task.save interval check """
+        with self.assertRaises(ValueError):
+            self.user.create_tasks([{
+                "name": "backwards",
+                "begin_at": timezone.now(),
+                "end_at": timezone.now() - timezone.timedelta(hours = 1),
+            }])
+        self.assertEqual(self.user.get_tasks().count(), 0)
+
+
+class TestExportTasks(TestCase):
+    """
+    TestExportTasks class for testing the streaming export view and command
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(username="exporter", email="e@e.com", password="testpass")
+        self.other = User.objects.create_user(username="other", email="o@o.com", password="testpass")
+        self.user.create_tasks([{"name": f"task {i}", "is_completed": i % 2 == 0} for i in range(5)])
+        self.other.create_task(name = "not mine")
+        self.client.force_login(self.user)
+
+    def test_export_view_csv(self):
+        """ test the export view streams the tasks of the current user """
+        response = self.client.get(reverse("core:export_tasks"))
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(lines[0].split(",")[:3], ["id", "user", "name"])
+        self.assertEqual(len(lines), 6)
+        self.assertNotIn("not mine", "".join(lines))
+
+    def test_export_view_ndjson_gzip(self):
+        """ test the export view compresses ndjson output """
+        response = self.client.get(reverse("core:export_tasks"), {"format": "ndjson", "gzip": "1"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        rows = [json.loads(line) for line in gzip.decompress(b"".join(response.streaming_content)).splitlines()]
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual({row["user"] for row in rows}, {"exporter"})
+
+    def test_export_view_rejects_unknown_format(self):
+        """ test the export view validates the format """
+        response = self.client.get(reverse("core:export_tasks"), {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command_round_trips_with_import(self):
+        """ test exported files can be imported again """
+        fd, path = tempfile.mkstemp(suffix = ".csv.gz")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        call_command("export_tasks", output = path, stderr = StringIO())
+        call_command("import_tasks", path, user = "other", stdout = StringIO())
+
+        self.assertEqual(self.other.get_tasks().count(), 7)
+        self.assertEqual(self.other.get_completed_tasks().count(), 3)
+
+
+class TestTaskSummary(TestCase):
+    """
+    TestTaskSummary class for testing the cached per-user task summary
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        cache.clear()
+        now = timezone.now()
+        self.user = User.objects.create_user(username="summary", email="s@s.com", password="testpass")
+        self.user.create_tasks([
+            {"name": "done", "is_completed": True, "begin_at": now - timezone.timedelta(hours = 3), "end_at": now - timezone.timedelta(hours = 1)},
+            {"name": "running", "begin_at": now - timezone.timedelta(hours = 1)},
+            {"name": "closed", "begin_at": now - timezone.timedelta(hours = 5), "end_at": now - timezone.timedelta(hours = 4)},
+        ])
+
+    def test_get_task_summary_method(self):
+        """ test summary counts and tracked time """
+        summary = self.user.get_task_summary()
+        self.assertEqual(summary["total"], 3)
+        self.assertEqual(summary["completed"], 1)
+        self.assertEqual(summary["active"], 1)
+        self.assertEqual(summary["tracked"], timezone.timedelta(hours = 3))
+
+    def test_get_task_summary_is_cached(self):
+        """ test repeated reads are served from the cache """
+        self.user.get_task_summary()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.get_task_summary()["total"], 3)
+
+    def test_get_task_summary_invalidated_by_mutations(self):
+        """ test every kind of mutation refreshes the summary """
+        self.user.get_task_summary()
+
+        task = self.user.create_task(name = "new")
+        self.assertEqual(self.user.get_task_summary()["total"], 4)
+
+        self.user.complete_task(id = task.id)
+        self.assertEqual(self.user.get_task_summary()["completed"], 2)
+
+        self.user.incomplete_tasks(ids = [task.id])
+        self.assertEqual(self.user.get_task_summary()["completed"], 1)
+
+        self.user.delete_task(id = task.id)
+        self.assertEqual(self.user.get_task_summary()["total"], 3)
+
+        self.user.delete_tasks(ids = list(self.user.get_tasks().values_list("id", flat = True)))
+        self.assertEqual(self.user.get_task_summary()["total"], 0)
+
+    def test_get_task_summary_invalidated_on_commit(self):
+        """ test a summary cached during a write transaction is dropped on commit """
+        with self.captureOnCommitCallbacks(execute = True):
+            with transaction.atomic():
+                self.user.create_task(name = "new")
+                # a concurrent reader caching the counts before the commit
+                summary_cache().set(summary_key(self.user.id), {"total": 3})
+        self.assertEqual(self.user.get_task_summary()["total"], 4)
+
+
+class TestTimeReport(TestCase):
+    """
+    TestTimeReport class for testing database side duration aggregation
+    """
+    def setUp(self):
+        """
+        setUp method for creating random test data
+        """
+        rng = random.Random(1729)
+        self.now = timezone.now().replace(microsecond = 0)
+        self.start = self.now - timezone.timedelta(days = 40)
+        self.user = User.objects.create_user(username="reporter", email="r@r.com", password="testpass")
+
+        tasks = []
+        for i in range(200):
+            begin_at = self.start - timezone.timedelta(days = 5) + timezone.timedelta(minutes = rng.randint(0, 50 * 24 * 60))
+            end_at = None
+            if rng.random() > 0.1:
+                end_at = begin_at + timezone.timedelta(minutes = rng.randint(0, 3 * 24 * 60))
+            tasks.append({"name": f"task {i}", "begin_at": min(begin_at, self.now), "end_at": end_at})
+        self.user.create_tasks(tasks)
+
+    def expected(self, lower, upper):
+        """ clipped duration of the tasks computed with Python """
+        total = timezone.timedelta(0)
+        for task in Task.objects.filter(created_by = self.user):
+            end_at = task.end_at if task.end_at is not None else self.now
+            overlap = min(end_at, upper) - max(task.begin_at, lower)
+            if overlap > timezone.timedelta(0):
+                total += overlap
+        return total
+
+    def test_time_report_matches_python(self):
+        """ test every bucket matches the clipped Python computation """
+        for bucket, tz in [("day", "UTC"), ("week", "America/New_York"), ("month", "Asia/Kolkata")]:
+            report = self.user.time_report(self.start, self.now, bucket = bucket, tz = tz, now = self.now)
+
+            self.assertEqual(report[0]["start"], self.start)
+            self.assertEqual(report[-1]["end"], self.now)
+            for row in report:
+                self.assertEqual(row["duration"], self.expected(row["start"], row["end"]), (bucket, row["start"]))
+
+    def test_time_report_matches_duration_property(self):
+        """ test a window around closed tasks adds up to Task.duration """
+        end = self.now + timezone.timedelta(days = 10)
+        closed = [task for task in Task.objects.filter(created_by = self.user) if task.end_at is not None]
+        window_start = min(task.begin_at for task in closed)
+
+        report = self.user.tasks.filter(end_at__isnull = False)
+        totals = reports_time_report(report, window_start, end, bucket = "month", now = self.now)
+
+        self.assertEqual(
+            sum((row["duration"] for row in totals), timezone.timedelta(0)),
+            sum((task.duration for task in closed), timezone.timedelta(0)),
+        )
+
+    def test_time_report_day_buckets_follow_local_midnight(self):
+        """ test day buckets start at midnight of the requested time zone """
+        start = datetime.datetime(2023, 3, 11, tzinfo = datetime.timezone.utc)
+        end = datetime.datetime(2023, 3, 14, tzinfo = datetime.timezone.utc)
+        report = self.user.time_report(start, end, bucket = "day", tz = "America/New_York")
+
+        # the DST switch on 2023-03-12 makes that local day 23 hours long
+        utc = datetime.timezone.utc
+        lengths = [row["end"].astimezone(utc) - row["start"].astimezone(utc) for row in report]
+        self.assertIn(timezone.timedelta(hours = 23), lengths)
+
+    def test_time_report_rejects_unknown_bucket(self):
+        """ test unknown buckets raise ValueError """
+        with self.assertRaises(ValueError):
+            self.user.time_report(self.start, self.now, bucket = "year")
+
+    def test_time_report_of_years_of_days(self):
+        """ test long daily reports are split into queries below the column limits """
+        start = self.now - timezone.timedelta(days = 3 * 365)
+        with self.assertNumQueries(-(-(3 * 365 + 1) // (MAX_REPORT_COLUMNS // 2))):
+            days = self.user.time_report(start, self.now, bucket = "day", tz = "UTC", now = self.now)
+        months = self.user.time_report(start, self.now, bucket = "month", tz = "UTC", now = self.now)
+        self.assertEqual(len(days), 3 * 365 + 1)
+        self.assertEqual(sum((row["duration"] for row in days), timezone.timedelta(0)),
+                         sum((row["duration"] for row in months), timezone.timedelta(0)))
+        self.assertEqual(days[-2]["duration"], self.expected(days[-2]["start"], days[-2]["end"]))
+
+        with self.assertRaisesRegex(ValueError, "at most"):
+            self.user.time_report(self.now - timezone.timedelta(days = 11 * 365), self.now, bucket = "day")
+
+
+class TestDailyTaskRollup(TestCase):
+    """
+    TestDailyTaskRollup class for testing the incrementally maintained rollups
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(username="rollup", email="r@r.com", password="testpass")
+        self.day = datetime.datetime(2023, 5, 1, tzinfo = datetime.timezone.utc)
+
+    def rollups(self):
+        """ rollup rows of the user as {day: (tracked, tasks, completed)} """
+        return {
+            row.day: (row.tracked, row.tasks, row.completed)
+            for row in DailyTaskRollup.objects.filter(user = self.user)
+        }
+
+    def test_task_spanning_years(self):
+        """ test a task over years refreshes its days in bounded queries """
+        end = self.day + timezone.timedelta(days = 3 * 365, hours = 12)
+        task = self.user.create_task(name = "long", begin_at = self.day, end_at = end)
+
+        rollups = self.rollups()
+        self.assertEqual(len(rollups), 3 * 365 + 1)
+        self.assertEqual(sum((tracked for tracked, *_ in rollups.values()), timezone.timedelta(0)), task.duration)
+        self.assertEqual(rollups[datetime.date(2023, 5, 1)][1], 1)
+
+    def test_save_is_atomic(self):
+        """ test a failing bookkeeping step rolls the task write back """
+        with mock.patch("core.rollups.add", side_effect = RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.user.create_task(name = "lost", begin_at = self.day, end_at = self.day)
+        self.assertFalse(self.user.tasks.exists())
+        self.assertFalse(self.user.task_changes.exists())
+
+    def test_rollups_follow_task_writes(self):
+        """ test create, update, complete and delete keep the rollups exact """
+        hour = timezone.timedelta(hours = 1)
+        task = self.user.create_task(name = "a", begin_at = self.day + 9 * hour, end_at = self.day + 11 * hour)
+        self.user.create_tasks([{"name": "b", "begin_at": self.day + 23 * hour, "end_at": self.day + 26 * hour}])
+        may1, may2 = datetime.date(2023, 5, 1), datetime.date(2023, 5, 2)
+
+        self.assertEqual(self.rollups(), {may1: (3 * hour, 2, 0), may2: (2 * hour, 0, 0)})
+
+        self.user.complete_task(id = task.id)
+        self.assertEqual(self.rollups()[may1], (3 * hour, 2, 1))
+
+        self.user.update_task(id = task.id, begin_at = self.day + 33 * hour, end_at = self.day + 34 * hour)
+        self.assertEqual(self.rollups(), {may1: (hour, 1, 0), may2: (3 * hour, 1, 1)})
+
+        task = self.user.get_task(id = task.id)
+        task.end_at = self.day + 35 * hour
+        task.save()
+        self.assertEqual(self.rollups()[may2], (4 * hour, 1, 1))
+
+        self.user.delete_task(id = task.id)
+        self.assertEqual(self.rollups(), {may1: (hour, 1, 0), may2: (2 * hour, 0, 0)})
+
+        self.user.delete_tasks(ids = list(self.user.get_tasks().values_list("id", flat = True)))
+        self.assertEqual(self.rollups(), {})
+
+    def test_interleaved_writers_keep_rollups_exact(self):
+        """ test a write landing between another write's delta and its apply is not lost """
+        hour = timezone.timedelta(hours = 1)
+        first = self.user.create_task(name = "a", begin_at = self.day + 9 * hour, end_at = self.day + 10 * hour)
+        second = self.user.create_task(name = "b", begin_at = self.day + 11 * hour, end_at = self.day + 12 * hour)
+        add = rollups.add
+
+        def interleaved(changes, using = None):
+            # writer B runs its whole write after writer A computed its deltas
+            with mock.patch("core.rollups.add", add):
+                self.user.update_task(id = second.id, end_at = self.day + 14 * hour)
+                self.user.complete_task(id = second.id)
+            add(changes, using = using)
+
+        with mock.patch("core.rollups.add", side_effect = interleaved):
+            self.user.update_task(id = first.id, end_at = self.day + 13 * hour)
+
+        may1 = datetime.date(2023, 5, 1)
+        self.assertEqual(self.rollups(), {may1: (7 * hour, 2, 1)})
+        self.assertEqual(self.rollups(), rollups.compute(self.user.id, may1, may1))
+
+    def test_rollup_report_matches_time_report(self):
+        """ test weekly rollups add up like the raw task report """
+        rng = random.Random(7)
+        self.user.create_tasks([
+            {
+                "name": f"task {i}",
+                "begin_at": (begin := self.day + timezone.timedelta(minutes = rng.randint(0, 40 * 24 * 60))),
+                "end_at": begin + timezone.timedelta(minutes = rng.randint(0, 36 * 60)),
+                "is_completed": rng.random() < 0.5,
+            }
+            for i in range(80)
+        ])
+        end = self.day + timezone.timedelta(days = 60)
+
+        expected = self.user.time_report(self.day, end, bucket = "month", tz = "UTC")
+        report = self.user.rollup_report(self.day.date(), end.date(), bucket = "month")
+
+        self.assertEqual([row["tracked"] for row in report], [row["duration"] for row in expected][:len(report)])
+        self.assertEqual(sum(row["tasks"] for row in report), 80)
+
+    def test_rebuild_rollups_command(self):
+        """ test the rebuild command repairs drifted rollups """
+        self.user.create_tasks([
+            {"name": "a", "begin_at": self.day, "end_at": self.day + timezone.timedelta(days = 3)},
+            {"name": "b", "begin_at": self.day + timezone.timedelta(days = 40), "is_completed": True},
+        ])
+        expected = self.rollups()
+
+        DailyTaskRollup.objects.filter(user = self.user).update(tasks = 99)
+        DailyTaskRollup.objects.create(user = self.user, day = datetime.date(2020, 1, 1), tasks = 1)
+
+        call_command("rebuild_rollups", workers = 1, chunk_days = 7, stdout = StringIO())
+        self.assertEqual(self.rollups(), expected)
+
+
+class TestIntervalQueries(TestCase):
+    """
+    TestIntervalQueries class for testing the interval query API
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(username="calendar", email="c@c.com", password="testpass")
+        self.day = datetime.datetime(2023, 5, 2, tzinfo = datetime.timezone.utc)
+        hour = timezone.timedelta(hours = 1)
+        self.user.create_tasks([
+            {"name": "morning", "begin_at": self.day + 8 * hour, "end_at": self.day + 9 * hour},
+            {"name": "ends at nine", "begin_at": self.day + 6 * hour, "end_at": self.day + 9 * hour},
+            {"name": "afternoon", "begin_at": self.day + 13 * hour, "end_at": self.day + 15 * hour},
+            {"name": "night", "begin_at": self.day + 20 * hour, "end_at": self.day + 22 * hour},
+            {"name": "open", "begin_at": self.day + 12 * hour},
+            {"name": "yesterday", "begin_at": self.day - 10 * hour, "end_at": self.day - 9 * hour},
+        ])
+        self.hour = hour
+
+    def names(self, tasks):
+        return sorted(task.name for task in tasks)
+
+    def test_tasks_overlapping_method(self):
+        """ test tasks overlapping a working day window """
+        tasks = self.user.tasks_overlapping(self.day + 9 * self.hour, self.day + 17 * self.hour)
+        self.assertEqual(self.names(tasks), ["afternoon", "ends at nine", "morning", "open"])
+
+    def test_tasks_active_at_method(self):
+        """ test tasks running at a single instant """
+        self.assertEqual(self.names(self.user.tasks_active_at(self.day + 14 * self.hour)), ["afternoon", "open"])
+        self.assertEqual(self.names(self.user.tasks_active_at(self.day + 30 * self.hour)), ["open"])
+        self.assertEqual(self.names(self.user.tasks_active_at(self.day)), [])
+
+    def test_tasks_overlapping_rejects_reversed_window(self):
+        """ test a window ending before it starts raises ValueError """
+        with self.assertRaises(ValueError):
+            self.user.tasks_overlapping(self.day, self.day - self.hour)
+
+
+class TestAsyncTaskApi(TestCase):
+    """
+    TestAsyncTaskApi class for testing the async User methods and views
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username="async", email="a@a.com", password="testpass")
+        self.user.create_tasks([{"name": f"task {i}"} for i in range(3)])
+
+    async def test_async_user_methods(self):
+        """ test async methods mirror the sync task API """
+        task = await self.user.acreate_task(name = "async task")
+        self.assertEqual((await self.user.aget_task(id = task.id)).name, "async task")
+        self.assertEqual(len(await self.user.aget_tasks()), 4)
+
+        await self.user.acreate_tasks([{"name": "bulk"}])
+        self.assertEqual(await self.user.acomplete_tasks(ids = [task.id]), 1)
+        self.assertEqual([t.id for t in await self.user.aget_completed_tasks()], [task.id])
+
+        task = await self.user.aincomplete_task(id = task.id)
+        self.assertFalse(task.is_completed)
+        task = await self.user.aupdate_task(id = task.id, name = "renamed")
+        self.assertEqual(task.name, "renamed")
+        self.assertTrue((await self.user.acomplete_task(id = task.id)).is_completed)
+
+        page = await self.user.aget_tasks_page(size = 2)
+        self.assertEqual(len(page.tasks), 2)
+        self.assertTrue(page.has_next)
+
+        await self.user.adelete_task(id = task.id)
+        with self.assertRaises(TaskNotFoundException):
+            await self.user.aget_task(id = task.id)
+        ids = [t.id for t in await self.user.aget_tasks()]
+        self.assertEqual(await self.user.adelete_tasks(ids = (id for id in ids)), 4)
+        self.assertEqual(await self.user.aget_active_tasks(), [])
+
+    def test_aupdate_task_reads_rows_back(self):
+        """ test async updates use UPDATE ... RETURNING like the sync API """
+        task = self.user.get_tasks()[0]
+        # UPDATE ... RETURNING logging itself, no SELECT after it
+        with self.assertNumQueries(1):
+            task = async_to_sync(self.user.aupdate_task)(id = task.id, name = "renamed")
+        self.assertEqual((task.name, task.created_by), ("renamed", self.user))
+        self.assertIsNone(async_to_sync(self.user.aupdate_task)(id = 0, name = "missing"))
+        self.assertEqual(async_to_sync(self.user.aupdate_tasks)(ids = [task.id], description = "many"), 1)
+        with self.assertRaises(TaskNotFoundException):
+            async_to_sync(self.user.acomplete_task)(id = 0)
+
+    def test_tasks_api_views(self):
+        """ test the async JSON views """
+        url = reverse("core:tasks_api")
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.user)
+
+        response = self.client.post(url, {"name": "api", "begin_at": "2023-01-01T09:00:00Z"}, content_type = "application/json")
+        self.assertEqual(response.status_code, 201)
+        id = response.json()["id"]
+
+        response = self.client.post(url, {"name": ""}, content_type = "application/json")
+        self.assertEqual(response.status_code, 400)
+
+        page = self.client.get(url, {"size": 3}).json()
+        self.assertEqual(len(page["tasks"]), 3)
+        page = self.client.get(url, {"size": 3, "cursor": page["next_cursor"]}).json()
+        self.assertEqual(len(page["tasks"]), 1)
+        self.assertIsNone(page["next_cursor"])
+
+        task_url = reverse("core:task_api", args = [id])
+        response = self.client.patch(task_url, {"is_completed": True}, content_type = "application/json")
+        self.assertTrue(response.json()["is_completed"])
+        response = self.client.patch(task_url, {"end_at": "2022-01-01T00:00:00Z"}, content_type = "application/json")
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.client.delete(task_url).status_code, 204)
+        self.assertEqual(self.client.get(task_url).status_code, 404)
+
+    def test_patch_of_task_deleted_meanwhile(self):
+        """ test a task deleted between the read and the update of a PATCH is a 404 """
+        self.client.force_login(self.user)
+        task = self.user.create_task(name = "racing")
+        task_url = reverse("core:task_api", args = [task.id])
+
+        with mock.patch.object(User, "aupdate_task", return_value = None):
+            response = self.client.patch(task_url, {"name": "late"}, content_type = "application/json")
+        self.assertEqual(response.status_code, 404)
+
+
+class TestTaskResponseCache(TestCase):
+    """
+    TestTaskResponseCache class for testing the versioned task API responses
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="etag", email="e@e.com", password="testpass")
+        self.task = self.user.create_task(name = "cached")
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse("core:tasks_api")
+
+    def test_every_write_changes_the_version(self):
+        """ test the task mutation methods bump the task version """
+        writes = [
+            lambda: self.user.create_task(name = "new"),
+            lambda: self.user.create_tasks([{"name": "bulk"}]),
+            lambda: self.user.update_task(id = self.task.id, name = "renamed"),
+            lambda: self.user.update_tasks(ids = [self.task.id], description = "text"),
+            lambda: self.user.complete_task(id = self.task.id),
+            lambda: self.user.incomplete_task(id = self.task.id),
+            lambda: self.user.complete_tasks(ids = [self.task.id]),
+            lambda: self.user.incomplete_tasks(ids = [self.task.id]),
+            lambda: self.user.delete_tasks(ids = [self.user.create_task(name = "gone").id]),
+            lambda: self.user.delete_task(id = self.task.id),
+        ]
+        for write in writes:
+            version = self.user.get_task_version()
+            self.assertEqual(self.user.get_task_version(), version)
+            write()
+            self.assertNotEqual(self.user.get_task_version(), version)
+
+    def test_responses_are_cached_per_version(self):
+        """ test cached bodies, 304 without task queries and invalidation by writes """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        # session, user and the version, an index-only MAX over the change log
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()["tasks"][0]["name"], "cached")
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, headers = {"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.user.update_task(id = self.task.id, name = "renamed")
+        response = self.client.get(self.url, headers = {"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["tasks"][0]["name"], "renamed")
+
+        # query strings are cached apart, errors are not cached
+        self.assertEqual(len(self.client.get(self.url, {"completed": "1"}).json()["tasks"]), 0)
+        self.assertEqual(self.client.get(self.url, {"size": "x"}).status_code, 400)
+
+        task_url = reverse("core:task_api", args = [self.task.id])
+        self.assertEqual(self.client.get(task_url).json()["name"], "renamed")
+        self.client.patch(task_url, {"name": "patched"}, content_type = "application/json")
+        self.assertEqual(self.client.get(task_url).json()["name"], "patched")
+
+    def test_version_is_shared_by_processes(self):
+        """ test the version comes from the database, not from the cache of one process """
+        version = self.user.get_task_version()
+        cache.clear()
+        self.assertEqual(self.user.get_task_version(), version)
+
+        # a write of another process, which never touched this cache
+        Task.objects.filter(id = self.task.id).update(name = "elsewhere")
+        self.assertGreater(self.user.get_task_version(), version)
+        changes.compact()
+        self.assertGreater(self.user.get_task_version(), version)
+
+    def test_export_is_revalidated(self):
+        """ test exports carry the version as ETag """
+        url = reverse("core:export_tasks")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, headers = {"If-None-Match": etag}).status_code, 304)
+        self.user.complete_task(id = self.task.id)
+        self.assertEqual(self.client.get(url, headers = {"If-None-Match": etag}).status_code, 200)
+
+
+class TestSingleTaskRoundTrips(TestCase):
+    """
+    TestSingleTaskRoundTrips class pinning the queries of single task mutations
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(username="trips", email="t@t.com", password="testpass")
+        self.user.create_tasks([{"name": "a"}, {"name": "b"}])
+        self.task, self.other = self.user.get_tasks()
+
+    def test_update_task_is_one_query(self):
+        """ test a plain update is a single UPDATE ... RETURNING, its trigger logs the change """
+        with self.assertNumQueries(1):
+            task = self.user.update_task(id = self.task.id, name = "renamed")
+        with self.assertNumQueries(0):
+            self.assertEqual(task.name, "renamed")
+            self.assertEqual(task.created_by, self.user)
+        self.assertIsNone(self.user.update_task(id = 0, name = "missing"))
+
+    def test_complete_and_incomplete_task_queries(self):
+        """ test completion is a locked read and one UPDATE plus the rollup delta """
+        # locked read of the previous state, UPDATE ... RETURNING, rollup upsert
+        with self.assertNumQueries(3):
+            task = self.user.complete_task(id = self.task.id)
+        self.assertTrue(task.is_completed)
+        self.assertIsInstance(task.begin_at, datetime.datetime)
+
+        with self.assertNumQueries(3):
+            self.assertFalse(self.user.incomplete_task(id = self.task.id).is_completed)
+
+        with self.assertRaises(TaskNotFoundException):
+            self.user.complete_task(id = 0)
+
+    def test_delete_task_queries(self):
+        """ test deletion is one DELETE ... RETURNING plus the rollup delta """
+        # DELETE ... RETURNING logging the tombstone, rollup decrement, removal of the emptied day
+        with self.assertNumQueries(3):
+            task = self.user.delete_task(id = self.task.id)
+        self.assertEqual(task.name, self.task.name)
+        self.assertIsNone(task.id)
+        self.assertEqual(self.user.get_tasks().count(), 1)
+
+        with self.assertRaises(TaskNotFoundException):
+            self.user.delete_task(id = self.task.id)
+
+    def test_bulk_mutations_skip_the_pre_read(self):
+        """ test bulk deletion reads rows back instead of selecting first """
+        ids = [self.task.id, self.other.id]
+        # locked read of the previous state, UPDATE ... RETURNING, rollup upsert
+        with self.assertNumQueries(3):
+            self.assertEqual(self.user.complete_tasks(ids = ids), 2)
+        # DELETE ... RETURNING logging the tombstones, rollup decrement, removal of the emptied day
+        with self.assertNumQueries(3):
+            self.assertEqual(self.user.delete_tasks(ids = ids), 2)
+
+    def test_fallback_without_returning(self):
+        """ test backends without RETURNING keep the select based path """
+        with mock.patch("core.models.supports_returning", return_value = False):
+            self.assertEqual(self.user.update_task(id = self.task.id, name = "renamed").name, "renamed")
+            self.assertTrue(self.user.complete_task(id = self.task.id).is_completed)
+            self.assertEqual(self.user.complete_tasks(ids = [self.other.id]), 1)
+            self.assertEqual(self.user.delete_task(id = self.task.id).name, "renamed")
+            self.assertEqual(self.user.delete_tasks(ids = [self.other.id]), 1)
+
+    def test_fallback_delete_is_atomic(self):
+        """ test the select based deletion rolls back with a failing bookkeeping step """
+        with mock.patch("core.models.supports_returning", return_value = False):
+            with mock.patch("core.rollups.add", side_effect = RuntimeError):
+                with self.assertRaises(RuntimeError):
+                    self.user.delete_tasks(ids = [self.task.id])
+        self.assertTrue(self.user.tasks.filter(id = self.task.id).exists())
+
+
+@override_settings(METRICS_SAMPLE_RATE = 1.0, METRICS_TOKEN = "secret")
+class TestMetrics(TestCase):
+    """
+    TestMetrics class for testing the request metrics and the /metrics endpoint
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        metrics.registry.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username="metrics", email="m@m.com", password="testpass")
+        self.user.create_tasks([{"name": f"task {i}"} for i in range(3)])
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def sample(self, body, line):
+        """ value of a sample line of the exposition format """
+        for row in body.splitlines():
+            if row.startswith(line + " "):
+                return float(row.rsplit(" ", 1)[1])
+        self.fail(f"{line} not found in metrics")
+
+    def test_requests_are_recorded_by_route(self):
+        """ test latency, status and queries are recorded per URL pattern, async views included """
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse("core:tasks_api")).status_code, 200)
+        self.client.get("/tasks/api/999999/")
+
+        body = self.client.get("/metrics", HTTP_AUTHORIZATION = "Bearer secret").content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertEqual(self.sample(body, 'http_request_duration_seconds_count{route="tasks/api/",method="GET"}'), 2)
+        self.assertEqual(self.sample(body, 'http_request_duration_seconds_bucket{route="tasks/api/",method="GET",le="+Inf"}'), 2)
+        self.assertEqual(self.sample(body, 'http_responses_total{route="tasks/api/<int:id>/",method="GET",status="404"}'), 1)
+        # session and user, plus the page of tasks until it is cached
+        self.assertGreaterEqual(self.sample(body, 'http_request_db_queries_sum{route="tasks/api/"}'), 5)
+        self.assertGreater(self.sample(body, 'http_request_db_duration_seconds_sum{route="tasks/api/"}'), 0)
+
+    def test_task_methods_are_timed(self):
+        """ test the User task methods feed task_method_duration_seconds """
+        list(self.user.get_tasks())
+        list(self.user.iter_tasks())
+        self.user.complete_task(id = self.user.get_tasks()[0].id)
+
+        body = metrics.render()
+        # iter_tasks builds on get_tasks
+        self.assertEqual(self.sample(body, 'task_method_duration_seconds_count{method="User.get_tasks"}'), 3)
+        self.assertEqual(self.sample(body, 'task_method_duration_seconds_count{method="User.iter_tasks"}'), 1)
+        # complete_task goes through update_task
+        self.assertEqual(self.sample(body, 'task_method_duration_seconds_count{method="User.update_task"}'), 1)
+        self.assertTrue(getattr(User.acomplete_task, "__timed__", False))
+        self.assertFalse(getattr(User._update, "__timed__", False))
+
+    def test_unsampled_requests_skip_query_stats(self):
+        """ test query stats are only kept for sampled requests """
+        with override_settings(METRICS_SAMPLE_RATE = 0.0):
+            client = Client()
+            client.force_login(self.user)
+            client.get(reverse("core:tasks_api"))
+
+        body = metrics.render()
+        self.assertEqual(self.sample(body, 'http_request_duration_seconds_count{route="tasks/api/",method="GET"}'), 1)
+        self.assertNotIn('http_request_db_queries_count{route="tasks/api/"}', body)
+
+    def test_series_are_bounded(self):
+        """ test label sets beyond the limit fold into a single series """
+        counter = metrics.Counter("test_paths", "paths", labels = ("path", ), max_series = 2)
+        for i in range(10):
+            counter.inc(f"/{i}")
+
+        samples = {values: value for _, values, _, value in counter.samples()}
+        self.assertEqual(len(samples), 3)
+        self.assertEqual(samples[(metrics.OVERFLOW, )], 8)
+
+    def test_metrics_token(self):
+        """ test the endpoint requires the bearer token, and is off without one unless DEBUG """
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION = "Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+        with override_settings(METRICS_TOKEN = None):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+            with override_settings(DEBUG = True):
+                self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+
+class TestBenchCommand(TestCase):
+    """
+    TestBenchCommand class for testing the benchmark suite and its baseline check
+    """
+    def bench(self, **options):
+        """ run the benchmark on a tiny data set and return its report """
+        fd, path = tempfile.mkstemp(suffix = ".json")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        call_command("bench", users = 2, sizes = [20], repeat = 2, output = path, stdout = StringIO(), stderr = StringIO(), **options)
+        with open(path) as stream:
+            return path, json.load(stream)
+
+    def test_bench_reports_every_method(self):
+        """ test every task method is timed and the seeded data is rolled back """
+        _, report = self.bench()
+
+        results = report["results"]["20"]
+        for name in ["get_tasks", "get_active_tasks", "tasks_overlapping_week", "complete_task", "delete_tasks"]:
+            self.assertEqual(set(results[name]), {"count", "per_sec", "mean_ms", "p50_ms", "p95_ms", "p99_ms"})
+            self.assertEqual(results[name]["count"], 2)
+        self.assertFalse(User.objects.filter(username__startswith = "bench-").exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_bench_baseline(self):
+        """ test the command fails only when a method is slower than the threshold """
+        path, report = self.bench()
+        self.assertNotIn("regressions", report)
+
+        _, report = self.bench(baseline = path, threshold = 10000, min_ms = 0)
+        self.assertEqual(report["regressions"], [])
+
+        with open(path, "w") as stream:
+            json.dump({"results": {"20": {"get_tasks": {"p95_ms": 0.0001}}}}, stream)
+        with self.assertRaisesRegex(CommandError, "get_tasks@20"):
+            self.bench(baseline = path, min_ms = 0)
+
+
+class TestRecurringTasks(TestCase):
+    """
+    TestRecurringTasks class for testing recurrence rules and their lazy occurrences
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username="recurring", email="r@r.com", password="testpass")
+        self.monday = datetime.datetime(2024, 1, 1, 9, 30, tzinfo = datetime.timezone.utc)
+        self.standup = self.user.create_recurring_task(
+                name = "stand-up",
+                starts_at = self.monday,
+                duration = datetime.timedelta(minutes = 15),
+                frequency = recurrence.WEEKLY,
+                weekdays = recurrence.weekday_mask(["mon", "tue", "wed", "thu", "fri"]),
+            )
+
+    def day(self, days, hour = 0):
+        return self.monday.replace(hour = hour, minute = 0) + datetime.timedelta(days = days)
+
+    def test_rules_expand_days(self):
+        """ test daily, weekly and monthly days from any point of the series """
+        first = datetime.date(2024, 1, 31)
+        take = lambda days: [day.isoformat() for day in islice(days, 3)]
+        self.assertEqual(take(recurrence.days(first, recurrence.DAILY, 2, since = datetime.date(2024, 2, 1))),
+                         ["2024-02-02", "2024-02-04", "2024-02-06"])
+        self.assertEqual(take(recurrence.days(first, recurrence.WEEKLY, 2, since = datetime.date(2024, 2, 8))),
+                         ["2024-02-14", "2024-02-28", "2024-03-13"])
+        self.assertEqual(take(recurrence.days(first, recurrence.MONTHLY, since = datetime.date(2024, 2, 1))),
+                         ["2024-03-31", "2024-05-31", "2024-07-31"])
+        with self.assertRaises(ValueError):
+            recurrence.weekday_mask(["funday"])
+
+    def test_occurrences_are_expanded_for_the_window(self):
+        """ test weekday occurrences, far windows and the local time across DST """
+        week = self.user.get_occurrences(self.day(0), self.day(7, 23))
+        self.assertEqual([task.begin_at.weekday() for task in week], [0, 1, 2, 3, 4, 0])
+        self.assertEqual(week[0].end_at - week[0].begin_at, datetime.timedelta(minutes = 15))
+        self.assertIsNone(week[0].id)
+        self.assertEqual(week[0].recurrence, self.standup)
+
+        # ten years in, still two queries: rules and taken occurrences
+        with self.assertNumQueries(2):
+            far = self.user.get_occurrences(self.day(3650), self.day(3651))
+        self.assertEqual(len(far), 1)
+        # an occurrence running at the window start overlaps it
+        self.assertEqual(len(self.user.get_occurrences(self.day(0, 9) + datetime.timedelta(minutes = 40), self.day(0, 23))), 1)
+
+        self.standup.until = self.day(2, 23)
+        self.standup.save()
+        self.assertEqual(len(self.user.get_occurrences(self.day(0), self.day(7))), 3)
+
+        with override_settings(TIME_ZONE = "Europe/Berlin"):
+            rule = self.user.create_recurring_task(
+                    name = "daily", starts_at = datetime.datetime(2024, 3, 29, 8, 30, tzinfo = datetime.timezone.utc),
+                )
+            begins = [begin for begin in rule.occurrences(rule.starts_at, rule.starts_at + datetime.timedelta(days = 3))]
+            self.assertEqual([begin.astimezone(datetime.timezone.utc).hour for begin in begins], [8, 8, 7, 7])
+
+    def test_edited_occurrences_are_materialized(self):
+        """ test editing and completing store single occurrences as tasks """
+        tuesday = self.user.get_occurrences(self.day(1), self.day(2))[0]
+        task = self.user.complete_occurrence(self.standup.id, tuesday.occurrence_at)
+        self.assertIsNotNone(task.id)
+        self.assertTrue(task.is_completed)
+        self.assertEqual(self.user.materialize_occurrence(self.standup.id, tuesday.occurrence_at).id, task.id)
+
+        moved = self.user.materialize_occurrence(self.standup.id, tuesday.occurrence_at, name = "retro")
+        self.assertEqual((moved.id, moved.name), (task.id, "retro"))
+        self.assertEqual(self.user.tasks.count(), 1)
+        self.assertEqual(self.user.get_task_summary()["completed"], 1)
+
+        week = self.user.get_occurrences(self.day(0), self.day(7, 23))
+        self.assertNotIn(tuesday.occurrence_at, [task.occurrence_at for task in week])
+        self.assertEqual(len(week), 5)
+
+        with self.assertRaises(TaskNotFoundException):
+            self.user.materialize_occurrence(self.standup.id, self.day(5, 9))
+        with self.assertRaises(TaskNotFoundException):
+            self.user.materialize_occurrence(self.standup.id + 100, tuesday.occurrence_at)
+
+        self.standup.delete()
+        self.assertIsNone(self.user.get_task(id = task.id).recurrence)
+
+    def test_get_tasks_and_active_tasks_include_occurrences(self):
+        """ test pending occurrences are merged into get_tasks() and get_active_tasks() """
+        plain = self.user.create_task(name = "plain", begin_at = self.day(2, 15), end_at = self.day(2, 16))
+        later = self.user.create_task(name = "later", begin_at = self.day(9, 15))
+        tasks = self.user.get_tasks(occurrences = (self.day(0), self.day(4, 23)))
+        self.assertEqual(tasks[0].id, plain.id)
+        self.assertNotIn(later.id, [task.id for task in tasks])
+        self.assertEqual(len(tasks), 6)
+        self.assertEqual(len(self.user.get_tasks(occurrences = (self.day(0), self.day(4, 23)), include_archived = True)), 6)
+        self.assertEqual(tasks[1].begin_at, self.day(4, 9) + datetime.timedelta(minutes = 30))
+        self.assertEqual(len(self.user.get_tasks(occurrences = (self.day(0), self.day(7)), is_completed = True)), 0)
+
+        now = timezone.now()
+        self.user.create_recurring_task(name = "all day", starts_at = now - datetime.timedelta(days = 3), duration = datetime.timedelta(days = 1))
+        active = self.user.get_active_tasks(include_recurring = True)
+        self.assertIn("all day", [task.name for task in active])
+        self.assertNotIn("all day", [task.name for task in self.user.get_active_tasks()])
+
+        with self.assertRaises(ValueError):
+            self.user.create_recurring_task(name = "bad", interval = 0)
+
+    def test_deleted_occurrences_stay_deleted(self):
+        """ test deleting the task of an occurrence skips it instead of bringing it back """
+        monday, tuesday, wednesday = [self.day(i, 9) + datetime.timedelta(minutes = 30) for i in range(3)]
+        self.user.delete_task(id = self.user.materialize_occurrence(self.standup.id, monday).id)
+        self.user.materialize_occurrence(self.standup.id, tuesday).delete()
+        with mock.patch("core.models.supports_returning", return_value = False):
+            self.user.delete_tasks(ids = [self.user.materialize_occurrence(self.standup.id, wednesday).id])
+
+        week = self.user.get_occurrences(self.day(0), self.day(4, 23))
+        self.assertEqual([task.begin_at.weekday() for task in week], [3, 4])
+        with self.assertRaises(TaskNotFoundException):
+            self.user.materialize_occurrence(self.standup.id, monday)
+
+    async def test_aget_tasks_with_occurrences(self):
+        """ test the async read merges pending occurrences like the sync one """
+        tasks = await self.user.aget_tasks(occurrences = (self.day(0), self.day(4, 23)))
+        self.assertEqual(len(tasks), 5)
+        self.assertTrue(all(task.recurrence_id == self.standup.id for task in tasks))
+
+
+@override_settings(PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"])
+class TestBulkCreateUsers(TestCase):
+    """
+    TestBulkCreateUsers class for testing bulk user provisioning with pooled password hashing
+    """
+    def test_hash_passwords_in_pool(self):
+        """ test pool workers hash like make_password, in order """
+        pool = hasher_pool(workers = 2)
+        self.addCleanup(pool.shutdown)
+        passwords = [f"secret-{i}" for i in range(10)] + [None]
+        hashes = list(hash_passwords(passwords, pool))
+        self.assertTrue(all(check_password(raw, hashed) for raw, hashed in zip(passwords[:-1], hashes)))
+        self.assertTrue(hashes[0].startswith("md5$"))
+        self.assertFalse(is_password_usable(hashes[-1]))
+
+    @override_settings(SERVERLESS = True)
+    def test_no_pool_on_serverless_hosts(self):
+        """ test serverless hosts hash in the calling process """
+        self.assertIsNone(hasher_pool(workers = 2))
+
+    def test_bulk_create_users(self):
+        """ test users are created in batches with hashed passwords and initial tasks """
+        progress = []
+        users = User.objects.bulk_create_users(
+                [
+                    {"username": f"bulk-{i}", "email": f"Bulk-{i}@EXAMPLE.com", "password": f"pw-{i}"}
+                    for i in range(9)
+                ] + [{"username": "own", "password": None, "tasks": [{"name": "own task"}]}],
+                initial_tasks = [{"name": "welcome", "begin_at": timezone.now()}],
+                batch_size = 4,
+                workers = 2,
+                progress = progress.append,
+            )
+        self.assertEqual(progress, [4, 8, 10])
+        self.assertEqual(len(users), 10)
+
+        user = User.objects.get(username = "bulk-3")
+        self.assertTrue(user.check_password("pw-3"))
+        self.assertEqual(user.email, "Bulk-3@example.com")
+        self.assertEqual([task.name for task in user.get_tasks()], ["welcome"])
+        self.assertEqual(user.get_task_summary()["total"], 1)
+
+        own = User.objects.get(username = "own")
+        self.assertFalse(own.has_usable_password())
+        self.assertEqual(sorted(task.name for task in own.get_tasks()), ["own task", "welcome"])
+
+        users = User.objects.bulk_create_users(
+                [{"username": "bulk-0", "password": "x"}, {"username": "new", "password": "x"}],
+                skip_existing = True,
+                workers = 1,
+            )
+        self.assertEqual([user.username for user in users], ["new"])
+        with self.assertRaises(ValueError):
+            User.objects.bulk_create_users([{"username": ""}], workers = 1)
+        with self.assertRaises(ValueError):
+            User.objects.bulk_create_users(
+                    [{"username": "late", "tasks": [{"name": "t", "begin_at": timezone.now(), "end_at": timezone.now() - timezone.timedelta(hours = 1)}]}],
+                    workers = 1,
+                )
+        self.assertFalse(User.objects.filter(username = "late").exists())
+
+    def test_bulk_create_users_bookkeeping_per_batch(self):
+        """ test change log and rollups of a batch take the same queries for any number of users """
+        begin_at = datetime.datetime(2024, 3, 4, 12, tzinfo = datetime.timezone.utc)
+        welcome = [{"name": "welcome", "begin_at": begin_at, "end_at": begin_at + timezone.timedelta(hours = 1)}]
+
+        def create(prefix, count):
+            with CaptureQueriesContext(connection) as queries:
+                users = User.objects.bulk_create_users(
+                        [{"username": f"{prefix}-{i}", "password": None} for i in range(count)],
+                        initial_tasks = welcome,
+                        workers = 1,
+                    )
+            return users, len(queries)
+
+        few, few_queries = create("few", 2)
+        many, many_queries = create("many", 20)
+        self.assertEqual(few_queries, many_queries)
+
+        user = many[-1]
+        self.assertEqual(list(user.task_changes.values_list("kind", flat = True)), [changes.UPSERT])
+        self.assertEqual(
+            list(DailyTaskRollup.objects.filter(user = user).values_list("tracked", "tasks")),
+            [(timezone.timedelta(hours = 1), 1)],
+        )
+
+    def test_import_users_command(self):
+        """ test CSV and NDJSON user files are imported and invalid rows reported """
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "users.csv")
+            with open(csv_path, "w") as stream:
+                stream.write("username,email,password,is_staff\nann,ann@example.com,pw,1\nbob,,,\n")
+            ndjson_path = os.path.join(directory, "users.ndjson")
+            with open(ndjson_path, "w") as stream:
+                stream.write('{"username": "cy", "tasks": [{"name": "first"}]}\n{"username": "bad name!"}\n')
+
+            stdout = StringIO()
+            call_command("import_users", csv_path, "--workers=1", "--initial-task=welcome", stdout = stdout)
+            self.assertIn("imported 2 users", stdout.getvalue())
+            self.assertIn("users/sec", stdout.getvalue())
+
+            ann = User.objects.get(username = "ann")
+            self.assertTrue(ann.check_password("pw"))
+            self.assertTrue(ann.is_staff)
+            self.assertTrue(User.objects.get(username = "bob").is_active)
+            self.assertEqual([task.name for task in ann.get_tasks()], ["welcome"])
+
+            with self.assertRaises(CommandError):
+                call_command("import_users", ndjson_path, "--workers=1", stdout = StringIO())
+            call_command("import_users", ndjson_path, "--workers=1", "--skip-invalid", stdout = StringIO(), stderr = StringIO())
+            self.assertEqual([task.name for task in User.objects.get(username = "cy").get_tasks()], ["first"])
+
+            with self.assertRaises(CommandError):
+                call_command("import_users", csv_path, "--workers=1", stdout = StringIO())
+            call_command("import_users", csv_path, "--workers=1", "--skip-existing", stdout = StringIO())
+            self.assertEqual(User.objects.filter(username__in = ["ann", "bob"]).count(), 2)
+
+
+class TestColdStartCommand(SimpleTestCase):
+    """
+    TestColdStartCommand class for testing the cold start measurements of the WSGI application
+    """
+    def test_package_times(self):
+        """ test -X importtime output is summed per top level package """
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       500 |        500 |     django.utils",
+            "import time:      1500 |       2000 |   django",
+            "import time:      2000 |       2000 | core.models",
+            "some warning",
+        ])
+        self.assertEqual(package_times(output), {"django": 2.0, "core": 2.0})
+
+    def test_coldstart_serverless(self):
+        """ test fresh processes serve the first request, the admin imported on demand """
+        stdout = StringIO()
+        call_command("coldstart", "--repeat=1", "--modes=serverless", "--top=3", stdout = stdout, stderr = StringIO())
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(set(report["results"]["serverless"]), {"process_ms", "import_ms", "first_response_ms"})
+        self.assertGreater(report["results"]["serverless"]["import_ms"]["p50_ms"], 0)
+        self.assertLessEqual(len(report["packages"]["serverless"]), 3)
+
+        self.assertEqual(coldstart_measure("serverless", path = "/admin/login/")["status"], 200)
+        with self.assertRaises(CommandError):
+            call_command("coldstart", "--modes=lambda")
+
+
+@override_settings(DATABASE_REPLICAS = ["replica"])
+class TestReplicaRouter(TransactionTestCase):
+    """
+    TestReplicaRouter class for testing read replica routing, outside of a
+    transaction as reads inside one always stay on the primary
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        # declared only: any query actually sent to it fails the test
+        settings = mock.patch.dict(connections.settings, {"replica": dict(connections.settings["default"])})
+        settings.start()
+        self.addCleanup(settings.stop)
+        self.addCleanup(self.drop_replica)
+
+        self.user = User.objects.create_user(username="reader", email="r@r.com", password="testpass")
+        self.other = User.objects.create_user(username="other", email="o@o.com", password="testpass")
+        self.task = self.user.create_task(name = "a")
+        cache.clear()
+
+    @staticmethod
+    def drop_replica():
+        """ forget the replica connection, created on first use """
+        connections["replica"]
+        del connections["replica"]
+
+    def test_user_reads_go_to_replica(self):
+        """ test the User task methods read from the replica, other reads from the primary """
+        self.assertEqual(self.user.get_tasks().db, "replica")
+        self.assertEqual(self.user.get_active_tasks().db, "replica")
+        self.assertEqual(self.user.daily_rollups.all().db, "replica")
+        self.assertEqual(Task.objects.all().db, "default")
+        self.assertEqual(User.objects.all().db, "default")
+
+        with transaction.atomic():
+            self.assertEqual(self.user.get_tasks().db, "default")
+
+    def test_reads_stick_to_primary_after_write(self):
+        """ test a user reads their own writes and writes never go to the replica """
+        self.assertTrue(self.user.complete_task(id = self.task.id).is_completed)
+
+        self.assertEqual(self.user.get_tasks().db, "default")
+        self.assertTrue(self.user.get_task(id = self.task.id).is_completed)
+        self.assertEqual(self.other.get_tasks().db, "replica")
+
+        # the pin expires with its cache entry
+        cache.clear()
+        self.assertEqual(self.user.get_tasks().db, "replica")
+        self.assertEqual(self.user.delete_tasks(ids = [self.task.id]), 1)
+        self.assertEqual(self.user.get_tasks().db, "default")
+
+    def test_replica_is_not_migrated(self):
+        """ test migrations skip the replica """
+        from .routers import ReplicaRouter
+        self.assertFalse(ReplicaRouter().allow_migrate("replica", "core"))
+        self.assertIsNone(ReplicaRouter().allow_migrate("default", "core"))
+
+
+class TestTaskArchive(TestCase):
+    """
+    TestTaskArchive class for testing the archival of old completed tasks
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="archivist", email="a@a.com", password="testpass")
+
+        self.day = timezone.now().replace(microsecond = 0) - timezone.timedelta(days = 800)
+        hour = timezone.timedelta(hours = 1)
+        self.old = self.user.create_tasks([
+            {"name": f"old {i}", "is_completed": True, "begin_at": self.day + i * hour, "end_at": self.day + (i + 1) * hour}
+            for i in range(3)
+        ])
+        self.open = self.user.create_task(name = "old open", begin_at = self.day, end_at = self.day + hour)
+        self.recent = self.user.create_task(name = "recent", is_completed = True)
+
+    def archive(self, **options):
+        """ run archive_tasks and return its output """
+        out = StringIO()
+        call_command("archive_tasks", "--older-than=365d", stdout = out, **options)
+        return out.getvalue()
+
+    def test_archive_moves_old_completed_tasks(self):
+        """ test batches move old completed tasks only, keeping their ids """
+        out = self.archive(batch_size = 2)
+
+        self.assertIn("archived 3 tasks", out)
+        self.assertIn("in 2 batches", out)
+        self.assertEqual(
+            sorted(TaskArchive.objects.values_list("id", flat = True)),
+            sorted(task.id for task in self.old),
+        )
+        self.assertEqual(set(self.user.get_tasks()), {self.open, self.recent})
+
+    def test_archive_resumes(self):
+        """ test a bounded run leaves the rest for the next run """
+        self.assertIn("archived 1 tasks", self.archive(batch_size = 1, max_batches = 1))
+        self.assertIn("archived 2 tasks", self.archive(batch_size = 1))
+        self.assertIn("archived 0 tasks", self.archive())
+        self.assertIn("0 tasks ended before", self.archive(dry_run = True))
+
+    def test_reads_include_archived_on_request(self):
+        """ test the read APIs skip archived tasks unless asked """
+        self.archive()
+        old = self.old[0]
+
+        with self.assertRaises(TaskNotFoundException):
+            self.user.get_task(id = old.id)
+        task = self.user.get_task(id = old.id, include_archived = True)
+        self.assertEqual((task.name, task.begin_at), (old.name, old.begin_at))
+
+        names = [task.name for task in self.user.get_tasks(include_archived = True)]
+        self.assertEqual(len(names), 5)
+        self.assertEqual(names[:2], ["recent", "old open"])
+        self.assertEqual(self.user.get_completed_tasks(include_archived = True).count(), 4)
+        self.assertEqual(self.user.get_completed_tasks().count(), 1)
+        self.assertEqual(len(list(self.user.iter_tasks(include_archived = True, is_completed = True))), 4)
+
+        window = (self.day, self.day + timezone.timedelta(hours = 10))
+        self.assertEqual([task.name for task in self.user.tasks_overlapping(*window)], ["old open"])
+        self.assertEqual(
+            [task.name for task in self.user.tasks_overlapping(*window, include_archived = True)],
+            ["old 0", "old open", "old 1", "old 2"],
+        )
+
+        start = self.day.replace(hour = 0, minute = 0, second = 0)
+        report = self.user.time_report(start, start + timezone.timedelta(days = 1), include_archived = True)
+        self.assertEqual(sum(row["tasks"] for row in report), 4)
+
+    def test_horizon_read_from_database(self):
+        """ test the horizon does not depend on the cache of one process """
+        self.assertIsNone(archive.horizon())
+        self.archive()
+
+        # another process, or an expired announcement
+        cache.clear()
+        self.assertEqual(archive.horizon(), max(task.end_at for task in self.old))
+        self.assertTrue(archive.may_overlap(self.day))
+        self.assertFalse(archive.may_overlap(self.recent.begin_at))
+
+        TaskArchive.objects.all().delete()
+        self.assertIsNone(archive.horizon())
+
+    def test_rollups_keep_archived_tasks(self):
+        """ test archived tasks still count when rollups are refreshed or rebuilt """
+        before = list(DailyTaskRollup.objects.filter(user = self.user).order_by("day").values_list("day", "tracked", "tasks", "completed"))
+        self.archive()
+
+        self.user.create_task(name = "late import", begin_at = self.day, end_at = self.day)
+        call_command("rebuild_rollups", user = ["archivist"], stdout = StringIO())
+
+        after = list(DailyTaskRollup.objects.filter(user = self.user).order_by("day").values_list("day", "tracked", "tasks", "completed"))
+        day, tracked, tasks, completed = before[0]
+        self.assertEqual(after[0], (day, tracked, tasks + 1, completed))
+        self.assertEqual(after[1:], before[1:])
+
+    def test_horizon_read_once_per_refresh(self):
+        """ test writes skip the horizon and a refresh of many runs reads it once """
+        self.archive()
+        with mock.patch("core.archive.horizon", wraps = archive.horizon) as horizon:
+            task = self.user.create_task(name = "write", begin_at = self.day, end_at = self.day)
+            self.user.complete_task(id = task.id)
+            self.assertEqual(horizon.call_count, 0)
+
+            days = [self.day.date() + timezone.timedelta(days = 100 * i) for i in range(3)]
+            rollups.refresh(self.user.id, days)
+        self.assertEqual(horizon.call_count, 1)
+
+
+class TestChunkedDeletion(TestCase):
+    """
+    TestChunkedDeletion class for testing the chunked deletion of tasks and users
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(username="heavy", email="h@h.com", password="testpass")
+        day = datetime.datetime(2023, 5, 1, 9, tzinfo = datetime.timezone.utc)
+        self.tasks = self.user.create_tasks([
+            {"name": f"task {i}", "begin_at": day + timezone.timedelta(days = i), "end_at": day + timezone.timedelta(days = i, hours = 1)}
+            for i in range(25)
+        ])
+
+    def test_delete_in_chunks(self):
+        """ test rows are deleted chunk by chunk with progress reports """
+        progress = []
+        deleted = delete_in_chunks(self.user.tasks.all(), chunk_size = 10, progress = progress.append)
+
+        self.assertEqual(deleted, 25)
+        self.assertEqual(progress, [10, 20, 25])
+        self.assertFalse(self.user.tasks.exists())
+
+    def test_delete_tasks_chunks_long_id_lists(self):
+        """ test delete_tasks splits long id lists and keeps rollups exact """
+        ids = [task.id for task in self.tasks]
+        with mock.patch("core.models.DELETE_CHUNK_SIZE", 3):
+            self.assertEqual(self.user.delete_tasks(ids = ids[:20]), 20)
+
+        self.assertEqual(self.user.get_tasks().count(), 5)
+        self.assertEqual(DailyTaskRollup.objects.filter(user = self.user).count(), 5)
+
+    def test_purge_users_command(self):
+        """ test the command removes the task history then the user """
+        out = StringIO()
+        call_command("purge_users", "heavy", dry_run = True, stdout = out)
+        self.assertIn("heavy: 25 tasks, 0 archived, 25 rollups, 25 changes", out.getvalue())
+
+        out = StringIO()
+        call_command("purge_users", "heavy", chunk_size = 10, stdout = out)
+        self.assertIn("heavy: 20 tasks deleted", out.getvalue())
+        # the tombstones of the deleted tasks go with the log
+        self.assertIn("deleted heavy with 25 tasks, 0 archived, 25 rollups and 50 changes", out.getvalue())
+        self.assertFalse(User.objects.filter(username = "heavy").exists())
+        self.assertFalse(Task.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command("purge_users", "nobody", stdout = StringIO())
+
+    @override_settings(TASK_PURGE_BACKGROUND = True, SERVERLESS = True)
+    def test_admin_action(self):
+        """ test the admin action purges the selected users but never the current one """
+        admin = User.objects.create_superuser(username="admin", email="a@a.com", password="testpass")
+        self.client.force_login(admin)
+
+        response = self.client.post(reverse("admin:core_user_changelist"), {
+            "action": "purge_users",
+            "_selected_action": [self.user.pk, admin.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(User.objects.values_list("username", flat = True)), ["admin"])
+        self.assertFalse(Task.objects.exists())
+
+
+class TestTaskSearch(TestCase):
+    """
+    TestTaskSearch class for testing the full text search of tasks
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(username="searcher", email="s@s.com", password="testpass")
+        self.other = User.objects.create_user(username="other", email="o@o.com", password="testpass")
+        self.user.create_tasks([
+            {"name": "Weekly meeting", "description": "team sync"},
+            {"name": "Write report", "description": "numbers for the meeting"},
+            {"name": "Café order", "description": None},
+            {"name": "Deep work", "description": "report draft"},
+        ])
+        self.other.create_task(name = "Weekly meeting")
+
+    def names(self, query):
+        """ names of the tasks of the user matching a query, best first """
+        return [task.name for task in self.user.search_tasks(query)]
+
+    def test_search_ranks_name_matches_first(self):
+        """ test matches in the name rank above matches in the description """
+        self.assertEqual(self.names("meeting"), ["Weekly meeting", "Write report"])
+        self.assertEqual(self.names("REP"), ["Write report", "Deep work"])
+        self.assertEqual(self.names("weekly meet"), ["Weekly meeting"])
+        self.assertEqual(self.names("cafe"), ["Café order"])
+        self.assertEqual(self.names("missing"), [])
+        self.assertEqual(self.names(' "*) '), [])
+
+    def test_index_follows_task_writes(self):
+        """ test updates, bulk updates and deletes are visible to the search """
+        task = self.user.get_task(name = "Deep work")
+        self.user.update_task(id = task.id, name = "Shallow planning")
+        self.assertEqual(self.names("shallow"), ["Shallow planning"])
+
+        self.user.tasks.filter(name = "Café order").update(description = "planning lunch")
+        self.assertEqual(self.names("planning"), ["Shallow planning", "Café order"])
+
+        self.user.delete_task(id = task.id)
+        self.assertEqual(self.names("planning"), ["Café order"])
+
+    def test_search_without_index(self):
+        """ test the scan fallback finds the same tasks """
+        with mock.patch("core.search.sqlite_fts_ready", return_value = False):
+            self.assertEqual(sorted(self.names("meeting")), ["Weekly meeting", "Write report"])
+            self.assertEqual(self.names("weekly meet"), ["Weekly meeting"])
+
+    def test_post_migrate_restores_triggers(self):
+        """ test lost triggers are recreated and the index rebuilt """
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER core_task_fts_insert")
+        self.assertFalse(search.has_sqlite_fts(connection))
+
+        self.user.create_task(name = "Unindexed chore")
+        search.sync_sqlite_fts(sender = None, using = "default")
+        self.assertTrue(search.has_sqlite_fts(connection))
+        self.assertEqual(self.names("chore"), ["Unindexed chore"])
+
+
+class TestAdmin(TestCase):
+    """
+    TestAdmin class for testing the Task and User admin on large tables
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.admin = User.objects.create_superuser(username="admin", email="a@a.com", password="testpass")
+        self.user = User.objects.create_user(username="worker", email="w@w.com", password="testpass")
+        self.client.force_login(self.admin)
+
+    def changelist(self, **params):
+        """ fetch the task changelist """
+        response = self.client.get(reverse("admin:core_task_changelist"), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """ test users are joined instead of fetched once per row """
+        self.user.create_tasks([{"name": f"task {i}"} for i in range(3)])
+        self.changelist()
+        with CaptureQueriesContext(connection) as few:
+            self.changelist()
+
+        self.user.create_tasks([{"name": f"task {i}"} for i in range(30)])
+        with CaptureQueriesContext(connection) as many:
+            self.changelist()
+        self.assertEqual(len(many), len(few))
+
+    def test_filters_and_widgets(self):
+        """ test the end filter, date hierarchy and the autocomplete owner and recurrence widgets """
+        self.user.create_recurring_task(name = "standup")
+        self.user.create_task(name = "running", end_at = None)
+        now = timezone.now()
+        self.user.create_task(name = "done", begin_at = now, end_at = now)
+
+        response = self.changelist(open = "1")
+        self.assertContains(response, "running")
+        self.assertNotContains(response, ">done<")
+        self.assertContains(self.changelist(), "begin_at__year")
+
+        response = self.client.get(reverse("admin:core_task_add"))
+        self.assertContains(response, "admin-autocomplete")
+        self.assertNotContains(response, ">worker</option>")
+        self.assertContains(response, 'data-field-name="recurrence"')
+        self.assertNotContains(response, "standup</option>")
+
+    def test_estimated_count_paginator(self):
+        """ test big tables use the planner estimate and filtered lists exact counts """
+        self.user.create_tasks([{"name": f"task {i}", "is_completed": i < 5} for i in range(40)])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        # stale statistics show the estimate is used
+        Task.objects.filter(name__in = ["task 0", "task 1"]).delete()
+
+        with mock.patch.object(EstimatedCountPaginator, "threshold", 10):
+            self.assertEqual(EstimatedCountPaginator(Task.objects.order_by("-id"), 10).count, 40)
+            self.assertEqual(EstimatedCountPaginator(Task.objects.filter(is_completed = True).order_by("-id"), 10).count, 3)
+        self.assertEqual(EstimatedCountPaginator(Task.objects.order_by("-id"), 10).count, 38)
+
+
+class TestStaticFiles(SimpleTestCase):
+    """
+    TestStaticFiles class for testing the hashed, pre-compressed static files and their server
+    """
+    def setUp(self):
+        """
+        setUp method for collecting test assets
+        """
+        source = tempfile.TemporaryDirectory()
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(self.root.cleanup)
+        self.addCleanup(static.clear_cache)
+
+        self.css = ("body { color: red; }\n" * 100).encode()
+        with open(os.path.join(source.name, "app.css"), "wb") as stream:
+            stream.write(self.css)
+
+        settings = override_settings(STATICFILES_DIRS = [source.name], STATIC_ROOT = self.root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command("collectstatic", interactive = False, verbosity = 0)
+
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        self.name = staticfiles_storage.stored_name("app.css")
+        self.factory = RequestFactory()
+
+    def get(self, path = None, **headers):
+        """ serve a collected file """
+        request = self.factory.get("/static/", headers = headers)
+        return static.serve(request, path or self.name, document_root = self.root.name)
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        """ test hashed names and their gzip variant, brotli when installed """
+        self.assertRegex(self.name, r"^app\.[0-9a-f]{12}\.css$")
+        with gzip.open(os.path.join(self.root.name, self.name + ".gz")) as stream:
+            self.assertEqual(stream.read(), self.css)
+        self.assertEqual(os.path.exists(os.path.join(self.root.name, self.name + ".br")), "br" in storage_encodings())
+
+    def test_serve_caches_and_negotiates(self):
+        """ test far-future caching, compressed variants and conditional requests """
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], static.IMMUTABLE)
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertEqual(b"".join(response.streaming_content), self.css)
+
+        response = self.get(accept_encoding = "gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.css)
+        self.assertFalse(self.get(accept_encoding = "gzip;q=0").has_header("Content-Encoding"))
+
+        self.assertEqual(self.get(if_none_match = response["ETag"], accept_encoding = "gzip").status_code, 304)
+        self.assertEqual(self.get("app.css")["Cache-Control"], static.REVALIDATE)
+
+        for path in ["missing.css", "../secret.txt"]:
+            with self.assertRaises(static.Http404):
+                self.get(path)
+
+    def test_serve_ranges(self):
+        """ test single byte ranges of the identity encoding """
+        response = self.get(range = "bytes=0-9", accept_encoding = "gzip")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 0-9/{len(self.css)}")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(response.streaming_content), self.css[:10])
+
+        response = self.get(range = "bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), self.css[-5:])
+        self.assertEqual(self.get(range = "bytes=999999-").status_code, 416)
+        self.assertEqual(self.get(range = "bytes=0-9", if_range = '"stale"').status_code, 200)
+
+    def test_encodings_have_their_own_etags(self):
+        """ test gzip bytes never validate a range of the identity encoding """
+        identity = self.get()["ETag"]
+        compressed = self.get(accept_encoding = "gzip")["ETag"]
+        self.assertEqual(compressed, identity[:-1] + '-gz"')
+        self.assertEqual(self.get(if_none_match = compressed).status_code, 200)
+        self.assertEqual(self.get(if_none_match = identity, accept_encoding = "gzip").status_code, 200)
+
+        # a download of the gzip variant cannot be resumed from the identity bytes
+        response = self.get(range = "bytes=10-", if_range = compressed, accept_encoding = "gzip")
+        self.assertEqual((response.status_code, response["Content-Encoding"]), (200, "gzip"))
+        response = self.get(range = "bytes=10-", if_range = identity, accept_encoding = "gzip")
+        self.assertEqual((response.status_code, response["ETag"]), (206, identity))
+
+    def test_urls_without_manifest(self):
+        """ test plain names are used until collectstatic ran """
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        with tempfile.TemporaryDirectory() as empty, override_settings(STATIC_ROOT = empty):
+            self.assertEqual(staticfiles_storage.url("app.css"), "/static/app.css")
+
+
+class TestOccupancy(TestCase):
+    """
+    TestOccupancy class for testing load, peak and utilization per slot
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.user = User.objects.create_user(username="busy", email="b@b.com", password="testpass")
+        self.other = User.objects.create_user(username="idle", email="i@i.com", password="testpass")
+        self.start = datetime.datetime(2024, 3, 4, 9, tzinfo = datetime.timezone.utc)
+        self.user.create_tasks([
+            {"name": "meeting", "begin_at": self.at(0), "end_at": self.at(60)},
+            {"name": "call", "begin_at": self.at(30), "end_at": self.at(45)},
+            {"name": "running", "begin_at": self.at(110)},
+        ])
+        self.other.create_task(name = "elsewhere", begin_at = self.at(-600), end_at = self.at(-300))
+
+    def at(self, minutes):
+        return self.start + datetime.timedelta(minutes = minutes)
+
+    def test_user_occupancy(self):
+        """ test every slot of one user in a single query, open tasks running until now """
+        with self.assertNumQueries(1):
+            result = self.user.occupancy(self.start, self.at(120), datetime.timedelta(minutes = 30), now = self.at(120))
+
+        self.assertEqual(result.users, [self.user.id])
+        self.assertEqual(result.slots(), [self.at(0), self.at(30), self.at(60), self.at(90)])
+        load, peak, utilization = result.row(self.user.id)
+        self.assertEqual(load.tolist(), [1.0, 1.5, 0.0, 1 / 3])
+        self.assertEqual(peak.tolist(), [1, 2, 0, 1])
+        self.assertEqual(utilization.tolist(), [1.0, 1.0, 0.0, 1 / 3])
+
+        # the last slot reaches past the window end
+        self.assertEqual(self.user.occupancy(self.start, self.at(50), now = self.at(120)).load.shape, (1, 4))
+        with self.assertRaises(ValueError):
+            self.user.occupancy(self.start, self.at(120), datetime.timedelta(milliseconds = 1500))
+        with self.assertRaises(ValueError):
+            self.user.occupancy(self.at(120), self.start)
+
+    def test_group_occupancy(self):
+        """ test a row per group member, in their order, with archived tasks """
+        group = Group.objects.create(name = "team")
+        group.user_set.add(self.user, self.other)
+        TaskArchive.objects.create(
+                id = 10 ** 6, name = "archived", created_by = self.other, created_at = self.at(0),
+                updated_at = self.at(0), begin_at = self.at(15), end_at = self.at(75),
+            )
+
+        members = User.objects.filter(groups = group).order_by("-username")
+        with self.assertNumQueries(3):
+            result = User.objects.occupancy(members, self.start, self.at(120), datetime.timedelta(hours = 1),
+                                            now = self.at(120), include_archived = True)
+
+        self.assertEqual(result.users, [self.other.id, self.user.id])
+        self.assertEqual(result.load.tolist(), [[0.75, 0.25], [1.25, 1 / 6]])
+        self.assertEqual(result.peak.tolist(), [[1, 1], [2, 1]])
+        self.assertEqual(User.objects.occupancy([self.other], self.start, self.at(120)).load.sum(), 0)
+
+    def test_epoch_seconds_in_the_database(self):
+        """ test intervals are read as whole epoch seconds, rounded down """
+        begin_at = self.at(0) + datetime.timedelta(microseconds = 999999)
+        task = self.user.create_task(name = "precise", begin_at = begin_at)
+        seconds = self.user.tasks.filter(id = task.id).values_list(occupancy.EpochSeconds("begin_at"), flat = True).get()
+        self.assertEqual(seconds, int(self.at(0).timestamp()))
+
+    def test_compute_matches_brute_force(self):
+        """ test the vectorized slots against a second by second count """
+        rng = random.Random(7)
+        users, slots, length = 5, 30, 60
+        owners = [rng.randrange(users) for _ in range(200)]
+        begins = [rng.randrange(-100, slots * length + 100) for _ in owners]
+        ends = [begin + rng.randrange(0, 300) for begin in begins]
+        load, peak, utilization = occupancy.compute(owners, begins, ends, users, slots, length)
+
+        for user in range(users):
+            running = [0] * (slots * length)
+            for owner, begin, end in zip(owners, begins, ends):
+                if owner == user:
+                    for second in range(max(begin, 0), min(end, slots * length)):
+                        running[second] += 1
+            for slot in range(slots):
+                seconds = running[slot * length:(slot + 1) * length]
+                self.assertAlmostEqual(load[user, slot], sum(seconds) / length)
+                self.assertEqual(peak[user, slot], max(seconds))
+                self.assertAlmostEqual(utilization[user, slot], sum(map(bool, seconds)) / length)
+
+
+class TestGroupReport(TestCase):
+    """
+    TestGroupReport class for testing per group and member numbers in one query
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        self.monday = datetime.datetime(2024, 3, 4, tzinfo = datetime.timezone.utc)
+        self.alice, self.bob, self.carol, self.dave = [
+            User.objects.create_user(username = name, email = f"{name}@example.com", password = "testpass")
+            for name in ("alice", "bob", "carol", "dave")
+        ]
+        design, ops, _ = [Group.objects.create(name = name) for name in ("design", "ops", "empty")]
+        design.user_set.add(self.alice, self.bob)
+        ops.user_set.add(self.bob, self.carol)
+
+        self.alice.create_tasks([
+            {"name": "sketch", "begin_at": self.at(0, 9), "end_at": self.at(0, 11), "is_completed": True},
+            {"name": "review", "begin_at": self.at(7, 23), "end_at": self.at(8, 1), "is_completed": True},
+        ])
+        self.bob.create_tasks([
+            {"name": "weekend", "begin_at": self.at(6, 23), "end_at": self.at(7, 1)},
+            {"name": "running", "begin_at": self.at(13, 22)},
+            {"name": "old", "begin_at": self.at(-30), "end_at": self.at(-29)},
+        ])
+        self.dave.create_task(name = "alone", begin_at = self.at(1), end_at = self.at(2))
+
+    def at(self, days, hour = 0):
+        return self.monday + datetime.timedelta(days = days, hours = hour)
+
+    def report(self, **kwargs):
+        return reports_group_report(Group.objects.all(), self.monday, self.at(14), tz = "UTC", now = self.at(14), **kwargs)
+
+    def test_groups_and_members_in_one_query(self):
+        """ test members, buckets and group sums, members without tasks included """
+        hours = lambda value: datetime.timedelta(hours = value)
+        with self.assertNumQueries(1):
+            report = self.report()
+
+        self.assertEqual([group["name"] for group in report], ["design", "empty", "ops"])
+        design, empty, ops = report
+
+        alice, bob = design["members"]
+        self.assertEqual((alice["username"], alice["duration"], alice["tasks"], alice["completed"]), ("alice", hours(4), 2, 2))
+        self.assertEqual([(b["duration"], b["tasks"]) for b in bob["buckets"]], [(hours(1), 1), (hours(3), 2)])
+        self.assertEqual((design["duration"], design["tasks"], design["completed"]), (hours(8), 4, 2))
+        self.assertEqual([(b["start"], b["duration"], b["completed"]) for b in design["buckets"]],
+                         [(self.monday, hours(3), 1), (self.at(7), hours(5), 1)])
+
+        self.assertEqual(empty["members"], [])
+        self.assertEqual(empty["duration"], hours(0))
+        self.assertEqual([(m["username"], m["duration"]) for m in ops["members"]], [("bob", hours(4)), ("carol", hours(0))])
+        self.assertEqual(ops["tasks"], 2)
+
+    def test_years_of_days(self):
+        """ test long daily reports are split by runs of days and keep their totals """
+        start = self.monday - datetime.timedelta(days = 3 * 365)
+        days = reports_group_report(Group.objects.all(), start, self.at(14), bucket = "day", tz = "UTC", now = self.at(14))
+        design, empty, ops = self.report()
+
+        # the old task of bob falls into the longer window, a whole day
+        day = datetime.timedelta(days = 1)
+        self.assertEqual([(group["duration"], group["tasks"], group["completed"]) for group in days], [
+            (design["duration"] + day, design["tasks"] + 1, design["completed"]),
+            (empty["duration"], 0, 0),
+            (ops["duration"] + day, ops["tasks"] + 1, ops["completed"]),
+        ])
+        self.assertEqual(len(days[0]["buckets"]), 3 * 365 + 14)
+        self.assertEqual(days[0]["buckets"][-14 - 30]["duration"], day)
+
+    def test_user_groups_and_workers(self):
+        """ test the report of a user covers their groups, the same with workers """
+        self.assertEqual([group["name"] for group in self.alice.group_report(self.monday, self.at(14))], ["design"])
+        self.assertEqual(self.report(workers = 4), self.report())
+
+
+@override_settings(TASK_CHANGES_LAG_SECONDS = 0)
+class TestTaskChanges(TestCase):
+    """
+    TestTaskChanges class for testing the change log and delta sync
+    """
+    def setUp(self):
+        """
+        setUp method for creating test data
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username="sync", email="s@s.com", password="testpass")
+        self.task = self.user.create_task(name = "first")
+        self.cursor = self.user.changes_since().cursor
+
+    def sync(self, cursor = None, **kwargs):
+        result = self.user.changes_since(cursor or self.cursor, **kwargs)
+        return {task.name for task in result.tasks}, set(result.deleted), result
+
+    def test_every_write_is_logged(self):
+        """ test creates, updates and deletes of every write path show up once per task """
+        self.assertEqual(self.sync()[:2], (set(), set()))
+
+        created = self.user.create_tasks([{"name": "bulk"}, {"name": "gone"}, {"name": "other"}])
+        bulk, gone, other = created
+        single = self.user.create_task(name = "single")
+        self.user.update_task(id = self.task.id, name = "renamed")
+        self.user.complete_tasks(ids = [bulk.id])
+        other.description = "saved"
+        other.save()
+        self.user.delete_task(id = gone.id)
+        with mock.patch("core.models.supports_returning", return_value = False):
+            self.user.update_tasks(ids = [single.id], description = "fallback")
+            self.user.delete_tasks(ids = [other.id])
+
+        names, deleted, result = self.sync()
+        self.assertEqual(names, {"renamed", "bulk", "single"})
+        self.assertEqual(deleted, {gone.id, other.id})
+        self.assertFalse(result.has_more)
+        self.assertEqual(self.sync(result.cursor)[:2], (set(), set()))
+
+    def test_task_moved_to_another_user(self):
+        """ test a task handed to another user is a delete for its previous owner """
+        other = User.objects.create_user(username="heir", email="h@h.com", password="testpass")
+        cursor = other.changes_since().cursor
+        Task.objects.filter(id = self.task.id).update(created_by = other)
+        # the tombstone of the previous owner outlives compaction
+        changes.compact()
+
+        self.assertEqual(self.sync()[:2], (set(), {self.task.id}))
+        self.assertEqual([task.name for task in other.changes_since(cursor).tasks], ["first"])
+
+    def test_polls_are_paged_and_proportional(self):
+        """ test a poll reads the log after the cursor and the named tasks only """
+        self.user.create_tasks([{"name": f"old {i}"} for i in range(20)])
+        cursor = self.user.changes_since().cursor
+        for name in ["a", "b", "c"]:
+            self.user.update_task(id = self.task.id, name = name)
+        self.user.create_task(name = "new")
+
+        with self.assertNumQueries(2):
+            names, _, result = self.sync(cursor, limit = 2)
+        # tasks are read as they are now, not as of the change
+        self.assertEqual((names, result.has_more), ({"c"}, True))
+        names, _, result = self.sync(result.cursor, limit = 2)
+        self.assertEqual((names, result.has_more), ({"c", "new"}, False))
+
+        with self.assertRaises(InvalidCursorException):
+            self.user.changes_since("not a cursor")
+
+    @override_settings(TASK_CHANGES_LAG_SECONDS = None, DATABASE_TRANSACTION_TIMEOUT = 5)
+    def test_lag_follows_the_transaction_timeout(self):
+        """ test changes wait a second longer than a write transaction may run """
+        self.assertEqual(changes.lag(), datetime.timedelta(seconds = 6))
+
+    @override_settings(TASK_CHANGES_LAG_SECONDS = 60)
+    def test_young_changes_wait_for_the_lag(self):
+        """ test a poll stops before changes younger than the lag, whose transaction may still run """
+        settled = timezone.now() - datetime.timedelta(minutes = 2)
+        self.user.task_changes.update(changed_at = settled)
+        first, second = self.user.create_tasks([{"name": "settled"}, {"name": "young"}])
+        young = self.user.task_changes.get(task_id = second.id)
+        self.user.task_changes.exclude(id = young.id).update(changed_at = settled)
+
+        # a fresh cursor starts before the young change
+        head = self.user.changes_since().cursor
+        self.assertEqual(changes.decode_cursor(head)[0], young.id - 1)
+
+        names, _, result = self.sync()
+        self.assertEqual((names, result.has_more), ({"settled"}, False))
+        self.assertEqual(changes.decode_cursor(result.cursor)[0], young.id - 1)
+
+        # once old enough it is handed out, to both cursors
+        self.user.task_changes.filter(id = young.id).update(changed_at = settled)
+        self.assertEqual(self.sync(result.cursor)[0], {"young"})
+        self.assertEqual(self.sync(head)[0], {"young"})
+
+    def test_archive_and_compaction(self):
+        """ test archived tombstones, compaction and expired cursors """
+        ended = timezone.now() - datetime.timedelta(days = 400)
+        self.user.update_task(id = self.task.id, is_completed = True, begin_at = ended, end_at = ended)
+        archive_batch(timezone.now() - datetime.timedelta(days = 365))
+        result = self.user.changes_since(self.cursor)
+        self.assertEqual((result.tasks, result.deleted, result.archived), ([], [], [self.task.id]))
+
+        self.user.task_changes.filter(kind = changes.UPSERT).update(changed_at = ended)
+        stale = changes.encode_cursor(0, ended)
+        with self.assertRaises(ExpiredCursorException):
+            self.user.changes_since(stale)
+
+        out = StringIO()
+        call_command("compact_task_changes", stdout = out)
+        # the delete logged when archiving is superseded by the archive tombstone
+        self.assertIn("deleted 2 expired and 1 superseded", out.getvalue())
+        self.assertEqual(list(self.user.task_changes.values_list("kind", flat = True)), [changes.ARCHIVE])
+
+        kept = self.user.create_task(name = "kept")
+        self.user.update_task(id = kept.id, name = "renamed")
+        self.assertEqual(changes.compact(), {"expired": 0, "superseded": 1})
+        self.assertEqual(self.sync(result.cursor)[0], {"renamed"})
+
+    def test_changes_api(self):
+        """ test the endpoint hands out cursors and deltas, with errors for bad cursors """
+        url = reverse("core:task_changes_api")
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.user)
+
+        cursor = self.client.get(url).json()["cursor"]
+        self.user.complete_task(id = self.task.id)
+        body = self.client.get(url, {"cursor": cursor}).json()
+        self.assertEqual([task["name"] for task in body["tasks"]], ["first"])
+        self.assertTrue(body["tasks"][0]["is_completed"])
+        self.assertEqual((body["deleted"], body["archived"], body["has_more"]), ([], [], False))
+
+        self.assertEqual(self.client.get(url, {"cursor": "x"}).status_code, 400)
+        stale = changes.encode_cursor(0, timezone.now() - datetime.timedelta(days = 31))
+        self.assertEqual(self.client.get(url, {"cursor": stale}).status_code, 410)
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = "core"
+
+urlpatterns = [
+    path("export/", views.export_tasks, name="export_tasks"),
+    path("api/", views.tasks_api, name="tasks_api"),
+    path("api/<int:id>/", views.task_api, name="task_api"),
+    path("api/changes/", views.task_changes_api, name="task_changes_api"),
+]
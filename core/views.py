@@ -1,3 +1,274 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET, require_http_methods
+
+from . import metrics as task_metrics
+from .cache import summary_cache, response_timeout, response_key, task_etag
+from .changes import DEFAULT_CHANGES_LIMIT
+from .exceptions import TaskNotFoundException, InvalidCursorException, ExpiredCursorException
+from .models import Task
+from .pagination import MAX_PAGE_SIZE
+from .serializers import (
+    FORMATS, CONTENT_TYPES, export_rows, serialize, gzip_stream,
+    TASK_FIELDS, parse_task_row, parse_task_changes, validate_task, task_to_dict,
+)
+
+
+@require_GET
+@login_required
+def export_tasks(request):
+    """ stream the tasks of the current user as CSV or NDJSON
+
+    Query parameters:
+        format: ``csv`` (default) or ``ndjson``
+        gzip: ``1`` to download a gzip compressed file
+        all: ``1`` to export the tasks of every user, staff only
+
+    Returns:
+        StreamingHttpResponse: export file, built row by row
+    """
+    format = request.GET.get('format', 'csv')
+    if format not in FORMATS:
+        return HttpResponseBadRequest(f"format must be one of {', '.join(FORMATS)}")
+
+    etag = None
+    if request.GET.get('all') == '1' and request.user.is_staff:
+        queryset = Task.objects.order_by('id')
+        filename = f"tasks.{format}"
+    else:
+        # exports are streamed, too large to cache, but can be revalidated
+        etag = task_etag(request.user.id, request.user.get_task_version())
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        queryset = request.user.get_tasks()
+        filename = f"tasks-{request.user.username}.{format}"
+
+    content = serialize(export_rows(queryset), format)
+    content_type = CONTENT_TYPES[format]
+
+    if request.GET.get('gzip') == '1':
+        content = gzip_stream(content)
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    response = StreamingHttpResponse(content, content_type = content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if etag is not None:
+        response['ETag'] = etag
+        patch_cache_control(response, private = True, no_cache = True)
+    return response
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status = status)
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+
+def _not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    patch_cache_control(response, private = True, no_cache = True)
+    return response
+
+
+async def _cached_response(request, user, render):
+    """ serve a GET response built from the tasks of user through the cache
+
+    Responses are cached under the task version of user, which is also
+    their ETag: clients holding the current version get a 304 and other
+    requests the cached body until the next write to the tasks of user.
+
+    Args:
+        request (HttpRequest): GET request
+        user (User): user whose tasks the response shows
+        render (Callable[[], Awaitable[HttpResponse]]): builds the response
+            on a cache miss, only 200 responses are cached
+
+    Returns:
+        HttpResponse: 304, cached or rendered response
+    """
+    version = await user.aget_task_version()
+    etag = task_etag(user.id, version)
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    cache = summary_cache()
+    key = response_key(user.id, version, request.get_full_path())
+    content = await cache.aget(key)
+    if content is not None:
+        response = HttpResponse(content, content_type = 'application/json')
+    else:
+        response = await render()
+        if response.status_code != 200:
+            return response
+        # the version was read first, a concurrent write orphans this entry
+        await cache.aset(key, response.content, response_timeout())
+
+    response['ETag'] = etag
+    patch_cache_control(response, private = True, no_cache = True)
+    return response
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        raise ValueError("body must be valid JSON")
+
+
+@require_http_methods(['GET', 'POST'])
+async def tasks_api(request):
+    """ list or create tasks of the current user, served by the async task API
+
+    GET query parameters:
+        cursor: continuation token of the previous page
+        size: number of tasks per page
+        completed: ``1`` or ``0`` to filter on completion
+
+    Returns:
+        JsonResponse: page of tasks, or the created task
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _error("authentication required", 401)
+
+    if request.method == 'POST':
+        try:
+            task = parse_task_row(_json_body(request))
+            validate_task(task, user)
+        except ValueError as exc:
+            return _error(str(exc), 400)
+        task = await user.acreate_task(**task)
+        return JsonResponse(task_to_dict(task), status = 201)
+
+    return await _cached_response(request, user, lambda: _tasks_page(request, user))
+
+
+async def _tasks_page(request, user):
+    filters = {}
+    if request.GET.get('completed') in ('0', '1'):
+        filters['is_completed'] = request.GET['completed'] == '1'
+
+    try:
+        page = await user.aget_tasks_page(
+            cursor = request.GET.get('cursor'),
+            size = int(request.GET.get('size', 50)),
+            **filters,
+        )
+    except (InvalidCursorException, ValueError) as exc:
+        return _error(str(exc), 400)
+
+    return JsonResponse({
+        'tasks': [task_to_dict(task) for task in page.tasks],
+        'next_cursor': page.next_cursor,
+    })
+
+
+@require_GET
+async def task_changes_api(request):
+    """ changes to the tasks of the current user after a cursor, for delta sync
+
+    GET query parameters:
+        cursor: token of the previous answer, none for the current position
+        limit: most changes read at once
+
+    Returns:
+        JsonResponse: changed tasks, ``deleted`` and ``archived`` ids, the
+        next ``cursor`` and ``has_more``; 410 once the cursor expired
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _error("authentication required", 401)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_CHANGES_LIMIT)), 1), MAX_PAGE_SIZE)
+        changes = await user.achanges_since(cursor = request.GET.get('cursor'), limit = limit)
+    except ExpiredCursorException as exc:
+        return _error(str(exc), 410)
+    except (InvalidCursorException, ValueError) as exc:
+        return _error(str(exc), 400)
+
+    response = JsonResponse({
+        'tasks': [task_to_dict(task) for task in changes.tasks],
+        'deleted': changes.deleted,
+        'archived': changes.archived,
+        'cursor': changes.cursor,
+        'has_more': changes.has_more,
+    })
+    patch_cache_control(response, private = True, no_store = True)
+    return response
+
+
+@require_http_methods(['GET', 'PATCH', 'DELETE'])
+async def task_api(request, id):
+    """ read, update or delete one task of the current user
+
+    Returns:
+        JsonResponse: the task, or an empty 204 response once deleted
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _error("authentication required", 401)
+
+    if request.method == 'GET':
+        return await _cached_response(request, user, lambda: _task(user, id))
+
+    try:
+        if request.method == 'DELETE':
+            await user.adelete_task(id = id)
+            return HttpResponse(status = 204)
+
+        task = await user.aget_task(id = id)
+        if request.method == 'PATCH':
+            try:
+                changes = parse_task_changes(_json_body(request))
+                current = {name: getattr(task, name) for name in TASK_FIELDS}
+                validate_task({**current, **changes}, user)
+            except ValueError as exc:
+                return _error(str(exc), 400)
+            if changes:
+                task = await user.aupdate_task(id = id, **changes)
+                if task is None:
+                    # deleted since it was read
+                    raise TaskNotFoundException({'id': id})
+    except TaskNotFoundException:
+        return _error("task not found", 404)
+
+    return JsonResponse(task_to_dict(task))
+
+
+async def _task(user, id):
+    try:
+        task = await user.aget_task(id = id)
+    except TaskNotFoundException:
+        return _error("task not found", 404)
+    return JsonResponse(task_to_dict(task))
+
+
+@require_GET
+def metrics(request):
+    """ request, query and task method metrics in the Prometheus text format
+
+    Scrapers must send ``METRICS_TOKEN`` as a bearer token. Without a
+    token the endpoint does not exist, unless DEBUG is on.
+
+    Returns:
+        HttpResponse: metrics of the process serving the request
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse("metrics are disabled without METRICS_TOKEN", status = 404, content_type = 'text/plain')
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse("invalid metrics token", status = 401, content_type = 'text/plain')
+
+    return HttpResponse(task_metrics.render(), content_type = 'text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,12 @@
+"""
+Admin URLconf of serverless deployments.
+
+Imported by the first request below /admin/ instead of at startup: the
+admin modules of the installed apps are discovered here.
+"""
+
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
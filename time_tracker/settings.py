@@ -1,9 +1,18 @@
+import os
+
 from pathlib            import Path
-from dj_database_url    import parse
 
 import environ
 env = environ.Env()
-environ.Env.read_env()
+
+# Serverless deployments (Vercel sets VERCEL) import this module on every
+# cold start: they skip the env file, the debug toolbar, the unused form
+# apps and import the admin on its first request, see ``manage.py coldstart``.
+# Set it in the environment, the env file is read after it.
+SERVERLESS = env.bool("SERVERLESS", default = "VERCEL" in os.environ)
+
+if not SERVERLESS:
+    environ.Env.read_env()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -14,7 +23,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = env("SECRET_KEY")
 
-DEBUG = env("DEBUG", default = False)
+DEBUG = env.bool("DEBUG", default = False)
+
+# Django debug toolbar, never on serverless hosts
+DEBUG_TOOLBAR = DEBUG and not SERVERLESS
 
 ALLOWED_HOSTS = [
     '127.0.0.1',
@@ -26,7 +38,8 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    # without autodiscovery the admin modules are imported by time_tracker.admin_urls
+    "django.contrib.admin.apps.SimpleAdminConfig" if SERVERLESS else "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -34,12 +47,16 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
 
     "core",
-
-    'crispy_forms',
-    'crispy_bootstrap5',
 ]
 
+if not SERVERLESS:
+    INSTALLED_APPS += [
+        'crispy_forms',
+        'crispy_bootstrap5',
+    ]
+
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -70,7 +87,7 @@ TEMPLATES = [
 ]
 
 # debug_toolbar moved here. 
-if DEBUG:
+if DEBUG_TOOLBAR:
     MIDDLEWARE += [
         'debug_toolbar.middleware.DebugToolbarMiddleware',
     ]
@@ -94,24 +111,94 @@ WSGI_APPLICATION = "time_tracker.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# persistent connections, checked before reuse so a dropped one is replaced
+DATABASE_CONN_MAX_AGE = env.int("DATABASE_CONN_MAX_AGE", default = 60)
+
+# longest a write transaction runs, in seconds; keep the database timeout
+# (PostgreSQL transaction_timeout) and import --commit-every within it
+DATABASE_TRANSACTION_TIMEOUT = env.int("DATABASE_TRANSACTION_TIMEOUT", default = 3)
+
+def parse_database(url):
+    from dj_database_url import parse
+
+    return parse(url, conn_max_age = DATABASE_CONN_MAX_AGE, conn_health_checks = True)
+
 def get_database():
     database_type = env("DATABASE_TYPE", default = "local").lower()
     
     if database_type in ["qa", "quality_assurance"]:
-        return parse(env('DATABASE_URL_QA'))
+        return parse_database(env('DATABASE_URL_QA'))
 
     elif database_type in ["prod", "production"]:
-        return parse(env('DATABASE_URL'))
+        return parse_database(env('DATABASE_URL'))
     
     return {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
     }
 
+def get_replica():
+    database_type = env("DATABASE_TYPE", default = "local").lower()
+    url = None
+
+    if database_type in ["qa", "quality_assurance"]:
+        url = env('DATABASE_URL_QA_REPLICA', default = None)
+
+    elif database_type in ["prod", "production"]:
+        url = env('DATABASE_URL_REPLICA', default = None)
+
+    if not url:
+        return None
+    # tests read the replica through the default connection
+    return {**parse_database(url), "TEST": {"MIRROR": "default"}}
+
 DATABASES = {
     "default": get_database()
 }
 
+replica = get_replica()
+if replica:
+    DATABASES["replica"] = replica
+
+# reads of the User task methods go to DATABASE_REPLICAS, see core.routers
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+# how long a user reads from the primary after writing tasks, kept in the
+# default cache which must be shared by all processes (CACHE_URL)
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default = 5)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": env.cache_url("CACHE_URL", default = "locmemcache://"),
+}
+
+# per-user task summary, see User.get_task_summary()
+TASK_SUMMARY_CACHE_ALIAS = env("TASK_SUMMARY_CACHE_ALIAS", default = "default")
+TASK_SUMMARY_CACHE_TIMEOUT = env.int("TASK_SUMMARY_CACHE_TIMEOUT", default = 300)
+
+# task API responses, cached in the same cache per user and task version
+TASK_RESPONSE_CACHE_TIMEOUT = env.int("TASK_RESPONSE_CACHE_TIMEOUT", default = 300)
+
+
+# changes of tasks are kept this long for delta sync, older cursors expire
+TASK_CHANGES_RETENTION_DAYS = env.int("TASK_CHANGES_RETENTION_DAYS", default = 30)
+# changes are handed out once this old, longer than any write transaction
+TASK_CHANGES_LAG_SECONDS = env.int("TASK_CHANGES_LAG_SECONDS", default = DATABASE_TRANSACTION_TIMEOUT + 1)
+
+# admin purges of users with many tasks run on a background thread
+TASK_PURGE_BACKGROUND = env.bool("TASK_PURGE_BACKGROUND", default = True)
+
+# Metrics, served in the Prometheus text format on /metrics
+# share of requests whose queries are counted and timed, latency is always recorded
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default = True)
+METRICS_SAMPLE_RATE = env.float("METRICS_SAMPLE_RATE", default = 0.1)
+# bearer token of the scrapers, without it /metrics is only served with DEBUG
+METRICS_TOKEN = env("METRICS_TOKEN", default = None)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -160,7 +247,16 @@ STATICFILES_DIRS = [
     BASE_DIR / 'time_tracker' / STATIC_URL,
 ]
 
-STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"  # new
+# content-hashed names and gzip / brotli variants written by collectstatic,
+# served with far-future cache headers by core.static.serve
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": env("STATICFILES_BACKEND", default = "core.storage.CompressedManifestStaticFilesStorage"),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -1,18 +1,30 @@
-from django.contrib             import admin
 from django.urls                import path, include, re_path
+from django.urls.resolvers      import RoutePattern, URLResolver
 from django.conf                import settings
-from django.conf.urls.static    import serve
+
+from core.static                import serve
+from core.views                 import metrics
+
+if settings.SERVERLESS:
+    # the URLconf given by name is imported when a path below admin/ is resolved
+    admin_urls = URLResolver(RoutePattern("admin/"), "time_tracker.admin_urls", app_name = "admin", namespace = "admin")
+else:
+    from django.contrib import admin
+
+    admin_urls = path("admin/", admin.site.urls)
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
+    admin_urls,
+    path("tasks/", include("core.urls")),
+    path("metrics", metrics, name="metrics"),
 ]
 
-if settings.DEBUG:
+if settings.DEBUG_TOOLBAR:
     urlpatterns += [
         path('__debug__/', include('debug_toolbar.urls')), # include debug toolbar urls
     ]
     
 urlpatterns += [
-    re_path(r'^media/(?P<path>.*)$',    serve,{'document_root': settings.MEDIA_ROOT     }), 
+    re_path(r'^media/(?P<path>.*)$',    serve,{'document_root': settings.MEDIA_ROOT, 'immutable': False }),
     re_path(r'^static/(?P<path>.*)$',   serve,{'document_root': settings.STATIC_ROOT    }),
 ]
\ No newline at end of file